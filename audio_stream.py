@@ -0,0 +1,440 @@
+"""
+Audio Stream Module for Conditioning Control Panel
+===================================================
+Provides:
+- Streaming playback of a media file's soundtrack through one pygame
+  mixer channel, fed from an ffmpeg PCM pipe in small chunks
+- Bounded memory (a few chunks in flight regardless of clip length)
+- Playback position tracking for the video player
+- Persistent per-video soundtrack sidecars extracted in the background
+"""
+
+import os
+import hashlib
+import subprocess
+import threading
+import queue
+import time
+from collections import deque
+from typing import Optional
+
+import pygame
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+from media_library import probe_audio_stream
+
+
+CHUNK_SECONDS = 0.25
+MAX_BUFFERED_CHUNKS = 8  # ~2 s decoded ahead of the mixer
+POLL_INTERVAL = 0.01
+
+
+class AudioStream:
+    """
+    Plays a soundtrack by decoding it with ffmpeg and queueing short
+    pygame Sound chunks on a channel.
+
+    A reader thread pulls raw PCM (in the mixer's own format, so no
+    conversion happens in Python) into a small bounded queue. A feeder
+    thread keeps exactly one chunk queued behind the playing one using
+    Channel.queue, so chunks play back to back without gaps.
+    """
+
+    def __init__(self, path: str, channel: "pygame.mixer.Channel", volume: float = 1.0):
+        """
+        Initialize the stream. Nothing runs until start() is called.
+
+        Args:
+            path: Video or audio file to take the soundtrack from
+            channel: Mixer channel to play on
+            volume: Initial volume (0.0 - 1.0)
+        """
+        self.path = path
+        self.channel = channel
+        self.volume = volume
+        self.running = False
+        self.finished = False
+        self._proc = None
+        self._chunks = queue.Queue(maxsize=MAX_BUFFERED_CHUNKS)
+        self._eof = threading.Event()
+        self._lock = threading.Lock()
+        self._played = 0.0        # Seconds of fully played chunks
+        self._current_len = 0.0   # Length of the chunk that is playing
+        self._current_start = None  # time.monotonic() when it started
+        self._queued_len = None   # Length of the chunk waiting in Channel.queue
+        self._playing = False
+
+    def start(self) -> bool:
+        """
+        Launch ffmpeg and begin playback as soon as the first chunk arrives.
+
+        Returns:
+            True if the stream started, False if the mixer or ffmpeg is unavailable
+        """
+        if not self.prepare():
+            return False
+        self.play()
+        return True
+
+    def prepare(self) -> bool:
+        """
+        Launch ffmpeg and start buffering without playing anything.
+
+        The buffer fills up to MAX_BUFFERED_CHUNKS and then ffmpeg waits,
+        so a prepared stream can sit idle until play() is called.
+
+        Returns:
+            True if the stream is buffering, False if the mixer or ffmpeg is unavailable
+        """
+        if self._proc is not None:
+            return True
+        init = pygame.mixer.get_init()
+        if not init:
+            return False
+        freq, size, channels = init
+        if size != -16:
+            logger.debug(f"Audio streaming needs a 16-bit signed mixer, got {size}")
+            return False
+        try:
+            import imageio_ffmpeg
+            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+            cmd = [ffmpeg_exe, '-v', 'error', '-i', self.path, '-vn',
+                   '-f', 's16le', '-acodec', 'pcm_s16le', '-ar', str(freq), '-ac', str(channels), '-']
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                          stderr=subprocess.DEVNULL,
+                                          creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        except (ImportError, RuntimeError, OSError) as e:
+            logger.warning(f"Could not stream audio from {self.path}: {e}")
+            return False
+
+        self.bytes_per_second = freq * channels * 2
+        chunk_bytes = int(self.bytes_per_second * CHUNK_SECONDS)
+        self._chunk_bytes = chunk_bytes - chunk_bytes % (channels * 2)  # Whole sample frames only
+        self.running = True
+        threading.Thread(target=self._reader, daemon=True).start()
+        return True
+
+    def play(self):
+        """Start playback of a prepared stream."""
+        if self.running and not self._playing:
+            self._playing = True
+            threading.Thread(target=self._feeder, daemon=True).start()
+
+    def stop(self):
+        """Stop playback and the ffmpeg process."""
+        with self._lock:
+            self.running = False
+            try:
+                self.channel.stop()
+            except pygame.error:
+                pass
+        if self._proc and self._proc.poll() is None:
+            try:
+                self._proc.kill()
+            except OSError:
+                pass
+
+    def set_volume(self, volume: float):
+        """
+        Change the volume of the playing and all later chunks.
+
+        Args:
+            volume: 0.0 - 1.0
+        """
+        self.volume = volume
+        try:
+            self.channel.set_volume(volume)
+        except pygame.error:
+            pass
+
+    @property
+    def position(self) -> float:
+        """Seconds of audio played so far."""
+        with self._lock:
+            if self._current_start is None:
+                return self._played
+            return self._played + min(self._current_len, time.monotonic() - self._current_start)
+
+    @property
+    def started(self) -> bool:
+        """True once the first chunk is audible."""
+        return self._current_start is not None
+
+    def _reader(self):
+        stdout = self._proc.stdout
+        try:
+            while self.running:
+                data = stdout.read(self._chunk_bytes)
+                if not data:
+                    break
+                while self.running:
+                    try:
+                        self._chunks.put(data, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        except (OSError, ValueError) as e:
+            logger.debug(f"Audio stream read failed: {e}")
+        finally:
+            self._eof.set()
+            try:
+                stdout.close()
+            except OSError:
+                pass
+
+    def _next_sound(self):
+        """Next chunk as (Sound, seconds), or None if nothing is ready yet."""
+        try:
+            data = self._chunks.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            return None
+        sound = pygame.mixer.Sound(buffer=data)
+        sound.set_volume(self.volume)
+        return sound, len(data) / self.bytes_per_second
+
+    def _feeder(self):
+        try:
+            while self.running:
+                busy = self.channel.get_busy()
+                with self._lock:
+                    if self._queued_len is not None and self.channel.get_queue() is None:
+                        # The queued chunk has become the playing one
+                        self._played += self._current_len
+                        self._current_len, self._queued_len = self._queued_len, None
+                        self._current_start = time.monotonic()
+                    elif not busy and self._current_start is not None and self._queued_len is None:
+                        # Mixer drained (end of stream or decoder fell behind)
+                        self._played += self._current_len
+                        self._current_len = 0.0
+                        self._current_start = None
+
+                if busy and self._queued_len is not None:
+                    time.sleep(POLL_INTERVAL)
+                    continue
+                if self._eof.is_set() and self._chunks.empty():
+                    if not busy:
+                        break
+                    time.sleep(POLL_INTERVAL)
+                    continue
+
+                nxt = self._next_sound()
+                if nxt is None:
+                    continue
+                sound, seconds = nxt
+                with self._lock:
+                    if not self.running:
+                        break
+                    if self.channel.get_busy():
+                        self.channel.queue(sound)
+                        self._queued_len = seconds
+                    else:
+                        self.channel.play(sound)
+                        self._current_len = seconds
+                        self._current_start = time.monotonic()
+        except pygame.error as e:
+            logger.debug(f"Audio stream playback failed: {e}")
+        finally:
+            self.finished = True
+            self.running = False
+
+
+# =============================================================================
+# SOUNDTRACK SIDECAR CACHE
+# =============================================================================
+
+SIDECAR_EXT = ".ogg"
+NO_AUDIO_EXT = ".noaudio"  # Empty marker: ffmpeg found no soundtrack in this video version
+SIDECAR_QUALITY = "4"  # libvorbis -q:a, ~128 kbps stereo
+
+
+def _marker_for(sidecar_path: str) -> str:
+    return sidecar_path[:-len(SIDECAR_EXT)] + NO_AUDIO_EXT
+
+
+class SoundtrackCache:
+    """
+    Per-video soundtrack cache.
+
+    Each video's audio is extracted once into a small Ogg Vorbis sidecar
+    named after the video's path, mtime and size, so an edited or replaced
+    video gets a fresh sidecar automatically. Extraction runs on a single
+    background thread; playback streams from the sidecar when it exists and
+    from the video itself otherwise. A video whose container has no audio
+    stream gets an empty marker instead, so it is not retried until it
+    changes; any other extraction failure is retried and plays from the video.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Initialize the cache and start its extraction thread.
+
+        Args:
+            cache_dir: Directory the sidecar files live in
+        """
+        self.cache_dir = cache_dir
+        self._pending = deque()
+        self._queued = set()
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self._worker.start()
+
+    def path_for(self, video_path: str) -> Optional[str]:
+        """
+        Get the sidecar path for a video's current version.
+
+        Args:
+            video_path: Video file path
+
+        Returns:
+            Sidecar file path (which may not exist yet), or None if the
+            video cannot be read
+        """
+        video_path = os.path.abspath(video_path)
+        try:
+            st = os.stat(video_path)
+        except OSError:
+            return None
+        key = f"{video_path}|{st.st_mtime_ns}|{st.st_size}".encode('utf-8', errors='surrogateescape')
+        return os.path.join(self.cache_dir, hashlib.blake2b(key, digest_size=16).hexdigest() + SIDECAR_EXT)
+
+    def is_silent(self, video_path: str) -> bool:
+        """
+        Check whether a video's current version is known to have no soundtrack.
+
+        Args:
+            video_path: Video file path
+
+        Returns:
+            True if an earlier extraction found no audio
+        """
+        path = self.path_for(video_path)
+        return bool(path) and os.path.exists(_marker_for(path))
+
+    def get(self, video_path: str) -> Optional[str]:
+        """
+        Look up an already extracted soundtrack.
+
+        Args:
+            video_path: Video file path
+
+        Returns:
+            Sidecar path, or None if it has not been extracted yet or the
+            video has no soundtrack
+        """
+        path = self.path_for(video_path)
+        return path if path and os.path.exists(path) else None
+
+    def warm(self, video_paths, urgent: bool = False):
+        """
+        Queue videos for background extraction.
+
+        Args:
+            video_paths: Video file paths
+            urgent: Put these ahead of everything already queued
+        """
+        with self._cond:
+            for path in video_paths:
+                path = os.path.abspath(path)
+                if path in self._queued:
+                    if urgent and path in self._pending:  # Not already being extracted
+                        self._pending.remove(path)
+                        self._pending.appendleft(path)
+                    continue
+                self._queued.add(path)
+                if urgent:
+                    self._pending.appendleft(path)
+                else:
+                    self._pending.append(path)
+            self._cond.notify()
+
+    def extract(self, video_path: str) -> Optional[str]:
+        """
+        Extract a video's soundtrack into the cache (blocking).
+
+        Args:
+            video_path: Video file path
+
+        Returns:
+            Sidecar path, or None if the video has no audio or ffmpeg failed
+        """
+        path = self.path_for(video_path)
+        if not path:
+            return None
+        if os.path.exists(path):
+            return path
+        marker = _marker_for(path)
+        if os.path.exists(marker):
+            return None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        try:
+            import imageio_ffmpeg
+            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+            cmd = [ffmpeg_exe, '-v', 'error', '-y', '-i', video_path, '-vn',
+                   '-c:a', 'libvorbis', '-q:a', SIDECAR_QUALITY, '-f', 'ogg', tmp_path]
+            result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL, timeout=600,
+                                    creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+            if result.returncode != 0 or not os.path.exists(tmp_path) or not os.path.getsize(tmp_path):
+                raise OSError(f"ffmpeg exited with {result.returncode}")
+            os.replace(tmp_path, path)
+        except (ImportError, RuntimeError, OSError, subprocess.SubprocessError) as e:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            if probe_audio_stream(video_path) is False:
+                # Don't run ffmpeg on this version again; playback skips audio for it
+                try:
+                    open(marker, 'wb').close()
+                except OSError:
+                    pass
+                logger.debug(f"No audio stream in {os.path.basename(video_path)}")
+            else:
+                # Playback keeps streaming from the video itself
+                logger.warning(f"Could not extract soundtrack of {video_path}: {e}")
+            return None
+        logger.debug(f"Cached soundtrack for {os.path.basename(video_path)}")
+        return path
+
+    def prune(self, video_paths):
+        """
+        Delete sidecars that belong to no current video version.
+
+        Args:
+            video_paths: Every video that should keep its sidecar
+        """
+        keep = set()
+        for p in filter(None, map(self.path_for, video_paths)):
+            keep.update((os.path.basename(p), os.path.basename(_marker_for(p))))
+        try:
+            with os.scandir(self.cache_dir) as it:
+                stale = [de.path for de in it if de.name not in keep
+                         and de.name.endswith((SIDECAR_EXT, NO_AUDIO_EXT, ".tmp"))]
+        except OSError:
+            return
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        if stale:
+            logger.debug(f"Removed {len(stale)} stale soundtrack sidecar(s)")
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                path = self._pending.popleft()
+            try:
+                self.extract(path)
+            finally:
+                with self._cond:
+                    self._queued.discard(path)
@@ -3,7 +3,11 @@ import subprocess
 import threading
 import time
 import ctypes
-from ctypes import windll, wintypes
+from ctypes import wintypes
+try:
+    from ctypes import windll
+except ImportError:  # Not Windows: no browser is found, so the Win32 calls below never run
+    windll = None
 from config import BROWSER_PROFILE_DIR, BAMBI_URL
 
 # --- Windows API Constants ---
@@ -27,8 +31,8 @@ SWP_FRAMECHANGED = 0x0020
 SWP_SHOWWINDOW = 0x0040
 
 # Clipping Functions
-CreateRectRgn = windll.gdi32.CreateRectRgn
-SetWindowRgn = windll.user32.SetWindowRgn
+CreateRectRgn = windll.gdi32.CreateRectRgn if windll else None
+SetWindowRgn = windll.user32.SetWindowRgn if windll else None
 
 
 class BrowserManager:
@@ -12,7 +12,6 @@ import time
 import random
 import threading
 import tkinter as tk
-from ctypes import windll, byref, c_int
 
 # Initialize logging
 try:
@@ -38,99 +37,7 @@ try:
 except ImportError:
     RESOURCE_MGR_AVAILABLE = False
 
-# Win32 constants
-GWL_EXSTYLE = -20
-WS_EX_LAYERED = 0x80000
-WS_EX_TRANSPARENT = 0x00000020
-WS_EX_TOPMOST = 0x00008
-WS_EX_TOOLWINDOW = 0x00000080
-WS_EX_NOACTIVATE = 0x08000000
-LWA_COLORKEY = 0x1
-LWA_ALPHA = 0x2
-HWND_TOPMOST = -1
-SWP_NOSIZE = 0x0001
-SWP_NOMOVE = 0x0002
-SWP_NOACTIVATE = 0x0010
-SWP_SHOWWINDOW = 0x0040
-
-ULW_ALPHA = 0x02
-AC_SRC_OVER = 0x00
-AC_SRC_ALPHA = 0x01
-
-from ctypes import Structure, sizeof, c_byte, wintypes
-
-class BLENDFUNCTION(Structure):
-    _fields_ = [("BlendOp", c_byte), ("BlendFlags", c_byte),
-                ("SourceConstantAlpha", c_byte), ("AlphaFormat", c_byte)]
-
-class Point(Structure):
-    _fields_ = [("x", wintypes.LONG), ("y", wintypes.LONG)]
-
-class Size(Structure):
-    _fields_ = [("cx", wintypes.LONG), ("cy", wintypes.LONG)]
-
-class BITMAPINFOHEADER(Structure):
-    _fields_ = [("biSize", wintypes.DWORD), ("biWidth", wintypes.LONG), ("biHeight", wintypes.LONG),
-                ("biPlanes", wintypes.WORD), ("biBitCount", wintypes.WORD), ("biCompression", wintypes.DWORD),
-                ("biSizeImage", wintypes.DWORD), ("biXPelsPerMeter", wintypes.LONG),
-                ("biYPelsPerMeter", wintypes.LONG), ("biClrUsed", wintypes.DWORD),
-                ("biClrImportant", wintypes.DWORD)]
-
-import ctypes
-
-def make_transparent_window(hwnd, pil_image, x, y, alpha_val=255):
-    """Paint a PIL image onto a HWND using UpdateLayeredWindow."""
-    try:
-        if pil_image.mode != 'RGBA':
-            pil_image = pil_image.convert('RGBA')
-
-        if alpha_val < 255:
-            alpha_layer = pil_image.split()[3]
-            alpha_layer = alpha_layer.point(lambda p: int(p * alpha_val / 255))
-            r, g, b, _ = pil_image.split()
-            pil_image = Image.merge('RGBA', (r, g, b, alpha_layer))
-
-        try:
-            pil_image = pil_image.convert('RGBa')
-        except (ValueError, OSError):
-            pil_image = pil_image.convert('RGBA').convert('RGBa')
-
-        w, h = pil_image.size
-        r, g, b, a = pil_image.split()
-        bgra_img = Image.merge("RGBA", (b, g, r, a))
-        img_data = bgra_img.tobytes()
-
-        hdcScreen = windll.user32.GetDC(0)
-        hdcMem = windll.gdi32.CreateCompatibleDC(hdcScreen)
-
-        bmi = BITMAPINFOHEADER()
-        bmi.biSize = sizeof(BITMAPINFOHEADER)
-        bmi.biWidth = w
-        bmi.biHeight = -h
-        bmi.biPlanes = 1
-        bmi.biBitCount = 32
-        bmi.biCompression = 0
-
-        pvBits = ctypes.c_void_p()
-        hBitmap = windll.gdi32.CreateDIBSection(hdcMem, byref(bmi), 0, byref(pvBits), 0, 0)
-        if hBitmap == 0:
-            windll.gdi32.DeleteDC(hdcMem)
-            windll.user32.ReleaseDC(0, hdcScreen)
-            return
-
-        ctypes.memmove(pvBits, img_data, len(img_data))
-        oldBitmap = windll.gdi32.SelectObject(hdcMem, hBitmap)
-
-        blend = BLENDFUNCTION(AC_SRC_OVER, 0, 255, AC_SRC_ALPHA)
-        windll.user32.UpdateLayeredWindow(hwnd, hdcScreen, byref(Point(x, y)), byref(Size(w, h)),
-                                          hdcMem, byref(Point(0, 0)), 0, byref(blend), ULW_ALPHA)
-
-        windll.gdi32.SelectObject(hdcMem, oldBitmap)
-        windll.gdi32.DeleteObject(hBitmap)
-        windll.gdi32.DeleteDC(hdcMem)
-        windll.user32.ReleaseDC(0, hdcScreen)
-    except (OSError, AttributeError) as e:
-        logger.debug(f"Layered window update failed: {e}")
+from render_backend import TkBackend
 
 
 class Bubble:
@@ -138,7 +45,8 @@ class Bubble:
     MAX_BUBBLES = 8  # Reduced for performance
     instances = []  # Track all active bubble instances
 
-    def __init__(self, root, monitor, speed, on_pop, on_miss, asset_path, volume=0.5, preloaded_image=None):
+    def __init__(self, root, monitor, speed, on_pop, on_miss, asset_path, volume=0.5, preloaded_image=None,
+                 backend=None):
         if Bubble.count >= Bubble.MAX_BUBBLES:
             self.alive = False
             if on_miss:
@@ -166,7 +74,7 @@ class Bubble:
         self.is_popping = False
         self.fade_alpha = 255.0
         self.volume = volume
-        self.hwnd = None
+        self.backend = backend or TkBackend(root)
         self.win = None
         self.hitbox_win = None  # Separate clickable window
 
@@ -253,61 +161,25 @@ class Bubble:
     def _create_window(self):
         """Create visual window and separate clickable hitbox window"""
         try:
-            # --- VISUAL WINDOW (transparent, click-through) ---
-            self.win = tk.Toplevel(self.root)
-            self.win.overrideredirect(True)
-            self.win.withdraw()  # Start hidden
-            self.win.geometry(f"{self.canvas_size}x{self.canvas_size}+{int(self.pos_x)}+{int(self.pos_y)}")
-            self.win.update_idletasks()
-
-            self.hwnd = windll.user32.GetParent(self.win.winfo_id())
-            if self.hwnd == 0:
-                self.hwnd = self.win.winfo_id()
-
-            # Visual window is layered and click-through
-            ex_style = windll.user32.GetWindowLongW(self.hwnd, GWL_EXSTYLE)
-            ex_style = ex_style | WS_EX_LAYERED | WS_EX_TRANSPARENT | WS_EX_TOPMOST | WS_EX_TOOLWINDOW | WS_EX_NOACTIVATE
-            windll.user32.SetWindowLongW(self.hwnd, GWL_EXSTYLE, ex_style)
+            # --- VISUAL WINDOW (per-pixel alpha, click-through, starts hidden) ---
+            self.win = self.backend.create_surface(int(self.pos_x), int(self.pos_y), self.canvas_size,
+                                                   self.canvas_size, layered=True)
+            self.win.set_alpha(self.fade_alpha / 255)
 
             # Render first frame to window BEFORE showing
             if self._first_frame:
-                make_transparent_window(self.hwnd, self._first_frame, 
-                                       int(self.pos_x), int(self.pos_y), int(self.fade_alpha))
+                self.win.set_image(self._first_frame)
 
             # --- HITBOX WINDOW (invisible but clickable) ---
             hitbox_offset = (self.canvas_size - self.hitbox_size) // 2
-            hitbox_x = int(self.pos_x) + hitbox_offset
-            hitbox_y = int(self.pos_y) + hitbox_offset
-            
-            self.hitbox_win = tk.Toplevel(self.root)
-            self.hitbox_win.overrideredirect(True)
-            self.hitbox_win.geometry(f"{self.hitbox_size}x{self.hitbox_size}+{hitbox_x}+{hitbox_y}")
-            self.hitbox_win.configure(bg='black')
-            self.hitbox_win.attributes('-alpha', 0.01)  # Almost invisible but catches clicks
-            self.hitbox_win.attributes('-topmost', True)
-            self.hitbox_win.update_idletasks()
-            
-            # Hitbox catches clicks
-            self.hitbox_win.bind("<Button-1>", self.pop)
-            
-            # Make hitbox topmost but NOT click-through
-            hitbox_hwnd = windll.user32.GetParent(self.hitbox_win.winfo_id())
-            if hitbox_hwnd == 0:
-                hitbox_hwnd = self.hitbox_win.winfo_id()
-            
-            hb_style = windll.user32.GetWindowLongW(hitbox_hwnd, GWL_EXSTYLE)
-            hb_style = hb_style | WS_EX_TOPMOST | WS_EX_TOOLWINDOW | WS_EX_NOACTIVATE
-            windll.user32.SetWindowLongW(hitbox_hwnd, GWL_EXSTYLE, hb_style)
-            
-            windll.user32.SetWindowPos(hitbox_hwnd, HWND_TOPMOST, 0, 0, 0, 0,
-                                       SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE | SWP_SHOWWINDOW)
+            self.hitbox_win = self.backend.create_surface(int(self.pos_x) + hitbox_offset,
+                                                          int(self.pos_y) + hitbox_offset,
+                                                          self.hitbox_size, self.hitbox_size,
+                                                          alpha=0.01,  # Almost invisible but catches clicks
+                                                          on_click=lambda surface: self.pop())
 
-            # Now show visual window (already has rendered content via UpdateLayeredWindow)
-            self.win.deiconify()
-            self.win.attributes('-topmost', True)
-            
-            windll.user32.SetWindowPos(self.hwnd, HWND_TOPMOST, 0, 0, 0, 0,
-                                       SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE | SWP_SHOWWINDOW)
+            # Now show visual window (already has rendered content)
+            self.win.show()
 
             # Start animation
             self.root.after(50, self.animate)
@@ -396,21 +268,24 @@ class Bubble:
             current_pil = self.get_wobbly_image()
             draw_x = int(self.pos_x)
             draw_y = int(self.pos_y)
-            make_transparent_window(self.hwnd, current_pil, draw_x, draw_y, int(self.fade_alpha))
+            self.win.move(draw_x, draw_y)
+            self.win.set_alpha(max(0.0, self.fade_alpha) / 255)
+            self.win.set_image(current_pil)
             
             # Move hitbox window to follow bubble center
-            if self.hitbox_win and self.hitbox_win.winfo_exists():
+            if self.hitbox_win and not self.hitbox_win.destroyed:
                 hitbox_offset = (self.canvas_size - self.hitbox_size) // 2
-                hitbox_x = draw_x + hitbox_offset
-                hitbox_y = draw_y + hitbox_offset
-                self.hitbox_win.geometry(f"{self.hitbox_size}x{self.hitbox_size}+{hitbox_x}+{hitbox_y}")
+                self.hitbox_win.move(draw_x + hitbox_offset, draw_y + hitbox_offset)
                 # Update hitbox alpha during pop
                 if self.is_popping:
-                    self.hitbox_win.attributes('-alpha', max(0.01, self.fade_alpha / 255 * 0.01))
+                    self.hitbox_win.set_alpha(max(0.01, self.fade_alpha / 255 * 0.01))
         except (tk.TclError, OSError) as e:
             logger.debug(f"Bubble animate failed: {e}")
             self.destroy()
             return
+        if self.win.destroyed:
+            self.destroy()
+            return
 
         self.root.after(50, self.animate)  # ~20 FPS (reduced from 28 for performance)
 
@@ -486,20 +361,13 @@ class Bubble:
         
         # Destroy hitbox window
         if self.hitbox_win:
-            try:
-                self.hitbox_win.destroy()
-            except tk.TclError:
-                pass  # Already destroyed
+            self.hitbox_win.destroy()
             self.hitbox_win = None
         
         # Destroy visual window
         if self.win:
-            try:
-                self.win.destroy()
-            except tk.TclError:
-                pass  # Already destroyed
+            self.win.destroy()
             self.win = None
-        self.hwnd = None
         self.original_pil = None
         self._first_frame = None
 
@@ -518,13 +386,10 @@ class Bubble:
                             logger.debug(f"on_pop callback failed during pop_all: {e}")
                 # Force immediate destroy
                 bubble.alive = False
-                try:
-                    if bubble.hitbox_win:
-                        bubble.hitbox_win.destroy()
-                    if bubble.win:
-                        bubble.win.destroy()
-                except tk.TclError:
-                    pass  # Already destroyed
+                if bubble.hitbox_win:
+                    bubble.hitbox_win.destroy()
+                if bubble.win:
+                    bubble.win.destroy()
         
         # Clear tracking
         cls.instances.clear()
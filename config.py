@@ -50,6 +50,16 @@ SETTINGS_FILE = os.path.join(BASE_DIR, "settings.json")
 PRESETS_FILE = os.path.join(BASE_DIR, "presets.json")
 TEMP_AUDIO_FILE = os.path.join(ASSETS_DIR, "temp_spot_audio.wav")
 
+# Persistent caches (safe to delete - rebuilt on demand)
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+MEDIA_INDEX_FILE = os.path.join(CACHE_DIR, "media_index.json")
+FRAME_CACHE_DIR = os.path.join(CACHE_DIR, "frames")
+AUDIO_CACHE_DIR = os.path.join(CACHE_DIR, "audio")
+PROXY_DIR = os.path.join(CACHE_DIR, "proxies")  # Built by `main.py --build-proxies`
+
+# Diagnostics
+VIDEO_REPORT_FILE = os.path.join(BASE_DIR, "logs", "video_playback.json")
+
 # Browser Profile for Persistent Cookies
 BROWSER_PROFILE_DIR = os.path.join(BASE_DIR, "BambiBrowserData")
 BAMBI_URL = "https://bambicloud.com/"
@@ -147,12 +157,18 @@ DEFAULT_SETTINGS = {
     "image_scale": 0.9,         # 50-250%
     "image_alpha": 1.0,         # 10-100%
     "fade_duration": 0.4,       # 0-2 seconds
+    "frame_cache_disk_mb": 512,  # Pre-resized flash frames kept on disk
+    "frame_cache_mem_mb": 256,   # Decoded flash frames kept in RAM
+    "flash_prefetch_batches": 2,  # Upcoming flashes decoded ahead of time
+    "decode_processes": 0,       # Worker processes for flash decoding (0 = in-process)
+    "dedupe_media": True,        # Identical files count once in the shuffle queue
     
     # --- Mandatory Videos ---
     "startle_enabled": True,
     "startle_freq": 6,          # Videos per hour (1-20)
     "startle_strict": False,    # DANGEROUS: Cannot close video
     "force_startle_on_launch": False,
+    "adaptive_video_quality": True,  # Trade resolution/frame rate for smooth playback on slow PCs
     
     # --- Audio ---
     "volume": 0.32,             # Master volume (0-100%)
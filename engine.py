@@ -14,19 +14,13 @@ import time
 import random
 import threading
 import glob
-import subprocess
 import datetime
 import math
 import tkinter as tk
 from tkinter import messagebox
 from typing import Optional, Dict, List, Any, Callable
 
-from PIL import Image, ImageTk
-import cv2
 import pygame
-import imageio.v3 as iio
-import imageio_ffmpeg
-from ctypes import windll
 
 # Initialize logging
 try:
@@ -47,7 +41,7 @@ except ImportError:
 # Import from our modules
 from config import (
     ASSETS_DIR, IMG_DIR, SND_DIR, SUB_AUDIO_DIR, STARTLE_VID_DIR,
-    TEMP_AUDIO_FILE, DEFAULT_SETTINGS
+    DEFAULT_SETTINGS, MEDIA_INDEX_FILE, FRAME_CACHE_DIR, AUDIO_CACHE_DIR, PROXY_DIR, VIDEO_REPORT_FILE
 )
 
 # Try new config imports, fall back gracefully
@@ -84,14 +78,32 @@ except ImportError:
 from browser import BrowserManager
 from ui_components import TransparentTextWindow
 from progression_system import ProgressionSystem
+from media_library import MediaIndex, MediaWatcher
+from frame_cache import FrameCache, make_cache_key, frame_lru
+from frame_decoder import ProcessDecoder, decode_flash_frames
+from worker_pool import WorkerPool, LANE_VIDEO, LANE_FLASH, LANE_HYDRA, LANE_PREFETCH
+from audio_stream import AudioStream, SoundtrackCache
+from video_decoder import VideoDecoder, PlaybackClock, DEFAULT_PREROLL
+from video_proxy import ProxyStore
+from video_telemetry import append_report, format_summary
+from event_scheduler import EventScheduler
+from heartbeat import Heartbeat
+from render_backend import TkBackend
+from time_window import DailyWindow, seconds_until, MAX_SLEEP
 
 
 class FlasherEngine:
-    def __init__(self, root_tk_ref, panic_callback):
+    def __init__(self, root_tk_ref, panic_callback, scheduler=None, rng=None, backend=None):
         self.running = False
         self.run_token = 0
         self.root = root_tk_ref
         self.panic_callback = panic_callback
+        # Every delayed engine callback goes through one heap-ordered scheduler with real cancellation.
+        # Its clock is the engine's clock; a scheduler on a VirtualClock runs the engine in simulated time.
+        self.event_scheduler = scheduler or EventScheduler(self.root)
+        self.rng = rng or random.Random()
+        # Every overlay window is a surface on this backend; an offscreen backend renders into memory
+        self.render = backend or TkBackend(self.root)
         self.settings = DEFAULT_SETTINGS.copy()
 
         self.active_windows = []
@@ -100,6 +112,8 @@ class FlasherEngine:
         self.virtual_end_time = 0
 
         self.video_running = False
+        self.video_windows = []
+        self.video_surfaces = {}  # (width, height) box -> image handle reused for every frame
         self.strict_active = False
         self.events_pending_reschedule = set()
 
@@ -128,7 +142,6 @@ class FlasherEngine:
         self.session_start_time = 0
         self.current_intensity_progress = 0.0
         self.bg_audio_accumulator = 0.0
-        self.last_heartbeat_time = time.time()
 
         self.paths = {
             "images": IMG_DIR,
@@ -138,7 +151,40 @@ class FlasherEngine:
         }
         for path in self.paths.values(): os.makedirs(path, exist_ok=True)
         self.media_queues = {'startle': [], 'flash': []}
+        # All per-event background work runs here instead of on fresh threads
+        self.worker_pool = WorkerPool(lambda: self.run_token)
+
+        # Media index: lookups are served from memory, probing runs off the Tk thread
+        self.media_index = MediaIndex(MEDIA_INDEX_FILE)
+        self.media_watcher = MediaWatcher(self.media_index, list(self.paths.values()),
+                                          on_change=self._on_media_change)
+        self.frame_cache = FrameCache(FRAME_CACHE_DIR, self.settings.get('frame_cache_disk_mb', 512))
+        frame_lru.set_budget(self.settings.get('frame_cache_mem_mb', 256))
+        self.process_decoder = ProcessDecoder(self.settings.get('decode_processes', 0))
+        self._decoding_keys = set()  # Cache keys being decoded; identical files wait instead of re-decoding
+        self._decoding_cond = threading.Condition()
+        self.soundtrack_cache = SoundtrackCache(AUDIO_CACHE_DIR)
+        self.video_proxies = ProxyStore(PROXY_DIR)
+        self._startle_pipeline = None  # Decoder + soundtrack being opened for the announced startle
+        self._named_timers = {}
+        # Periodic housekeeping; every subsystem idles (no wakeups) while nothing needs it
+        self.heartbeat = Heartbeat(self.event_scheduler)
+        self.heartbeat.add('xp', 1.0, self._tick_xp)
+        self.heartbeat.add('ramp', 1.0, self._tick_ramp)
+        self.heartbeat.add('visuals', 0.5, self._tick_visuals)
+        self.heartbeat.add('flash', 0.033, self._tick_flash)
+
+        # Daily time window: one scheduler event per start/stop transition
+        self.time_window = None
+        self._time_window_key = None
+        self._time_window_inside = None
+
+        self.esc_listener_active = True
+        self._start_services()
 
+    def _start_services(self):
+        """Audio device, media scan and watcher threads (skipped by the headless simulator)."""
+        threading.Thread(target=self._init_media_library, daemon=True).start()
         try:
             pygame.mixer.init(frequency=44100, size=-16, channels=8, buffer=4096)
             pygame.display.init()
@@ -149,13 +195,9 @@ class FlasherEngine:
         self.load_gj_sound()
 
         # Watchers
-        self.esc_listener_active = True
         self.esc_thread = threading.Thread(target=self._monitor_global_esc, daemon=True)
         self.esc_thread.start()
-        self.clock_monitor_thread = threading.Thread(target=self._monitor_time_schedule, daemon=True)
-        self.clock_monitor_thread.start()
-
-        self.heartbeat()
+        self._sync_time_schedule()
 
     def _monitor_global_esc(self):
         import ctypes
@@ -165,35 +207,35 @@ class FlasherEngine:
                 time.sleep(0.5)
             time.sleep(0.05)
 
-    def _monitor_time_schedule(self):
-        while True:
-            time.sleep(5)
-            if not self.settings.get('time_schedule_enabled', False): continue
-            now = datetime.datetime.now()
-            active_days = self.settings.get('active_weekdays', [0, 1, 2, 3, 4, 5, 6])
-
-            if now.weekday() not in active_days:
-                if self.running: self.root.after(0, self.stop)
-                continue
-
-            start_str = self.settings.get('time_start_str', "16:00")
-            end_str = self.settings.get('time_end_str', "18:00")
-            try:
-                t_start = datetime.datetime.strptime(start_str, "%H:%M").time()
-                t_end = datetime.datetime.strptime(end_str, "%H:%M").time()
-                current_time = now.time()
-                is_in_window = False
-                if t_start < t_end:
-                    is_in_window = t_start <= current_time < t_end
-                else:
-                    is_in_window = current_time >= t_start or current_time < t_end
-
-                if is_in_window and not self.running:
-                    self.root.after(0, lambda: self.start(is_startup=True))
-                elif not is_in_window and self.running:
-                    self.root.after(0, self.stop)
-            except ValueError:
-                pass
+    def _sync_time_schedule(self):
+        """Re-parse the time schedule; on a real change, apply it now and arm the next transition."""
+        window = DailyWindow.from_settings(self.settings)
+        key = window.key() if window else None
+        if key == self._time_window_key: return
+        self._time_window_key = key
+        self.time_window = window
+        self.event_scheduler.cancel_tag('clock')
+        if not window: return
+        now = datetime.datetime.now()
+        self._apply_time_window(window.contains(now))
+        self._arm_time_window(now)
+
+    def _arm_time_window(self, now):
+        transition = self.time_window.next_transition(now)
+        if transition is None: return  # Always or never inside the window
+        delay = min(seconds_until(transition[0]), MAX_SLEEP)
+        self.event_scheduler.call_later(delay, self._on_time_window_edge, tag='clock')
+
+    def _on_time_window_edge(self):
+        now = datetime.datetime.now()
+        inside = self.time_window.contains(now)
+        if inside != self._time_window_inside: self._apply_time_window(inside)
+        self._arm_time_window(now)
+
+    def _apply_time_window(self, inside):
+        self._time_window_inside = inside
+        if inside and not self.running: self.start(is_startup=True)
+        elif not inside and self.running: self.stop()
 
     def _handle_esc_press(self):
         if self.settings.get('disable_panic_esc', False): return
@@ -233,24 +275,35 @@ class FlasherEngine:
         for k in check_keys:
             if new_settings.get(k) != self.settings.get(k): needs_reschedule = True; break
         self.settings = new_settings
+        self.frame_cache.set_budget(self.settings.get('frame_cache_disk_mb', 512))
+        frame_lru.set_budget(self.settings.get('frame_cache_mem_mb', 256))
+        self.process_decoder.set_processes(self.settings.get('decode_processes', 0))
+        self.heartbeat.wake('visuals', 'ramp')
         if self.running and needs_reschedule: self.reschedule_timers()
+        self._sync_time_schedule()
 
     def reschedule_timers(self):
         if not self.running: return
         self.run_token += 1
+        self.event_scheduler.cancel_tag('trigger')
         if self.settings.get('flash_enabled', True): self.schedule_next("flash")
         if self.settings.get('startle_enabled'): self.schedule_next("startle")
         if self.settings.get('subliminal_enabled'): self.schedule_next("subliminal")
 
     def start(self, is_startup=False):
         if self.running: return
+        if self.time_window and not self.time_window.contains(datetime.datetime.now()):
+            logger.info("Not starting: outside the scheduled time window")
+            return
         self.running = True
         self.run_token += 1
+        self.event_scheduler.cancel_tag('trigger')
+        self.event_scheduler.cancel_tag('session')
         self.events_pending_reschedule.clear()
-        self.session_start_time = time.time()
+        self.session_start_time = self.event_scheduler.now()
         self.current_intensity_progress = 0.0
         self.bg_audio_accumulator = 0.0
-        self.last_heartbeat_time = time.time()
+        self.heartbeat.wake()
 
         # Check Unlocks Immediately
         lvl = self.settings.get('player_level', 1)
@@ -259,9 +312,9 @@ class FlasherEngine:
         delay_loops = 0
         if self.settings.get('force_startle_on_launch'):
             self.busy = True
-            self.root.after(5000, self._startup_startle_trigger)
-            delay_loops = 20000
-        self.root.after(delay_loops, self._start_loops)
+            self.event_scheduler.call_later(5.0, self._startup_startle_trigger, tag='session')
+            delay_loops = 20.0
+        self.event_scheduler.call_later(delay_loops, self._start_loops, tag='session')
 
     def get_effective_value(self, key, base_val=None):
         val = base_val if base_val is not None else self.settings.get(key)
@@ -296,7 +349,7 @@ class FlasherEngine:
             self.current_intensity_progress = 0.0
             return
         duration_sec = self.settings.get('scheduler_duration_min', 60) * 60
-        elapsed = time.time() - self.session_start_time
+        elapsed = self.event_scheduler.now() - self.session_start_time
         prog = elapsed / max(1, duration_sec)
         self.current_intensity_progress = min(1.0, max(0.0, prog))
 
@@ -319,6 +372,7 @@ class FlasherEngine:
     def stop(self):
         self.running = False
         self.ducker.unduck()
+        logger.debug(f"Frame LRU stats: {frame_lru.stats()}")
         self.root.after(0, self.panic_stop)
 
     def trigger_panic_from_window(self, event=None):
@@ -331,6 +385,9 @@ class FlasherEngine:
         self.running = False
         self.busy = False
         self.video_running = False
+        self.worker_pool.cancel_pending()
+        for tag in ('trigger', 'session', 'attention'): self.event_scheduler.cancel_tag(tag)
+        self._discard_startle_pipeline()
         try:
             pygame.mixer.stop()
         except pygame.error as e:
@@ -346,19 +403,11 @@ class FlasherEngine:
         except Exception as e:
             logger.debug(f"Could not pop bubbles: {e}")
 
-        for win in self.active_windows:
-            try:
-                win.destroy()
-            except tk.TclError:
-                pass  # Window already destroyed
+        for win in self.active_windows: win.destroy()
         self.active_windows.clear()
         self.active_rects.clear()
 
-        for t in self.active_floating_texts:
-            try:
-                t.destroy()
-            except tk.TclError:
-                pass  # Window already destroyed
+        for t in self.active_floating_texts: t.destroy()
         self.active_floating_texts.clear()
 
         # Shutdown progression visuals
@@ -375,62 +424,105 @@ class FlasherEngine:
         except (KeyError, AttributeError) as e:
             logger.debug(f"Could not reset resource manager: {e}")
 
-        if hasattr(self, 'cap') and self.cap: self.cap.release()
+        self._stop_video_decoder()
+        self._stop_video_audio()
         self.events_pending_reschedule.clear()
         self.strict_active = False
+        self.heartbeat.wake('visuals', 'ramp')  # Tear down overlays, reset the ramp, then idle
         try:
             self.root.deiconify()
             self.root.lift()
         except tk.TclError as e:
             logger.debug(f"Could not restore window: {e}")
 
+    def shutdown(self):
+        """Stop the session and every background watcher (app exit; the engine is not reused)."""
+        self.panic_stop()
+        self.esc_listener_active = False
+        self.media_watcher.stop()
+        self.event_scheduler.cancel_tag('clock')
+        self.process_decoder.shutdown()
+
     def schedule_next(self, event_type):
         if not self.running: return
         seconds = 10
         if event_type == "startle":
             base_freq = max(1, self.settings.get('startle_freq', 10))
             eff_freq = self.get_effective_value('startle_freq', base_freq)
-            seconds = int((60 / max(1, eff_freq)) * 60) + random.randint(-30, 30)
+            seconds = int((60 / max(1, eff_freq)) * 60) + self.rng.randint(-30, 30)
             seconds = max(5, seconds)
         elif event_type == "flash":
             # Use flash_freq (flashes per minute)
             base_freq = max(0.5, self.settings.get('flash_freq', 2))
             eff_freq = self.get_effective_value('flash_freq', base_freq)
             base = 60 / max(0.5, eff_freq)  # Seconds between flashes
-            seconds = base + random.uniform(-base * 0.3, base * 0.3)  # ±30% variance
+            seconds = base + self.rng.uniform(-base * 0.3, base * 0.3)  # ±30% variance
             seconds = max(3, seconds)  # Minimum 3 seconds
         elif event_type == "subliminal":
             base_freq = max(1, self.settings.get('subliminal_freq', 10))
             eff_freq = self.get_effective_value('subliminal_freq', base_freq)
             base = 60 / max(1, eff_freq)
-            seconds = base + random.uniform(-base * 0.2, base * 0.2)
+            seconds = base + self.rng.uniform(-base * 0.2, base * 0.2)
             seconds = max(1, seconds)
-        token_at_schedule = self.run_token
-        self.root.after(int(seconds * 1000), lambda: self._safe_trigger(event_type, token_at_schedule))
-
-    def _safe_trigger(self, event_type, token):
-        if token != self.run_token: return
-        self.trigger_event(event_type)
-
-    def get_files(self, folder):
-        valid_ext = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.mp4', '*.mov', '*.mp3', '*.wav']
-        files = []
-        if os.path.exists(folder):
-            for ext in valid_ext: files.extend(glob.glob(os.path.join(folder, ext)))
-        return files
-
-    def extract_audio_from_video(self, video_path):
-        try:
-            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-            cmd = [ffmpeg_exe, '-y', '-i', video_path, '-vn', '-acodec', 'pcm_s16le', '-ar', '44100', '-ac', '2',
-                   TEMP_AUDIO_FILE]
-            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            if os.path.exists(TEMP_AUDIO_FILE): return TEMP_AUDIO_FILE
-        except FileNotFoundError as e:
-            logger.warning(f"FFmpeg not found: {e}")
-        except subprocess.SubprocessError as e:
-            logger.warning(f"Audio extraction failed: {e}")
-        return None
+        # Reschedules cancel the pending trigger outright instead of leaving it to fire and bail out
+        self.event_scheduler.call_later(seconds, self.trigger_event, event_type, tag='trigger')
+        if event_type == "flash": self._prefetch_flash()
+
+    def _extend_timer(self, name, delay, fn, *args):
+        """Run fn once, at the latest deadline requested under name; earlier requests are superseded."""
+        current = self._named_timers.get(name)
+        due = self.event_scheduler.now() + delay
+        if current is not None and not current.cancelled and current.due >= due: return
+        self.event_scheduler.cancel(current)
+        self._named_timers[name] = self.event_scheduler.call_at(due, fn, *args)
+
+    def get_files(self, folder, unique=False):
+        return self.media_index.files(folder, unique=unique)
+
+    def _queue_files(self, folder):
+        """Files for a shuffle queue; byte-identical copies count once when dedupe_media is on."""
+        return self.get_files(folder, unique=self.settings.get('dedupe_media', True))
+
+    def _init_media_library(self):
+        # One full refresh at startup; after that only watcher deltas touch the index
+        self.media_index.refresh_all(self.paths.values())
+        dupes = self.media_index.duplicate_count(self.paths['images'])
+        if dupes: logger.info(f"Media index: {dupes} duplicate image(s) share a cache entry with an identical file")
+        # Soundtracks are extracted now, while nothing is playing, instead of during the pre-startle delay
+        videos = self.media_index.files(self.paths['startle_videos'])
+        self.soundtrack_cache.prune(videos)
+        self.soundtrack_cache.warm(videos)
+        self.media_watcher.start()
+
+    def _on_media_change(self, delta):
+        # Called on the watcher thread
+        if delta[0] != 'removed' and os.path.dirname(delta[-1]) == os.path.abspath(self.paths['startle_videos']):
+            self.soundtrack_cache.warm([delta[-1]])
+        self.root.after(0, lambda: self._apply_media_delta(delta))
+
+    def _apply_media_delta(self, delta):
+        """Patch the shuffled media queues in place for one add/remove/rename."""
+        action = delta[0]
+        queue_dirs = {'flash': self.paths['images'], 'startle': self.paths['startle_videos']}
+        for category, folder in queue_dirs.items():
+            queue = self.media_queues.get(category)
+            if not queue: continue  # Rebuilt from the index on next use
+            folder = os.path.abspath(folder)
+            if action == 'removed':
+                if delta[1] in queue: queue.remove(delta[1])
+            elif action == 'added':
+                if os.path.dirname(delta[1]) == folder and delta[1] not in queue:
+                    if self.settings.get('dedupe_media', True) and self.media_index.duplicate_of(delta[1]): continue
+                    queue.insert(self.rng.randint(0, len(queue)), delta[1])
+            elif action == 'renamed':
+                old, new = delta[1], delta[2]
+                in_folder = os.path.dirname(new) == folder
+                if old in queue:
+                    if in_folder: queue[queue.index(old)] = new
+                    else: queue.remove(old)
+                elif in_folder and new not in queue:
+                    queue.insert(self.rng.randint(0, len(queue)), new)
+        logger.debug(f"Media change applied: {delta}")
 
     def _do_duck(self):
         if self.settings.get('audio_ducking_enabled', True):
@@ -478,11 +570,7 @@ class FlasherEngine:
                 logger.debug(f"Could not stop mixer: {e}")
             
             # Clear any active flash windows immediately
-            for win in self.active_windows[:]:
-                try:
-                    win.destroy()
-                except tk.TclError:
-                    pass  # Already destroyed
+            for win in self.active_windows: win.destroy()
             self.active_windows.clear()
             self.active_rects.clear()
             
@@ -502,12 +590,14 @@ class FlasherEngine:
             is_strict = self.settings.get('startle_strict', False) or strict_override
             self.penalty_loop_count = 0
             
-            # Schedule the actual video prep after delay
-            self.root.after(4000, lambda: self._delayed_startle_prep(video_path, is_strict))
+            # Open the decoder, buffer the first second and ready the audio during the delay
+            self._new_startle_pipeline(video_path)
+            self.event_scheduler.call_later(4.0, self._delayed_startle_prep, video_path, is_strict)
             return
         else:
             if not self.settings.get('flash_enabled', True): return
             self.events_pending_reschedule.add(event_type)
+            self.heartbeat.wake('flash')
             if len(self.active_windows) > 0 or self.busy or self.video_running: return
             self.busy = True
 
@@ -517,9 +607,66 @@ class FlasherEngine:
     def _delayed_startle_prep(self, video_path, is_strict):
         """Called after 4 second delay to start video"""
         if not self.running:
+            self._discard_startle_pipeline()
             self.busy = False
             return
-        threading.Thread(target=self._prep_startle_video, args=(video_path, is_strict), daemon=True).start()
+        pipeline = self._startle_pipeline
+        if not pipeline or pipeline['video_path'] != video_path: pipeline = self._new_startle_pipeline(video_path)
+        self._startle_pipeline = None  # Owned by the player from here on
+
+        def cancelled():
+            self._close_startle_pipeline(pipeline)
+            self.root.after(0, self._release_busy)
+        self.worker_pool.submit(LANE_VIDEO, self._prep_startle_video, pipeline, is_strict, on_cancel=cancelled)
+
+    def _new_startle_pipeline(self, video_path):
+        """Start opening decoder and soundtrack for a video on a worker; returns the pipeline dict."""
+        self._discard_startle_pipeline()
+        pipeline = {'video_path': video_path, 'boxes': [(m['width'], m['height']) for m in self._get_monitors_safe()],
+                    'decoder': None, 'audio': None, 'ready': threading.Event(), 'discarded': False}
+        self._startle_pipeline = pipeline
+        self.worker_pool.submit(LANE_VIDEO, self._open_startle_pipeline, pipeline, on_cancel=pipeline['ready'].set)
+        return pipeline
+
+    def _open_startle_pipeline(self, pipeline):
+        video_path = pipeline['video_path']
+        try:
+            # Decoder: container probe, metadata and the first second of frames
+            decode_path = self.video_proxies.find(video_path) or video_path  # Proxy only if the source is unchanged
+            decoder = VideoDecoder(decode_path, pipeline['boxes'],
+                                   adaptive=self.settings.get('adaptive_video_quality', True))
+            if decoder.opened: decoder.start(preroll=DEFAULT_PREROLL)
+            pipeline['decoder'] = decoder
+
+            # Soundtrack: buffered but silent until the player starts it. The cached sidecar is
+            # cheaper to open; the video itself works too. Videos known to have no audio get none.
+            if self.soundtrack_cache.is_silent(video_path): return
+            audio_source = self.soundtrack_cache.get(video_path)
+            if not audio_source:
+                audio_source = video_path
+                self.soundtrack_cache.warm([video_path], urgent=True)  # Ready for a retry loop
+            vol = self.settings.get('volume', 1.0)
+            curved_vol = max(0.05, vol ** 1.5)  # Gentler curve, minimum 5%
+            channel = pygame.mixer.Channel(1)
+            channel.set_volume(curved_vol)
+            stream = AudioStream(audio_source, channel, curved_vol)
+            if stream.prepare(): pipeline['audio'] = stream
+        except pygame.error as e:
+            logger.warning(f"Could not prepare video audio: {e}")
+        except Exception as e:
+            logger.warning(f"Could not open startle video {os.path.basename(video_path)}: {e}")
+        finally:
+            pipeline['ready'].set()
+            if pipeline['discarded']: self._close_startle_pipeline(pipeline)
+
+    def _close_startle_pipeline(self, pipeline):
+        pipeline['discarded'] = True
+        if pipeline['decoder']: pipeline['decoder'].stop()
+        if pipeline['audio']: pipeline['audio'].stop()
+
+    def _discard_startle_pipeline(self):
+        pipeline, self._startle_pipeline = getattr(self, '_startle_pipeline', None), None
+        if pipeline: self._close_startle_pipeline(pipeline)
 
     def _flash_images(self):
         # Check if video is pending - if so, skip flash entirely
@@ -532,7 +679,7 @@ class FlasherEngine:
             if not resource_mgr.request_flash():
                 # Bubbles active, retry in 500ms
                 self.busy = False
-                self.root.after(500, self._retry_flash)
+                self.event_scheduler.call_later(0.5, self._retry_flash)
                 return
         except ImportError:
             pass  # Module not available
@@ -542,7 +689,7 @@ class FlasherEngine:
         media_pool = self.get_files(self.paths['images'])
         sound_pool = self.get_files(self.paths['sounds'])
         if not media_pool: self.busy = False; return
-        sound_path = random.choice(sound_pool) if sound_pool else None
+        sound_path = self.rng.choice(sound_pool) if sound_pool else None
         monitors = self._get_monitors_safe()
         
         # Use single sim_images value with small variance
@@ -562,7 +709,7 @@ class FlasherEngine:
         
         # Clamp base_images to max allowed
         base_images = min(base_images, max_allowed)
-        num_images = max(1, base_images + random.randint(-1, 1))  # ±1 variance
+        num_images = max(1, base_images + self.rng.randint(-1, 1))  # ±1 variance
         num_images = min(num_images, max_allowed)  # Cap at max allowed
         selected_images = []
         for _ in range(num_images):
@@ -570,8 +717,12 @@ class FlasherEngine:
             if img: selected_images.append(img)
         if not selected_images: self.busy = False; return
         base_scale = self.settings.get('image_scale', 1.0)
-        threading.Thread(target=self._background_loader,
-                         args=(selected_images, sound_path, False, False, monitors, base_scale), daemon=True).start()
+        self.worker_pool.submit(LANE_FLASH, self._background_loader,
+                                selected_images, sound_path, False, False, monitors, base_scale,
+                                on_cancel=lambda: self.root.after(0, self._release_busy))
+
+    def _release_busy(self):
+        if not self.video_running: self.busy = False
 
     def _retry_flash(self):
         """Retry flash after waiting for bubbles"""
@@ -581,7 +732,7 @@ class FlasherEngine:
             from progression_system import resource_mgr
             if resource_mgr.has_active_bubbles():
                 # Still bubbles, wait more
-                self.root.after(300, self._retry_flash)
+                self.event_scheduler.call_later(0.3, self._retry_flash)
                 return
             resource_mgr.flash_done_waiting()
         except ImportError:
@@ -593,20 +744,50 @@ class FlasherEngine:
 
     def get_next_media(self, category, folder_path):
         if not self.media_queues.get(category):
-            files = self.get_files(folder_path)
+            files = self._queue_files(folder_path)
             if not files: return None
-            random.shuffle(files)
+            self.rng.shuffle(files)
             self.media_queues[category] = files
         if self.media_queues[category]:
             item = self.media_queues[category].pop()
             return os.path.abspath(item)
         return None
 
+    def _peek_media(self, category, folder_path, count):
+        """Next `count` items get_next_media will return, topping up the queue if short."""
+        queue = self.media_queues.setdefault(category, [])
+        if len(queue) < count:
+            queued = set(queue)
+            files = [f for f in self._queue_files(folder_path) if f not in queued]
+            self.rng.shuffle(files)
+            queue[:0] = files  # Items are popped from the end; never queue a path twice
+        return [os.path.abspath(p) for p in reversed(queue[-count:])]
+
+    def _prefetch_flash(self):
+        """Decode the next flash batches into the frame LRU during the idle gap."""
+        batches = self.settings.get('flash_prefetch_batches', 2)
+        if batches <= 0 or not frame_lru.enabled or self.video_running: return
+        per_batch = min(max(1, self.settings.get('sim_images', 5)) + 1, 20)  # Upper end of the ±1 variance
+        upcoming = self._peek_media('flash', self.paths['images'], batches * per_batch)
+        if not upcoming: return
+        # One decode per distinct monitor size; the flash picks a monitor at random
+        monitors = list({(m['width'], m['height']): m for m in self._get_monitors_safe()}.values())
+        scale = self.settings.get('image_scale', 1.0)
+        # Replace any older lookahead; one job per file so real flashes can jump ahead
+        self.worker_pool.cancel_pending(LANE_PREFETCH)
+        for path in upcoming:
+            self.worker_pool.submit(LANE_PREFETCH, self._prefetch_worker, path, monitors, scale)
+
+    def _prefetch_worker(self, path, monitors, scale):
+        for mon in monitors:
+            if not self.running or self.video_running: return
+            self._load_flash_frames(path, mon, False, scale)
+
     def _flash_subliminal(self):
         pool = self.settings.get('subliminal_pool', {})
         active_subs = [text for text, active in pool.items() if active]
         if not active_subs: return
-        text_content = random.choice(active_subs)
+        text_content = self.rng.choice(active_subs)
         linked_audio_path = None
         clean_text = text_content.strip()
         for ext in ['.mp3', '.wav', '.ogg']:
@@ -626,11 +807,11 @@ class FlasherEngine:
                 chan.play(snd)
                 length = snd.get_length()
                 self._add_xp(1)
-                self.root.after(int(length * 1000) + 500, self.ducker.unduck)
+                self._extend_timer('unduck', length + 0.5, self.ducker.unduck)
             except pygame.error as e:
                 logger.debug(f"Could not play subliminal audio: {e}")
                 self.ducker.unduck()
-            self.root.after(300, lambda: self._show_subliminal_visuals(text_content))
+            self.event_scheduler.call_later(0.3, self._show_subliminal_visuals, text_content)
         else:
             self._show_subliminal_visuals(text_content)
 
@@ -639,57 +820,35 @@ class FlasherEngine:
         if duration_ms < 100: duration_ms = 100
         self._add_xp(1)
         target_opacity = self.settings.get('subliminal_opacity', 0.8)
-        TRANS_KEY = "#000001"
-        bg_color = self.settings.get("sub_bg_color", "#000000")
         is_bg_trans = self.settings.get("sub_bg_transparent", False)
-        txt_color = self.settings.get("sub_text_color", "#FF00FF")
+        bg = None if is_bg_trans else self.settings.get("sub_bg_color", "#000000")
         is_txt_trans = self.settings.get("sub_text_transparent", False)
+        # See-through text takes the background colour (a hole through it when that is see-through too)
+        fill = bg if is_txt_trans else self.settings.get("sub_text_color", "#FF00FF")
         border_color = self.settings.get("sub_border_color", "#FFFFFF")
-        final_bg = TRANS_KEY if is_bg_trans else bg_color
+        offsets = [(-2, -2), (2, -2), (-2, 2), (2, 2), (0, -3), (0, 3), (-3, 0), (3, 0)]
 
-        monitors = self._get_monitors_safe()
-        for m in monitors:
-            win = tk.Toplevel(self.root)
-            win.overrideredirect(True)
-            win.config(bg=final_bg)
-            win.geometry(f"{m['width']}x{m['height']}+{m['x']}+{m['y']}")
-            win.attributes('-topmost', True)
-            win.attributes('-alpha', 0.0)
-            win.wm_attributes("-transparentcolor", TRANS_KEY)
-            try:
-                hwnd = windll.user32.GetParent(win.winfo_id())
-                windll.user32.SetWindowLongW(hwnd, -20, 0x08000000 | 0x00000008)
-            except (OSError, AttributeError) as e:
-                logger.debug(f"Could not set window style: {e}")
-            canvas = tk.Canvas(win, bg=final_bg, width=m['width'], height=m['height'], highlightthickness=0)
-            canvas.pack(fill="both", expand=True)
-            cx, cy = m['width'] // 2, m['height'] // 2
-            font_spec = ("Arial", 120, "bold")
-            offsets = [(-2, -2), (2, -2), (-2, 2), (2, 2), (0, -3), (0, 3), (-3, 0), (3, 0)]
-            for ox, oy in offsets:
-                canvas.create_text(cx + ox, cy + oy, text=text_content, font=font_spec, fill=border_color,
-                                   justify="center")
-            if is_txt_trans:
-                canvas.create_text(cx, cy, text=text_content, font=font_spec, fill=final_bg, justify="center")
-            else:
-                canvas.create_text(cx, cy, text=text_content, font=font_spec, fill=txt_color, justify="center")
+        for m in self._get_monitors_safe():
+            win = self.render.create_text_surface(m['x'], m['y'], text_content, ("Arial", 120, "bold"), fill,
+                                                  bg=bg, outline=border_color, outline_offsets=offsets,
+                                                  size=(m['width'], m['height']), alpha=0.0)
             self._animate_fade(win, 0.0, target_opacity, 5, duration_ms)
 
     def _animate_fade(self, win, current, target, step_ms, hold_ms):
-        if not win.winfo_exists(): return
+        if win.destroyed: return
         if current < target:
             new_alpha = min(target, current + 0.1)
-            win.attributes('-alpha', new_alpha)
-            self.root.after(step_ms, lambda: self._animate_fade(win, new_alpha, target, step_ms, hold_ms))
+            win.set_alpha(new_alpha)
+            self.event_scheduler.call_later(step_ms / 1000, self._animate_fade, win, new_alpha, target, step_ms, hold_ms)
         else:
-            self.root.after(hold_ms, lambda: self._animate_fade_out(win, target, step_ms))
+            self.event_scheduler.call_later(hold_ms / 1000, self._animate_fade_out, win, target, step_ms)
 
     def _animate_fade_out(self, win, current, step_ms):
-        if not win.winfo_exists(): return
+        if win.destroyed: return
         if current > 0.0:
             new_alpha = max(0.0, current - 0.1)
-            win.attributes('-alpha', new_alpha)
-            self.root.after(step_ms, lambda: self._animate_fade_out(win, new_alpha, step_ms))
+            win.set_alpha(new_alpha)
+            self.event_scheduler.call_later(step_ms / 1000, self._animate_fade_out, win, new_alpha, step_ms)
         else:
             win.destroy()
 
@@ -713,37 +872,18 @@ class FlasherEngine:
                 return [monitors[0]]
         return monitors
 
-    def _apply_window_lock(self, win, is_strict):
-        try:
-            win.attributes("-toolwindow", 1)
-        except tk.TclError as e:
-            logger.debug(f"Could not set toolwindow: {e}")
-        if is_strict:
-            win.protocol("WM_DELETE_WINDOW", lambda: None)
-            win.bind('<Alt-F4>', lambda e: "break")
-            win.bind("<Tab>", lambda e: "break")
-            win.bind("<Alt-Tab>", lambda e: "break")
-            win.lift()
-            win.focus_force()
-        else:
-            try:
-                hwnd = windll.user32.GetParent(win.winfo_id())
-                windll.user32.SetWindowLongW(hwnd, -20, 0x08000000 | 0x00000008)
-            except (OSError, AttributeError) as e:
-                logger.debug(f"Could not set window style: {e}")
-
-    def _prep_startle_video(self, video_path, is_strict):
-        audio_path = self.extract_audio_from_video(video_path)
-        self.root.after(0, lambda: self._start_startle_player(video_path, audio_path, is_strict))
+    def _prep_startle_video(self, pipeline, is_strict):
+        # Normally already done during the pre-startle delay; this only waits on a cold start
+        pipeline['ready'].wait(10.0)
+        decoder = pipeline['decoder']
+        if decoder and decoder.opened: decoder.wait_ready(2.0)  # Frame 0 is on hand before the windows map
+        self.root.after(0, lambda: self._start_startle_player(pipeline, is_strict))
 
-    def _start_startle_player(self, video_path, audio_path, is_strict):
-        if not self.running: self.busy = False; return
+    def _start_startle_player(self, pipeline, is_strict):
+        if not self.running: self._close_startle_pipeline(pipeline); self.busy = False; return
+        video_path = pipeline['video_path']
         pygame.mixer.stop()
-        for win in list(self.active_windows):
-            try:
-                win.destroy()
-            except tk.TclError:
-                pass  # Window already destroyed
+        for win in self.active_windows: win.destroy()
         self.active_windows.clear()
         self.active_rects.clear()
         if is_strict:
@@ -775,22 +915,14 @@ class FlasherEngine:
         self.retry_video_path = None
         self._add_xp(50, is_video_context=True)
 
-        if audio_path and os.path.exists(audio_path):
-            try:
-                self.vid_sound = pygame.mixer.Sound(audio_path)
-                self.vid_channel = pygame.mixer.Channel(1)
-                vol = self.settings.get('volume', 1.0)
-                curved_vol = max(0.05, vol ** 1.5)  # Gentler curve, minimum 5%
-                self.vid_channel.set_volume(curved_vol)
-                self.vid_channel.play(self.vid_sound)
-            except pygame.error as e:
-                logger.warning(f"Could not play video audio: {e}")
-
-        self.cap = cv2.VideoCapture(video_path)
-        if not self.cap.isOpened(): self._cleanup_video(); return
+        # Decoder and soundtrack were opened and buffered on a worker during the lead-in
+        self.vid_audio = pipeline['audio']
+        self.video_decoder = pipeline['decoder']
+        if not self.video_decoder or not self.video_decoder.opened: self._cleanup_video(); return
+        monitors = self._get_monitors_safe()
 
-        self.video_fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
-        duration_sec = (self.cap.get(cv2.CAP_PROP_FRAME_COUNT) / self.video_fps)
+        self.video_fps = self.video_decoder.fps
+        duration_sec = self.video_decoder.duration
         self.current_video_duration = duration_sec
 
         if self.settings.get('attention_enabled', False):
@@ -799,26 +931,26 @@ class FlasherEngine:
             self.targets_total = count
             if count > 0:
                 safe_end = max(2.0, duration_sec - 5.0)
-                for _ in range(count): t = random.uniform(2.0, safe_end); self.attention_spawns.append(t)
+                for _ in range(count): t = self.rng.uniform(2.0, safe_end); self.attention_spawns.append(t)
                 self.attention_spawns.sort()
                 self.retry_video_path = video_path
 
         self.video_windows = []
-        monitors = self._get_monitors_safe()
+        self.video_surfaces = {}  # (width, height) box -> image handle reused for every frame
         for m in monitors:
-            win = tk.Toplevel(self.root)
-            win.overrideredirect(True)
-            win.config(bg='black')
-            win.geometry(f"{m['width']}x{m['height']}+{m['x']}+{m['y']}")
-            win.attributes('-topmost', True)
+            win = self.render.create_surface(m['x'], m['y'], m['width'], m['height'], locked=is_strict)
             win.is_locked_spot = True
-            self._apply_window_lock(win, is_strict)
-            lbl = tk.Label(win, bg='black', bd=0)
-            lbl.pack(expand=True, fill='both')
-            self.video_windows.append({"win": win, "lbl": lbl, "w": m['width'], "h": m['height']})
+            self.video_windows.append({"win": win, "w": m['width'], "h": m['height']})
             self.active_windows.append(win)
 
-        self.video_start_time = time.time()
+        # Frame 0 goes in before the windows are first drawn, then playback starts
+        first = self.video_decoder.peek()
+        if first: self._blit_video_frame(first)
+        self.video_decoder.end_preroll()
+        if self.vid_audio: self.vid_audio.play()
+        self.video_source_path = video_path
+        self.video_start_time = self.event_scheduler.now()
+        self.video_clock = PlaybackClock(self.vid_audio)  # Soundtrack is the master clock
         self.current_spot_strict = is_strict
         self._video_loop()
 
@@ -826,81 +958,62 @@ class FlasherEngine:
         if not self.video_running or not self.running: self._cleanup_video(); return
 
         if getattr(self, 'current_spot_strict', False) and self.video_windows:
-            try:
-                self.video_windows[0]['win'].focus_force()
-            except tk.TclError:
-                pass  # Window may be destroyed
+            self.video_windows[0]['win'].focus()
 
-        if self.active_floating_texts:
-            for t in self.active_floating_texts:
-                try:
-                    t.lift()
-                except tk.TclError:
-                    pass  # Window may be destroyed
+        for t in self.active_floating_texts: t.lift()
 
-        elapsed = time.time() - self.video_start_time
+        elapsed = self.video_clock.now()
         if elapsed > self.current_video_duration + 0.5: self._cleanup_video(); return
 
         if self.attention_spawns:
             if elapsed >= self.attention_spawns[0]: self._spawn_attention_target(); self.attention_spawns.pop(0)
 
-        target_frame_num = int(elapsed * self.video_fps)
-        current_frame_num = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
-        if current_frame_num < target_frame_num:
-            gap = target_frame_num - current_frame_num
-            if gap > 5:
-                self.cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame_num)
-            else:
-                for _ in range(gap): self.cap.grab()
-
-        ret, frame = self.cap.read()
-        if not ret or frame is None: self._cleanup_video(); return
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        last_dims = None
-        last_tk_img = None
-
-        for vw in self.video_windows:
+        # Only pick the decoded frame that is due; no new frame yet keeps the current one on screen
+        images = self.video_decoder.frame_for(elapsed)
+        if images is None:
+            if self.video_decoder.finished: self._cleanup_video(); return
+            self.event_scheduler.call_later(0.015, self._video_loop, tag='video')
+            return
+        self._blit_video_frame(images)
+        self.event_scheduler.call_later(0.015, self._video_loop, tag='video')
+
+    def _blit_video_frame(self, images):
+        # Image handles are updated in place and only rebuilt when the frame size changes.
+        # Monitors of the same size share one handle, so each distinct frame is pasted once.
+        start = time.perf_counter()
+        for box, arr in images.items():
             try:
-                tw, th = vw['w'], vw['h']
-                h, w = rgb_frame.shape[:2]
-                scale = min(tw / w, th / h)
-                nw, nh = int(w * scale), int(h * scale)
-
-                if (nw, nh) == last_dims and last_tk_img:
-                    tk_img = last_tk_img
-                else:
-                    resized = cv2.resize(rgb_frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
-                    img = Image.fromarray(resized)
-                    tk_img = ImageTk.PhotoImage(image=img)
-                    last_dims = (nw, nh)
-                    last_tk_img = tk_img
-                vw['lbl'].configure(image=tk_img)
-                vw['lbl'].image = tk_img
-            except (tk.TclError, cv2.error) as e:
+                previous = self.video_surfaces.get(box)
+                handle = self.render.make_image(arr, reuse=previous)
+                if handle is not previous:
+                    self.video_surfaces[box] = handle
+                    for vw in self.video_windows:
+                        if (vw['w'], vw['h']) == box: vw['win'].set_image(handle)
+            except tk.TclError as e:
+                self.video_decoder.telemetry.errors += 1
                 logger.debug(f"Video frame error: {e}")
-        self.root.after(15, self._video_loop)
+        self.video_decoder.record_blit(time.perf_counter() - start)
 
     def _spawn_attention_target(self):
         if not self.video_windows: return
         pool = self.settings.get('attention_pool', {})
         active_texts = [t for t, a in pool.items() if a]
-        text = random.choice(active_texts) if active_texts else "CLICK ME"
+        text = self.rng.choice(active_texts) if active_texts else "CLICK ME"
         try:
-            target_win_data = random.choice(self.video_windows)
+            target_win_data = self.rng.choice(self.video_windows)
         except IndexError:
             return
 
-        win_x = target_win_data['win'].winfo_x()
-        win_y = target_win_data['win'].winfo_y()
+        win_x = target_win_data['win'].x
+        win_y = target_win_data['win'].y
         w = target_win_data['w']
         h = target_win_data['h']
         size = self.settings.get('attention_size', 40)
         min_offset = 20
         safe_max_x = max(min_offset, w - int(size * 10))
         safe_max_y = max(min_offset, h - int(size * 3))
-        rx = win_x + random.randint(min_offset, safe_max_x)
-        ry = win_y + random.randint(min_offset, safe_max_y)
+        rx = win_x + self.rng.randint(min_offset, safe_max_x)
+        ry = win_y + self.rng.randint(min_offset, safe_max_y)
 
         def on_hit():
             self.targets_hit += 1
@@ -909,7 +1022,8 @@ class FlasherEngine:
             self._add_xp(5, is_video_context=True)
 
         try:
-            t_win = TransparentTextWindow(self.root, text, rx, ry, w, h, win_x, win_y, size, on_hit)
+            t_win = TransparentTextWindow(self.render, self.event_scheduler, text, rx, ry, w, h, win_x, win_y,
+                                          size, on_hit)
             self.active_floating_texts.append(t_win)
         except Exception as e:
             logger.debug(f"Could not create attention window: {e}")
@@ -920,16 +1034,31 @@ class FlasherEngine:
         def expire():
             if t_win in self.active_floating_texts:
                 self.active_floating_texts.remove(t_win)
-                try:
-                    t_win.destroy()
-                except tk.TclError:
-                    pass  # Already destroyed
-
-        self.root.after(int(lifespan_sec * 1000), expire)
+                t_win.destroy()
+
+        self.event_scheduler.call_later(lifespan_sec, expire, tag='attention')
+
+    def _stop_video_decoder(self):
+        decoder = getattr(self, 'video_decoder', None)
+        if decoder:
+            decoder.stop()
+            if decoder.telemetry.stages['blit'].count:  # Skip pipelines that never played
+                report = decoder.telemetry.build_report(getattr(self, 'video_source_path', decoder.path),
+                                                        decoder.fps, decoder.stats())
+                self.last_video_stats = report
+                logger.info(format_summary(report))
+                append_report(VIDEO_REPORT_FILE, report)
+        self.video_decoder = None
+
+    def _stop_video_audio(self):
+        stream = getattr(self, 'vid_audio', None)
+        if stream: stream.stop()
+        self.vid_audio = None
 
     def _cleanup_video(self):
         self.video_running = False
         self.busy = False
+        self.event_scheduler.cancel_tag('video')
         
         # Notify progression system that video ended
         try:
@@ -939,25 +1068,15 @@ class FlasherEngine:
         except Exception as e:
             logger.debug(f"Could not notify video end: {e}")
         
-        if hasattr(self, 'cap') and self.cap: self.cap.release()
-        for vw in self.video_windows:
-            try:
-                vw['win'].destroy()
-            except tk.TclError:
-                pass  # Already destroyed
+        self._stop_video_decoder()
+        for vw in self.video_windows: vw['win'].destroy()
+        self.active_windows = [w for w in self.active_windows if not getattr(w, 'is_locked_spot', False)]
         self.video_windows = []
-        for t in self.active_floating_texts:
-            try:
-                t.destroy()
-            except tk.TclError:
-                pass  # Already destroyed
+        self.heartbeat.wake('visuals', 'flash')
+        self.video_surfaces = {}
+        for t in self.active_floating_texts: t.destroy()
         self.active_floating_texts.clear()
-
-        if os.path.exists(TEMP_AUDIO_FILE):
-            try:
-                os.remove(TEMP_AUDIO_FILE)
-            except OSError as e:
-                logger.debug(f"Could not remove temp audio: {e}")
+        self._stop_video_audio()
 
         self.ducker.unduck()
         self._duck_subliminal_channel(False)
@@ -968,7 +1087,7 @@ class FlasherEngine:
             passed = (self.targets_total == 0) or (self.targets_hit >= self.targets_total)
             if not passed:
                 loop_needed = True
-            elif random.random() < 0.10:
+            elif self.rng.random() < 0.10:
                 loop_needed = True
                 is_troll_loop = True
             if passed:
@@ -995,7 +1114,7 @@ class FlasherEngine:
         if self.settings.get('startle_enabled'): self.schedule_next("startle")
         if self.settings.get('subliminal_enabled'): self.schedule_next("subliminal")
         if self.events_pending_reschedule:
-            for ev in list(self.events_pending_reschedule): self.schedule_next(ev)
+            for ev in sorted(self.events_pending_reschedule): self.schedule_next(ev)
             self.events_pending_reschedule.clear()
 
     def trigger_mercy_card(self):
@@ -1003,16 +1122,11 @@ class FlasherEngine:
         monitors = self._get_monitors_safe()
         mercy_wins = []
         for m in monitors:
-            win = tk.Toplevel(self.root)
-            win.overrideredirect(True)
-            win.config(bg='black')
-            win.geometry(f"{m['width']}x{m['height']}+{m['x']}+{m['y']}")
-            win.attributes('-topmost', True)
+            win = self.render.create_text_surface(m['x'], m['y'], "BAMBI IS SO DUMB\nBAMBI RESET\n DROP FOR COCK",
+                                                  ("Impact", 85, "bold"), "#FF00FF", bg="black",
+                                                  size=(m['width'], m['height']))
             win.lift()
-            win.focus_force()
-            lbl = tk.Label(win, text="BAMBI IS SO DUMB\nBAMBI RESET\n DROP FOR COCK", fg="#FF00FF", bg="black",
-                           font=("Impact", 85, "bold"))
-            lbl.pack(expand=True)
+            win.focus()
             mercy_wins.append(win)
 
         def finish_mercy():
@@ -1027,10 +1141,10 @@ class FlasherEngine:
             if self.settings.get('startle_enabled'): self.schedule_next("startle")
             if self.settings.get('subliminal_enabled'): self.schedule_next("subliminal")
             if self.events_pending_reschedule:
-                for ev in list(self.events_pending_reschedule): self.schedule_next(ev)
+                for ev in sorted(self.events_pending_reschedule): self.schedule_next(ev)
                 self.events_pending_reschedule.clear()
 
-        self.root.after(2500, finish_mercy)
+        self.event_scheduler.call_later(2.5, finish_mercy)
 
     def trigger_penalty_loop(self, is_troll=False):
         self._add_xp(20, is_video_context=True)
@@ -1050,22 +1164,17 @@ class FlasherEngine:
             msg = "WHAT A DUMB BAMBI\n DUMB BIMBOS MUST TRY AGAIN"
             f_size = 100
         for m in monitors:
-            win = tk.Toplevel(self.root)
-            win.overrideredirect(True)
-            win.config(bg='black')
-            win.geometry(f"{m['width']}x{m['height']}+{m['x']}+{m['y']}")
-            win.attributes('-topmost', True)
-            lbl = tk.Label(win, text=msg, fg="#FF00FF", bg="black", font=("Impact", f_size, "bold"))
-            lbl.pack(expand=True)
-            penalty_wins.append(win)
+            penalty_wins.append(self.render.create_text_surface(m['x'], m['y'], msg, ("Impact", f_size, "bold"),
+                                                                "#FF00FF", bg="black",
+                                                                size=(m['width'], m['height'])))
 
         def restart():
             for w in penalty_wins: w.destroy()
             is_strict = self.settings.get('startle_strict', False)
-            threading.Thread(target=self._prep_startle_video, args=(self.retry_video_path, is_strict),
-                             daemon=True).start()
+            self._delayed_startle_prep(self.retry_video_path, is_strict)
 
-        self.root.after(1500, restart)
+        self._new_startle_pipeline(self.retry_video_path)  # Reopen during the penalty screen
+        self.event_scheduler.call_later(1.5, restart)
 
     def on_image_click(self, win, is_startle, event_type):
         if hasattr(win, 'is_locked_spot') and win.is_locked_spot: return
@@ -1099,11 +1208,10 @@ class FlasherEngine:
         if num_to_spawn <= 0:
             return
         
-        selected = [random.choice(media_pool) for _ in range(num_to_spawn)]
+        selected = [self.rng.choice(media_pool) for _ in range(num_to_spawn)]
         monitors = self._get_monitors_safe()
         scale = self.settings.get('image_scale', 1.0)
-        threading.Thread(target=self._background_loader, args=(selected, None, is_startle, True, monitors, scale),
-                         daemon=True).start()
+        self.worker_pool.submit(LANE_HYDRA, self._background_loader, selected, None, is_startle, True, monitors, scale)
 
     def _is_overlapping(self, x, y, w, h, current_rects):
         for r in current_rects:
@@ -1118,23 +1226,26 @@ class FlasherEngine:
         ratio = min(base_w / orig_w, base_h / orig_h) * scale
         tgt_w, tgt_h = int(orig_w * ratio), int(orig_h * ratio)
         win_w, win_h = tgt_w, tgt_h
-        win_x = monitor['x'] + random.randint(0, max(0, monitor['width'] - win_w))
-        win_y = monitor['y'] + random.randint(0, max(0, monitor['height'] - win_h))
+        win_x, win_y = self._random_position(win_w, win_h, monitor)
         return win_x, win_y, win_w, win_h, tgt_w, tgt_h
 
+    def _random_position(self, w, h, monitor):
+        win_x = monitor['x'] + self.rng.randint(0, max(0, monitor['width'] - w))
+        win_y = monitor['y'] + self.rng.randint(0, max(0, monitor['height'] - h))
+        return win_x, win_y
+
     def _background_loader(self, media_paths, sound_path, is_startle, is_multiplication, monitors, scale):
         if not self.running: return
         try:
             processed_data = []
             for i, path in enumerate(media_paths):
-                raw_frames, delay = self._load_raw_frames(path)
-                if not raw_frames: continue
-                target_mon = random.choice(monitors)
-                wx, wy, ww, wh, tw, th = self._calculate_geometry(raw_frames[0].size[0], raw_frames[0].size[1],
-                                                                  target_mon, is_startle, scale)
-                resized = [rf.resize((max(1, tw), max(1, th)), Image.Resampling.LANCZOS) for rf in raw_frames]
+                target_mon = self.rng.choice(monitors)
+                packed = self._load_flash_frames(path, target_mon, is_startle, scale)
+                if packed is None: continue
+                ww, wh = packed.size
+                wx, wy = self._random_position(ww, wh, target_mon)
                 processed_data.append(
-                    {'frames': resized, 'delay': delay, 'x': wx, 'y': wy, 'w': ww, 'h': wh, 'monitor': target_mon,
+                    {'frames': packed, 'x': wx, 'y': wy, 'w': ww, 'h': wh, 'monitor': target_mon,
                      'is_startle': is_startle})
             payload = {"processed_data": processed_data, "sec_data": None, "sound_path": sound_path,
                        "is_multiplication": is_multiplication}
@@ -1143,31 +1254,49 @@ class FlasherEngine:
             logger.warning(f"Background loader error: {e}")
             if not is_multiplication: self.root.after(0, lambda: self.busy.__setattr__('busy', False))
 
-    def _load_raw_frames(self, path):
-        pil_images = []
-        delay = 0.033
+    def _load_flash_frames(self, path, monitor, is_startle, scale):
+        """PackedFrames resized for a monitor: memory LRU, then disk cache, then full decode."""
+        key = None
+        if frame_lru.enabled or self.frame_cache.enabled:
+            source_hash = self.media_index.content_hash(path)
+            if source_hash: key = make_cache_key(source_hash, monitor, scale)
+        if not key: return self._decode_flash(path, monitor, is_startle, scale)
+
+        with self._decoding_cond:
+            while key in self._decoding_keys: self._decoding_cond.wait()
+            self._decoding_keys.add(key)
         try:
-            frames_iter = iio.imiter(path)
-            try:
-                meta = iio.immeta(path)
-                duration = meta.get('duration', 0)
-                if duration > 0: delay = duration / 1000.0; delay = max(delay, 0.04)
-            except (KeyError, TypeError):
-                pass  # No duration metadata
-            raw_frames = []
-            for i, frame in enumerate(frames_iter):
-                if i > 60: break
-                raw_frames.append(frame)
-            step = 1
-            if len(raw_frames) > 60: step = len(raw_frames) // 60; delay *= step
-            for i in range(0, len(raw_frames), step): pil_images.append(Image.fromarray(raw_frames[i]))
-        except Exception as e:
-            logger.debug(f"Could not load animated frames: {e}")
-            try:
-                pil_images.append(Image.open(path))
-            except (IOError, OSError) as e:
-                logger.debug(f"Could not load image: {e}")
-        return pil_images, delay
+            cached = frame_lru.get(key)
+            if cached: return cached
+            cached = self.frame_cache.load(key)
+            if cached:
+                frame_lru.put(key, cached)
+                return cached
+            packed = self._decode_flash(path, monitor, is_startle, scale)
+            if packed is not None:
+                frame_lru.put(key, packed)
+                self.frame_cache.store(key, packed)
+            return packed
+        finally:
+            with self._decoding_cond:
+                self._decoding_keys.discard(key)
+                self._decoding_cond.notify_all()
+
+    def _decode_flash(self, path, monitor, is_startle, scale):
+        packed = self._decode_in_process_pool(path, monitor, is_startle, scale)
+        if packed is None:
+            # Target size is derived from the source size once the decoder has read it
+            target = lambda w, h: self._calculate_geometry(w, h, monitor, is_startle, scale)[4:6]
+            packed = decode_flash_frames(path, target)
+        return packed
+
+    def _decode_in_process_pool(self, path, monitor, is_startle, scale):
+        """Decode on the process backend when enabled and the index knows the source size."""
+        if not self.process_decoder.enabled: return None
+        entry = self.media_index.get(path)
+        if not entry or not entry.get('width') or not entry.get('height'): return None
+        _, _, _, _, tw, th = self._calculate_geometry(entry['width'], entry['height'], monitor, is_startle, scale)
+        return self.process_decoder.decode(path, tw, th, entry.get('frames') or 1)
 
     def _finalize_show_images(self, data):
         if not self.running:
@@ -1182,7 +1311,9 @@ class FlasherEngine:
         if data['sound_path']:
             try:
                 if data.get('processed_data') and data['processed_data'][0]['is_startle']:
-                    threading.Thread(target=self._delayed_audio_start, args=(data['sound_path'],)).start()
+                    sound_path = data['sound_path']
+                    self.event_scheduler.call_later(2.0, self.worker_pool.submit, LANE_FLASH,
+                                                    self._delayed_audio_start, sound_path)
                 else:
                     effect = pygame.mixer.Sound(data['sound_path'])
                     vol = self.settings.get('volume', 1.0)
@@ -1194,17 +1325,17 @@ class FlasherEngine:
             except Exception:
                 pass
         
-        # Schedule unduck after duration (sound length or default 5s)
-        unduck_delay = int(duration * 1000) + 1500
-        self.root.after(unduck_delay, self.ducker.unduck)
-        self.root.after(unduck_delay - 1000, lambda: self._duck_subliminal_channel(False))
+        # Schedule unduck after duration (sound length or default 5s); a later flash pushes it back
+        unduck_delay = duration + 1.5
+        self._extend_timer('unduck', unduck_delay, self.ducker.unduck)
+        self._extend_timer('sub_unduck', unduck_delay - 1.0, self._duck_subliminal_channel, False)
         
         # Force cleanup all flash windows 1 second after audio ends
         # This prevents hydra mode from spawning forever
-        cleanup_delay = int(duration * 1000) + 1000
-        self.root.after(cleanup_delay, self._force_flash_cleanup)
+        self._extend_timer('flash_cleanup', duration + 1.0, self._force_flash_cleanup)
         
-        self.virtual_end_time = time.time() + duration
+        self.virtual_end_time = self.event_scheduler.now() + duration
+        self.heartbeat.wake('flash')
         if not data['processed_data']:
             if not data['is_multiplication']: self.busy = False
             return
@@ -1217,12 +1348,11 @@ class FlasherEngine:
                 max_x, max_y = mon['width'] - it['w'], mon['height'] - it['h']
                 for _ in range(10):
                     if not self._is_overlapping(final_x, final_y, it['w'], it['h'], self.active_rects): break
-                    final_x = mon['x'] + random.randint(0, max(0, max_x))
-                    final_y = mon['y'] + random.randint(0, max(0, max_y))
-                self._spawn_window_final(final_x, final_y, it['w'], it['h'],
-                                         [ImageTk.PhotoImage(img) for img in it['frames']], it['delay'], False, False)
+                    final_x = mon['x'] + self.rng.randint(0, max(0, max_x))
+                    final_y = mon['y'] + self.rng.randint(0, max(0, max_y))
+                self._spawn_window_final(final_x, final_y, it['w'], it['h'], it['frames'], False, False)
 
-            self.root.after(delay_ms, spawn_later)
+            self.event_scheduler.call_later(delay_ms / 1000, spawn_later)
         if not data['is_multiplication']: self.busy = False
     
     def _force_flash_cleanup(self):
@@ -1230,17 +1360,17 @@ class FlasherEngine:
         if not self.running:
             return
         # Set virtual_end_time to now to trigger fade out
-        self.virtual_end_time = time.time()
+        self.virtual_end_time = self.event_scheduler.now()
+        self.heartbeat.wake('flash')
         # Disable hydra spawning temporarily by marking cleanup in progress
         self._cleanup_in_progress = True
         
         # Schedule re-enabling after windows fade out
         def re_enable():
             self._cleanup_in_progress = False
-        self.root.after(2000, re_enable)
+        self.event_scheduler.call_later(2.0, re_enable)
 
     def _delayed_audio_start(self, sound_path):
-        time.sleep(2.0)
         if self.running:
             try:
                 effect = pygame.mixer.Sound(sound_path)
@@ -1249,33 +1379,26 @@ class FlasherEngine:
                 effect.set_volume(curved_vol)
                 effect.play()
                 duration = effect.get_length()
-                self.root.after(int(duration * 1000) + 1500, self.ducker.unduck)
+                # Worker thread: hand the timer to the Tk thread, which owns the scheduler
+                self.root.after(0, self._extend_timer, 'unduck', duration + 1.5, self.ducker.unduck)
             except pygame.error as e:
                 logger.debug(f"Could not play delayed audio: {e}")
                 self.root.after(0, self.ducker.unduck)
 
-    def _spawn_window_final(self, x, y, w, h, tk_frames, delay, is_startle, is_secondary):
+    def _spawn_window_final(self, x, y, w, h, packed, is_startle, is_secondary):
         if not self.running: return
-        win = tk.Toplevel(self.root)
-        win.overrideredirect(True)
-        win.attributes('-topmost', True)
-        win.config(bg='black')
-        win.geometry(f"{w}x{h}+{x}+{y}")
-        win.attributes('-alpha', 0.0)
-        self._apply_window_lock(win, False)
-        if self.settings.get('flash_clickable', True):
-            win.config(cursor="hand2")
-        else:
-            win.config(cursor="X_cursor")
+        cursor = "hand2" if self.settings.get('flash_clickable', True) else "X_cursor"
+        win = self.render.create_surface(x, y, w, h, alpha=0.0, cursor=cursor,
+                                         on_click=lambda surface: self.on_image_click(surface, False, None))
         self._add_xp(1)
-        lbl = tk.Label(win, bg='black', bd=0)
-        lbl.pack(expand=True, fill='both')
-        lbl.bind('<Button-1>', lambda e: self.on_image_click(win, False, None))
-        win.frames = tk_frames
-        win.frame_delay = delay
-        win.start_time = time.time()
+        # The surface keeps one image; animation pastes frames from the shared buffer into it
+        win.set_image(packed.frame(0))
+        win.frames = packed
+        win.frame_index = 0
+        win.start_time = self.event_scheduler.now()
         self.active_windows.append(win)
         self.active_rects.append({'win': win, 'x': x, 'y': y, 'w': w, 'h': h})
+        self.heartbeat.wake('flash')
 
     def _add_xp(self, base_points, is_video_context=False):
         multiplier = 1.0
@@ -1305,6 +1428,7 @@ class FlasherEngine:
 
         if leveled_up:
             self.progression.check_unlocks(current_level)
+            self.heartbeat.wake('visuals')
             self._play_levelup_sound()
     
     def _play_levelup_sound(self):
@@ -1328,112 +1452,116 @@ class FlasherEngine:
             progress = xp / req
             self.xp_update_callback(lvl, progress, xp, req)
 
-    def heartbeat(self):
-        now = time.time()
-        dt = now - self.last_heartbeat_time
-        self.last_heartbeat_time = now
+    # =========================================================================
+    # HEARTBEAT SUBSYSTEMS
+    # Each returns True to keep ticking; woken by the events that make it relevant
+    # =========================================================================
+
+    def _tick_xp(self, dt):
+        if not self.running: return False
 
         # --- Base XP Accumulation: 5 XP/min when running ---
-        if self.running:
-            self.bg_audio_accumulator += dt
-            # 5 XP per minute = 1 XP every 12 seconds
-            if self.bg_audio_accumulator >= 12.0:
-                self.bg_audio_accumulator -= 12.0
-                self._add_xp(1)
+        self.bg_audio_accumulator += dt
+        # 5 XP per minute = 1 XP every 12 seconds
+        if self.bg_audio_accumulator >= 12.0:
+            self.bg_audio_accumulator -= 12.0
+            self._add_xp(1)
 
         # --- Spiral XP Bonus: 5 XP/min if opacity > 3% ---
-        if self.running and self.settings.get("spiral_enabled"):
+        if self.settings.get("spiral_enabled"):
             op = self.settings.get("spiral_opacity", 0.1)
             if self.settings.get("spiral_link_ramp"):
                 op += (self.current_intensity_progress * 0.4)
-            if op >= 0.03:
+            if op >= 0.03 and dt > 0:
                 self._add_xp(0.083 * dt)  # 5/60 = 0.083 XP per second
 
         # --- Pink Filter XP Bonus: 5 XP/min if opacity > 5% ---
-        if self.running and self.settings.get("pink_filter_enabled"):
+        if self.settings.get("pink_filter_enabled"):
             pf_op = self.settings.get("pink_filter_opacity", 0.1)
             if self.settings.get("pink_filter_link_ramp"):
                 pf_op += (self.current_intensity_progress * 0.4)
-            if pf_op >= 0.05:
+            if pf_op >= 0.05 and dt > 0:
                 self._add_xp(0.083 * dt)  # 5/60 = 0.083 XP per second
+        return True
+
+    def _tick_ramp(self, dt):
+        try:
+            self._update_scheduler_progress()
+        except Exception as e:
+            logger.debug(f"Could not update scheduler: {e}")
+        return self.running and self.settings.get('scheduler_enabled', False)
 
+    def _tick_visuals(self, dt):
         # --- Progression Visuals (Spiral, Pink Filter & Bubbles) ---
-        if self.running:
-            try:
-                # Calculate pink opacity
-                pink_op = 0.0
-                if self.settings.get("pink_filter_enabled"):
-                    pink_op = self.settings.get("pink_filter_opacity", 0.1)
-                    if self.settings.get("pink_filter_link_ramp"):
-                        pink_op += (self.current_intensity_progress * 0.4)
-                        pink_op = min(0.5, pink_op)  # Cap at 50%
-
-                # Update all progression visuals
-                self.progression.update_visuals(pink_opacity=pink_op)
-            except Exception as e:
-                logger.debug(f"Could not update progression visuals: {e}")
-        else:
+        if not self.running:
             try:
                 self.progression.shutdown()
             except AttributeError:
                 pass  # Progression not initialized
-
+            return False
+        if self.video_running: return False  # Effects are paused; _cleanup_video wakes this again
         try:
-            self._update_scheduler_progress()
+            # Calculate pink opacity
+            pink_op = 0.0
+            if self.settings.get("pink_filter_enabled"):
+                pink_op = self.settings.get("pink_filter_opacity", 0.1)
+                if self.settings.get("pink_filter_link_ramp"):
+                    pink_op += (self.current_intensity_progress * 0.4)
+                    pink_op = min(0.5, pink_op)  # Cap at 50%
+
+            # Update all progression visuals
+            self.progression.update_visuals(pink_opacity=pink_op)
         except Exception as e:
-            logger.debug(f"Could not update scheduler: {e}")
+            logger.debug(f"Could not update progression visuals: {e}")
+        return True
 
-        if self.video_running:
-            self.root.after(100, self.heartbeat)
-            return
+    def _tick_flash(self, dt):
+        if self.video_running: return False  # _cleanup_video wakes this again
 
         # --- Standard Image Flashing Logic ---
         max_alpha = self.get_effective_value('image_alpha', self.settings.get('image_alpha', 1.0))
         max_alpha = min(1.0, max(0.0, max_alpha))
-        show_images = time.time() < self.virtual_end_time
+        now = self.event_scheduler.now()
+        show_images = now < self.virtual_end_time
         target_alpha_val = max_alpha if show_images else 0.0
 
-        # Sync flash count with resource manager
-        try:
-            from progression_system import resource_mgr
-            current_flash_count = len([w for w in self.active_windows if not getattr(w, 'is_locked_spot', False)])
-            resource_mgr.active_effects['flashes'] = current_flash_count
-        except ImportError:
-            pass  # Module not available
-        except (KeyError, AttributeError) as e:
-            logger.debug(f"Could not sync flash count: {e}")
-
         if not show_images and not self.active_windows:
             self.active_rects.clear()
             if self.events_pending_reschedule:
-                for ev in list(self.events_pending_reschedule):
+                for ev in sorted(self.events_pending_reschedule):
                     self.schedule_next(ev)
                 self.events_pending_reschedule.clear()
 
+        # Alpha is mirrored on the surface, so steady windows cost no window-system call
         for win in self.active_windows[:]:
-            if not win.winfo_exists():
-                self.active_windows.remove(win)
-                continue
             if hasattr(win, 'is_locked_spot'):
                 continue
-            try:
-                cur = win.attributes('-alpha')
-                if target_alpha_val > cur:
-                    win.attributes('-alpha', min(target_alpha_val, cur + 0.08))
-                elif target_alpha_val < cur:
-                    new_a = max(0.0, cur - 0.08)
-                    win.attributes('-alpha', new_a)
-                    if new_a == 0.0:
-                        win.destroy()
-                        self.active_windows.remove(win)
-                        self.active_rects = [r for r in self.active_rects if r['win'] != win]
-            except tk.TclError:
-                pass  # Window may be destroyed
-            if hasattr(win, 'frames') and len(win.frames) > 1:
-                now = time.time()
-                idx = int((now - win.start_time) / win.frame_delay) % len(win.frames)
-                try:
-                    win.winfo_children()[0].configure(image=win.frames[idx])
-                except (tk.TclError, IndexError):
-                    pass  # Window or frame may be gone
-        self.root.after(33, self.heartbeat)
\ No newline at end of file
+            cur = win.alpha
+            if target_alpha_val > cur:
+                win.set_alpha(min(target_alpha_val, cur + 0.08))
+            elif target_alpha_val < cur:
+                win.set_alpha(max(0.0, cur - 0.08))
+                if win.alpha == 0.0: win.destroy()
+            if win.destroyed:
+                # Faded out, or closed behind our back
+                self.active_windows.remove(win)
+                self.active_rects = [r for r in self.active_rects if r['win'] != win]
+                continue
+            if len(win.frames) > 1:
+                idx = int((now - win.start_time) / win.frames.delay) % len(win.frames)
+                if idx != win.frame_index:
+                    win.frame_index = idx
+                    win.set_image(win.frames.frame(idx))
+
+        # Sync flash count with resource manager
+        current_flash_count = len([w for w in self.active_windows if not getattr(w, 'is_locked_spot', False)])
+        try:
+            from progression_system import resource_mgr
+            if resource_mgr.active_effects['flashes'] != current_flash_count:
+                resource_mgr.active_effects['flashes'] = current_flash_count
+        except ImportError:
+            pass  # Module not available
+        except (KeyError, AttributeError) as e:
+            logger.debug(f"Could not sync flash count: {e}")
+
+        return show_images or bool(current_flash_count) or bool(self.events_pending_reschedule)
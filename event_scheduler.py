@@ -0,0 +1,326 @@
+"""
+Event Scheduler Module for Conditioning Control Panel
+======================================================
+Provides:
+- One priority queue (binary heap) of timed engine events
+- Real cancellation, by handle or by tag, so a cancelled event never
+  wakes anything up
+- A single Tk timer armed for the earliest live event
+- Pluggable clocks: the monotonic wall clock, or a virtual clock that is
+  advanced by hand to drive a whole session headless
+"""
+
+import time
+import heapq
+import itertools
+from tkinter import TclError
+from typing import Callable, Dict, Optional, Set
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+
+COMPACT_MIN_SIZE = 64  # Heap size below which cancelled entries are never swept
+
+
+# =============================================================================
+# CLOCKS
+# =============================================================================
+
+class MonotonicClock:
+    """Real time, immune to wall-clock changes."""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+
+class VirtualClock:
+    """Time that only moves when told to (headless runs and benchmarks)."""
+
+    def __init__(self, start: float = 0.0):
+        self.t = start
+
+    def now(self) -> float:
+        return self.t
+
+    def set(self, t: float):
+        """Move the clock forward to t (it never runs backwards)."""
+        if t > self.t:
+            self.t = t
+
+
+# =============================================================================
+# SCHEDULER
+# =============================================================================
+
+class ScheduledEvent:
+    """Handle for one scheduled callback."""
+
+    __slots__ = ('due', 'fn', 'args', 'tag', 'cancelled')
+
+    def __init__(self, due: float, fn: Callable, args: tuple, tag: Optional[str]):
+        self.due = due
+        self.fn = fn
+        self.args = args
+        self.tag = tag
+        self.cancelled = False
+
+
+class EventScheduler:
+    """
+    Heap-ordered timer queue for the engine.
+
+    Events live in a heap keyed by (due time, insertion order), so events
+    due at the same instant run in the order they were scheduled. Cancelled
+    events are marked and skipped when they reach the top of the heap; the
+    heap is swept once cancelled entries outnumber live ones.
+
+    With a Tk root the scheduler keeps exactly one `after` timer, armed
+    for the earliest live event and re-armed whenever that changes, so
+    cancelled or superseded events cost no wakeup. Without a root nothing
+    runs on its own: call run_due() from your own loop, or advance() with a
+    VirtualClock.
+
+    Not thread-safe: schedule and cancel from the Tk thread only (worker
+    threads hand results over with root.after(0, ...) as before).
+    """
+
+    def __init__(self, root=None, clock=None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            root: Tk root to arm timers on, or None to drive it manually
+            clock: Object with now() -> seconds (default: MonotonicClock)
+        """
+        self.root = root
+        self.clock = clock or MonotonicClock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._tags: Dict[str, Set[ScheduledEvent]] = {}
+        self._live = 0
+        self._after_id = None
+        self._armed_for = None
+        self._dispatching = False  # Re-arming waits until run_due() is done
+        # Counters
+        self.fired = 0
+        self.cancelled = 0
+
+    def now(self) -> float:
+        """Current time on the scheduler's clock."""
+        return self.clock.now()
+
+    def call_later(self, delay: float, fn: Callable, *args, tag: Optional[str] = None) -> ScheduledEvent:
+        """
+        Schedule fn(*args) after a delay.
+
+        Args:
+            delay: Seconds from now (negative counts as 0)
+            fn: Callback
+            *args: Callback arguments
+            tag: Group name for cancel_tag()
+
+        Returns:
+            Event handle for cancel()
+        """
+        return self.call_at(self.clock.now() + max(0.0, delay), fn, *args, tag=tag)
+
+    def call_at(self, due: float, fn: Callable, *args, tag: Optional[str] = None) -> ScheduledEvent:
+        """
+        Schedule fn(*args) at an absolute time on the scheduler's clock.
+
+        Args:
+            due: Time to run at
+            fn: Callback
+            *args: Callback arguments
+            tag: Group name for cancel_tag()
+
+        Returns:
+            Event handle for cancel()
+        """
+        event = ScheduledEvent(due, fn, args, tag)
+        heapq.heappush(self._heap, (due, next(self._seq), event))
+        self._live += 1
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(event)
+        self._arm()
+        return event
+
+    def cancel(self, event: Optional[ScheduledEvent]) -> bool:
+        """
+        Cancel one event.
+
+        Args:
+            event: Handle from call_later/call_at (None is ignored)
+
+        Returns:
+            True if the event was still pending
+        """
+        if event is None or not self._retire(event):
+            return False
+        self._compact()
+        self._arm()
+        return True
+
+    def cancel_tag(self, tag: str) -> int:
+        """
+        Cancel every pending event with a tag.
+
+        Args:
+            tag: Group name given when scheduling
+
+        Returns:
+            Number of events cancelled
+        """
+        events = self._tags.pop(tag, None)
+        if not events:
+            return 0
+        count = sum(self._retire(event) for event in list(events))
+        self._compact()
+        self._arm()
+        return count
+
+    def cancel_all(self) -> int:
+        """Cancel everything. Returns the number of events cancelled."""
+        count = self._live
+        for _, _, event in self._heap:
+            event.cancelled = True
+        self.cancelled += count
+        self._heap.clear()
+        self._tags.clear()
+        self._live = 0
+        self._arm()
+        return count
+
+    def pending(self, tag: Optional[str] = None) -> int:
+        """Number of live events, optionally only those with a tag."""
+        if tag is None:
+            return self._live
+        return len(self._tags.get(tag, ()))
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest live event, or None if nothing is scheduled."""
+        heap = self._heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def run_due(self) -> int:
+        """
+        Run every event that is due now.
+
+        Events scheduled by a callback run in a later pass even if they are
+        already due, so a zero-delay reschedule cannot starve the caller.
+
+        Returns:
+            Number of callbacks run
+        """
+        now = self.clock.now()
+        horizon = next(self._seq)
+        ran = 0
+        self._dispatching = True
+        try:
+            # self._heap is re-read every pass: a callback's cancel() may compact it
+            while self._heap and self._heap[0][0] <= now and self._heap[0][1] < horizon:
+                _, _, event = heapq.heappop(self._heap)
+                if event.cancelled:
+                    continue
+                event.cancelled = True  # Fired; a late cancel() is a no-op
+                self._live -= 1
+                self._untag(event)
+                self.fired += 1
+                ran += 1
+                try:
+                    event.fn(*event.args)
+                except Exception as e:
+                    logger.error(f"Scheduled event {getattr(event.fn, '__name__', event.fn)} failed: {e}",
+                                 exc_info=True)
+        finally:
+            self._dispatching = False
+        self._arm()
+        return ran
+
+    def advance(self, seconds: float) -> int:
+        """
+        Move a VirtualClock forward, running events at their exact due times.
+
+        Args:
+            seconds: Simulated time to run for
+
+        Returns:
+            Number of callbacks run
+        """
+        if not isinstance(self.clock, VirtualClock):
+            raise TypeError("advance() needs a VirtualClock")
+        end = self.clock.now() + seconds
+        ran = 0
+        while True:
+            due = self.next_due()
+            if due is None or due > end:
+                break
+            self.clock.set(due)
+            ran += self.run_due()
+        self.clock.set(end)
+        return ran
+
+    def stats(self) -> dict:
+        """
+        Get scheduler counters.
+
+        Returns:
+            Dictionary with pending, fired and cancelled counts and heap size
+        """
+        return {'pending': self._live, 'fired': self.fired, 'cancelled': self.cancelled,
+                'heap': len(self._heap)}
+
+    def _retire(self, event: ScheduledEvent) -> bool:
+        if event.cancelled:
+            return False
+        event.cancelled = True
+        self._live -= 1
+        self.cancelled += 1
+        self._untag(event)
+        return True
+
+    def _untag(self, event: ScheduledEvent):
+        group = self._tags.get(event.tag) if event.tag is not None else None
+        if group is not None:
+            group.discard(event)
+            if not group:
+                del self._tags[event.tag]
+
+    def _compact(self):
+        if len(self._heap) >= COMPACT_MIN_SIZE and len(self._heap) > 2 * self._live:
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+
+    def _arm(self):
+        """Keep the one Tk timer pointed at the earliest live event."""
+        if self.root is None or self._dispatching:
+            return
+        due = self.next_due()
+        if due == self._armed_for:
+            return
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except TclError:
+                pass  # Root already destroyed
+            self._after_id = None
+        self._armed_for = due
+        if due is None:
+            return
+        delay_ms = max(0, int((due - self.clock.now()) * 1000 + 0.999))
+        try:
+            self._after_id = self.root.after(delay_ms, self._on_timer)
+        except TclError as e:
+            logger.debug(f"Could not arm scheduler timer: {e}")
+
+    def _on_timer(self):
+        self._after_id = None
+        self._armed_for = None
+        self.run_due()
@@ -0,0 +1,324 @@
+"""
+Frame Cache Module for Conditioning Control Panel
+==================================================
+Provides:
+- Persistent on-disk cache of pre-resized flash frames
+- Keys built from source content hash, monitor size bucket and image scale
+- Background writer so storing never delays a flash
+- Size-capped pruning (oldest entries evicted first)
+- Process-wide, byte-budgeted in-memory LRU of decoded frame sets
+"""
+
+import os
+import queue
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from frame_decoder import PackedFrames, DEFAULT_DELAY, flatten_rgb
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+
+# WebP keeps animated frames plus per-frame durations in one compact file
+CACHE_EXT = ".webp"
+CACHE_FORMAT_VERSION = 2  # Bumped when cached pixels change (v2: transparency flattened onto black)
+WEBP_QUALITY = 90
+
+
+def make_cache_key(source_hash: str, monitor: dict, scale: float) -> str:
+    """
+    Build the cache key for one source file rendered onto one monitor size.
+
+    The flash target box is 40% of the monitor times image_scale, so the
+    monitor resolution (the size bucket) and scale fully determine the
+    resized output for a given source.
+
+    Args:
+        source_hash: Content digest of the source file
+        monitor: Monitor dict with 'width' and 'height'
+        scale: image_scale setting
+
+    Returns:
+        Filesystem-safe key string
+    """
+    return (f"{source_hash}_{monitor['width']}x{monitor['height']}_s{int(round(scale * 100))}"
+            f"_v{CACHE_FORMAT_VERSION}")
+
+
+class FrameCache:
+    """
+    Disk cache of resized flash frames.
+
+    Frames are stored as (animated) WebP. Loading a hit skips both the
+    source decode and the LANCZOS resample; it only decodes the small
+    already-sized WebP.
+    """
+
+    def __init__(self, cache_dir: str, max_mb: int = 512):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory the cache files live in
+            max_mb: Disk budget in megabytes (0 disables the cache)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max(0, int(max_mb)) * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None  # Computed lazily on the writer thread
+        self._pending = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def set_budget(self, max_mb: int):
+        """
+        Change the disk budget.
+
+        Args:
+            max_mb: Disk budget in megabytes (0 disables the cache)
+        """
+        self.max_bytes = max(0, int(max_mb)) * 1024 * 1024
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_EXT)
+
+    def load(self, key: str) -> Optional[PackedFrames]:
+        """
+        Load cached frames.
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            PackedFrames, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        path = self._path_for(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            with Image.open(path) as img:
+                delay_ms = img.info.get('duration', 0) or 0
+                array = np.stack([np.asarray(flatten_rgb(f)) for f in ImageSequence.Iterator(img)])
+            os.utime(path)  # Mark as recently used for pruning
+        except (IOError, OSError, ValueError) as e:
+            logger.debug(f"Discarding unreadable frame cache entry {key}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.misses += 1
+            return None
+        self.hits += 1
+        delay = delay_ms / 1000.0 if delay_ms > 0 else DEFAULT_DELAY
+        return PackedFrames(array, delay)
+
+    def store(self, key: str, packed: PackedFrames):
+        """
+        Queue frames to be written to the cache.
+
+        Args:
+            key: Cache key from make_cache_key
+            packed: Resized frames (shared, never mutated)
+        """
+        if not self.enabled or packed is None:
+            return
+        self._pending.put((key, packed))
+
+    def _writer_loop(self):
+        while True:
+            key, packed = self._pending.get()
+            try:
+                self._write(key, packed)
+            except Exception as e:
+                logger.debug(f"Could not write frame cache entry {key}: {e}")
+
+    def _write(self, key: str, packed: PackedFrames):
+        path = self._path_for(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        first = packed.frame(0)
+        save_kwargs = {'format': 'WEBP', 'quality': WEBP_QUALITY, 'method': 4}
+        if len(packed) > 1:
+            save_kwargs.update(save_all=True, append_images=[packed.frame(i) for i in range(1, len(packed))],
+                               duration=max(1, int(packed.delay * 1000)), loop=0)
+        first.save(tmp_path, **save_kwargs)
+        os.replace(tmp_path, path)
+
+        if self._total_bytes is None:
+            self._total_bytes = self._scan_size()
+        else:
+            self._total_bytes += os.path.getsize(path)
+        if self._total_bytes > self.max_bytes:
+            self._prune()
+
+    def _scan_size(self) -> int:
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for de in it:
+                    if de.name.endswith(CACHE_EXT):
+                        total += de.stat().st_size
+        except OSError:
+            pass
+        return total
+
+    def _prune(self):
+        """Delete least recently used entries until under 90% of budget."""
+        try:
+            with os.scandir(self.cache_dir) as it:
+                files = [(de.stat().st_mtime, de.stat().st_size, de.path)
+                         for de in it if de.name.endswith(CACHE_EXT)]
+        except OSError as e:
+            logger.debug(f"Could not scan frame cache: {e}")
+            return
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        self._total_bytes = total
+        logger.debug(f"Frame cache pruned {removed} entries ({total // 1024} KB left)")
+
+
+# =============================================================================
+# IN-MEMORY LRU
+# =============================================================================
+
+class FrameLRU:
+    """
+    Byte-budgeted LRU of decoded, resized frame sets.
+
+    Shared by every flash path (regular flashes, hydra multiplication) so a
+    small rotating library is decoded once and then served from memory.
+    """
+
+    def __init__(self, max_mb: int = 256):
+        """
+        Initialize the LRU.
+
+        Args:
+            max_mb: Memory budget in megabytes (0 disables the LRU)
+        """
+        self.max_bytes = max(0, int(max_mb)) * 1024 * 1024
+        self._entries = OrderedDict()  # key -> PackedFrames
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def set_budget(self, max_mb: int):
+        """
+        Change the memory budget, evicting immediately if it shrank.
+
+        Args:
+            max_mb: Memory budget in megabytes (0 disables and clears the LRU)
+        """
+        with self._lock:
+            self.max_bytes = max(0, int(max_mb)) * 1024 * 1024
+            self._evict_locked()
+
+    def get(self, key: str) -> Optional[PackedFrames]:
+        """
+        Look up a frame set and mark it most recently used.
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            Shared PackedFrames, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, packed: PackedFrames):
+        """
+        Insert a frame set, evicting least recently used sets over budget.
+
+        Sets larger than the whole budget are not kept.
+
+        Args:
+            key: Cache key from make_cache_key
+            packed: Resized frames (shared, never mutated)
+        """
+        if not self.enabled or packed is None:
+            return
+        if packed.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = packed
+            self._bytes += packed.nbytes
+            self._evict_locked()
+
+    def _evict_locked(self):
+        while self._entries and self._bytes > self.max_bytes:
+            _, packed = self._entries.popitem(last=False)
+            self._bytes -= packed.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every cached frame set."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entries, bytes, budget, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Global in-memory frame cache
+frame_lru = FrameLRU()
@@ -0,0 +1,397 @@
+"""
+Frame Decoder Module for Conditioning Control Panel
+====================================================
+Provides:
+- Single-pass streaming flash decoder (animated GIF/MP4 and still images)
+  with timestamp-based frame sampling and per-frame resizing
+- PackedFrames: contiguous (frames, h, w, 3) uint8 storage for a clip
+- Optional multiprocessing decode backend that returns frames through
+  multiprocessing.shared_memory instead of pickled PIL images
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+from media_library import VIDEO_EXTENSIONS
+
+
+MAX_FLASH_FRAMES = 60
+DEFAULT_DELAY = 0.033
+MIN_FRAME_DELAY = 0.04  # Flash animations never play faster than 25 fps
+
+
+
+def flatten_rgb(frame: Image.Image) -> Image.Image:
+    """
+    Convert a frame to RGB with transparent pixels shown as black.
+
+    Flash windows have a black background, so transparency is composited
+    onto black; a plain convert('RGB') would expose whatever colour sits
+    under the transparent pixels.
+
+    Args:
+        frame: PIL image in any mode
+
+    Returns:
+        RGB image
+    """
+    if frame.mode == 'RGB':
+        return frame
+    if frame.mode in ('RGBA', 'LA', 'PA', 'RGBa', 'La') or 'transparency' in frame.info:
+        rgba = frame.convert('RGBA')
+        return Image.alpha_composite(Image.new('RGBA', rgba.size, 'black'), rgba).convert('RGB')
+    return frame.convert('RGB')
+
+
+# =============================================================================
+# PACKED FRAME STORAGE
+# =============================================================================
+
+class PackedFrames:
+    """
+    A decoded, resized clip stored as one contiguous uint8 array of shape
+    (frames, height, width, 3).
+
+    Instances are treated as immutable and shared: every window showing the
+    same asset holds a reference to the same buffer and only keeps its own
+    frame index.
+    """
+
+    __slots__ = ('array', 'delay')
+
+    def __init__(self, array: np.ndarray, delay: float):
+        """
+        Wrap a frame array.
+
+        Args:
+            array: uint8 array of shape (frames, height, width, 3)
+            delay: Per-frame delay in seconds
+        """
+        self.array = array
+        self.delay = delay
+
+    @classmethod
+    def from_images(cls, frames: List[Image.Image], delay: float) -> Optional['PackedFrames']:
+        """
+        Pack equally sized PIL frames into one array.
+
+        Args:
+            frames: RGB frames of identical size
+            delay: Per-frame delay in seconds
+
+        Returns:
+            PackedFrames, or None if frames is empty
+        """
+        if not frames:
+            return None
+        return cls(np.stack([np.asarray(flatten_rgb(f)) for f in frames]), delay)
+
+    def __len__(self) -> int:
+        return self.array.shape[0]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Frame (width, height)."""
+        return self.array.shape[2], self.array.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def frame(self, index: int) -> Image.Image:
+        """
+        Get one frame as a PIL image backed by the shared buffer (no copy).
+
+        Args:
+            index: Frame index
+
+        Returns:
+            RGB PIL image; do not modify it
+        """
+        return Image.fromarray(self.array[index % len(self)])
+
+
+# =============================================================================
+# STREAMING DECODER
+# =============================================================================
+
+def _pil_source(img: Image.Image):
+    """Frame source for an open PIL image: (frames, native_delay, est_total_seconds, frame_count)."""
+    n_frames = getattr(img, 'n_frames', 1)
+    first_ms = img.info.get('duration', 0) or 0
+    native = max(MIN_FRAME_DELAY, first_ms / 1000.0) if first_ms else DEFAULT_DELAY
+    total = native * n_frames
+
+    def frames():
+        for frame in ImageSequence.Iterator(img):
+            dur_ms = frame.info.get('duration', 0) or 0
+            yield frame, (dur_ms / 1000.0 if dur_ms > 0 else native)
+    return frames(), native, total, n_frames
+
+
+def _ffmpeg_source(path: str):
+    """Frame source for a single ffmpeg pipe: (frames, native_delay, total_seconds, est_frame_count)."""
+    import imageio_ffmpeg
+
+    gen = imageio_ffmpeg.read_frames(path, pix_fmt='rgb24')
+    meta = next(gen)
+    fps = meta.get('fps') or 30
+    w, h = meta['size']
+    native = 1.0 / fps
+    total = meta.get('duration') or 0.0
+
+    def frames():
+        try:
+            for raw in gen:
+                yield Image.frombuffer('RGB', (w, h), raw, 'raw', 'RGB', 0, 1), native
+        finally:
+            gen.close()  # Stops the ffmpeg process if we break early
+    return frames(), native, total, int(total * fps)
+
+
+def stream_flash_frames(path: str, target_size: Optional[Callable[[int, int], Tuple[int, int]]] = None,
+                        max_frames: int = MAX_FLASH_FRAMES) -> Iterator[Tuple[Image.Image, float]]:
+    """
+    Decode a flash file in one pass, sampling frames by timestamp.
+
+    The source is opened once; metadata comes from the same handle. Frames
+    are picked at a fixed interval chosen so the whole clip fits in
+    max_frames, and each picked frame is converted and resized as soon as
+    it is decoded, so only one full-resolution source frame is alive at a
+    time.
+
+    Args:
+        path: Image, GIF or video path
+        target_size: Called once with the source (width, height) to get
+            the output size; None keeps the source size
+        max_frames: Frame budget
+
+    Yields:
+        Tuples of (RGB frame, frame_delay_seconds); the delay is the same
+        for every frame of a clip
+    """
+    ext = os.path.splitext(path)[1].lower()
+    img = None
+    if ext in VIDEO_EXTENSIONS:
+        source, native, total, count_hint = _ffmpeg_source(path)
+    else:
+        img = Image.open(path)
+        source, native, total, count_hint = _pil_source(img)
+
+    try:
+        interval = max(MIN_FRAME_DELAY, native)
+        if count_hint > max_frames and total > 0:
+            interval = max(interval, total / max_frames)
+
+        out_size = None
+        emitted = 0
+        t = 0.0
+        next_t = 0.0
+        for frame, dur in source:
+            if t + 1e-6 >= next_t:
+                frame = flatten_rgb(frame)
+                if out_size is None:
+                    out_size = target_size(*frame.size) if target_size else frame.size
+                    out_size = (max(1, out_size[0]), max(1, out_size[1]))
+                if frame.size != out_size:
+                    frame = frame.resize(out_size, Image.Resampling.LANCZOS)
+                yield frame, interval
+                emitted += 1
+                next_t += interval
+                if emitted >= max_frames:
+                    break
+            t += dur
+    finally:
+        if img is not None:
+            img.close()
+
+
+def decode_flash_frames(path: str, target_size: Optional[Callable[[int, int], Tuple[int, int]]] = None,
+                        max_frames: int = MAX_FLASH_FRAMES) -> Optional[PackedFrames]:
+    """
+    Decode a flash file into packed (optionally resized) frames.
+
+    Args:
+        path: Image, GIF or video path
+        target_size: See stream_flash_frames
+        max_frames: Frame budget
+
+    Returns:
+        PackedFrames, or None if nothing could be decoded
+    """
+    frames = []
+    delay = DEFAULT_DELAY
+    try:
+        for frame, delay in stream_flash_frames(path, target_size, max_frames):
+            frames.append(np.asarray(frame))
+    except Exception as e:
+        logger.debug(f"Could not decode {path}: {e}")
+    if not frames:
+        return None
+    return PackedFrames(np.stack(frames), delay)
+
+
+# =============================================================================
+# PROCESS-POOL DECODING
+# =============================================================================
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to a parent-owned block without adopting its lifetime."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if sys.platform != 'win32':
+            # The parent unlinks the block; stop this process's tracker from doing it too
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _decode_into_shared_memory(path: str, shm_name: str, max_frames: int,
+                               width: int, height: int) -> Tuple[int, float]:
+    """
+    Worker-process entry point: decode, resize and write frames into a
+    shared (max_frames, height, width, 3) uint8 block owned by the parent.
+
+    Returns:
+        Tuple of (frames_written, frame_delay_seconds)
+    """
+    shm = _attach_shared_memory(shm_name)
+    count = 0
+    delay = DEFAULT_DELAY
+    try:
+        out = np.ndarray((max_frames, height, width, 3), dtype=np.uint8, buffer=shm.buf)
+        try:
+            for frame, delay in stream_flash_frames(path, lambda w, h: (width, height), max_frames):
+                out[count] = np.asarray(frame)
+                count += 1
+        except Exception as e:
+            logger.debug(f"Could not decode {path}: {e}")
+        del out
+    finally:
+        shm.close()
+    return count, delay
+
+
+class ProcessDecoder:
+    """
+    Optional process-pool backend for decoding and resizing flash media.
+
+    The parent sizes and owns each shared memory block (from the media
+    index's dimensions and frame count), so only a name and a couple of
+    integers cross the process boundary in either direction.
+    """
+
+    def __init__(self, processes: int = 0):
+        """
+        Initialize the decoder.
+
+        Args:
+            processes: Worker process count (0 disables the backend)
+        """
+        self.processes = 0
+        self._executor = None
+        self._lock = threading.RLock()  # Guards pool start/stop; decode threads may race to restart it
+        self.set_processes(processes)
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    def set_processes(self, processes: int):
+        """
+        Resize the pool, starting or stopping it as needed.
+
+        Args:
+            processes: Worker process count (0 disables the backend)
+        """
+        processes = max(0, int(processes))
+        with self._lock:
+            if processes == self.processes and (self._executor is not None) == (processes > 0):
+                return
+            self.shutdown()
+            self.processes = processes
+            if processes > 0:
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=processes)
+                    logger.info(f"Process decoder started with {processes} worker(s)")
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Could not start process decoder: {e}")
+                    self._executor = None
+
+    def decode(self, path: str, width: int, height: int, max_frames: int,
+               timeout: float = 30.0) -> Optional[PackedFrames]:
+        """
+        Decode and resize a file in a worker process.
+
+        Args:
+            path: Media file path
+            width: Target frame width
+            height: Target frame height
+            max_frames: Frame capacity to allocate
+            timeout: Seconds to wait for the worker
+
+        Returns:
+            PackedFrames, or None if the backend failed or decoded nothing
+            and the caller should decode in-process
+        """
+        executor = self._executor
+        if executor is None:
+            return None
+        width, height = max(1, width), max(1, height)
+        max_frames = max(1, min(MAX_FLASH_FRAMES, max_frames))
+        shm = shared_memory.SharedMemory(create=True, size=max_frames * height * width * 3)
+        try:
+            future = executor.submit(_decode_into_shared_memory, os.path.abspath(path),
+                                           shm.name, max_frames, width, height)
+            count, delay = future.result(timeout=timeout)
+            if count == 0:
+                return None
+            block = np.ndarray((max_frames, height, width, 3), dtype=np.uint8, buffer=shm.buf)
+            packed = PackedFrames(block[:count].copy(), delay)  # Single copy out before the block is released
+            del block
+            return packed
+        except BrokenProcessPool as e:
+            self._restart(executor, e)
+            return None
+        except (FutureTimeoutError, OSError, RuntimeError) as e:
+            # RuntimeError: the pool was shut down or replaced after we picked it up
+            logger.debug(f"Process decode failed for {path}: {e}")
+            return None
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _restart(self, broken: ProcessPoolExecutor, error: Exception):
+        """Replace a crashed pool once, however many decodes saw it break."""
+        with self._lock:
+            if self._executor is not broken:
+                return  # Already replaced (or stopped) by another caller
+            logger.warning(f"Process decoder crashed, restarting: {error}")
+            processes = self.processes
+            self.shutdown()
+            self.processes = 0
+            self.set_processes(processes)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -478,8 +478,7 @@ Enjoy the pink fog... 💕"""
             pass  # Browser not initialized
 
     def _quit(self, icon=None, item=None):
-        self.engine.panic_stop()
-        self.engine.esc_listener_active = False
+        self.engine.shutdown()
         try:
             self.engine.browser.close()
         except AttributeError:
@@ -936,9 +935,7 @@ Enjoy the pink fog... 💕"""
             self._sync_btns()
         else:
             self.engine.start(is_startup=not manual)
-            self.btn_main.configure(text="⏹ STOP", fg_color=M["danger"])
-            if hasattr(self, 'btn_extra'):
-                self.btn_extra.configure(text="⏹ STOP", fg_color=M["danger"])
+            self._sync_btns()  # Start is refused outside the scheduled time window
 
     def _update_scheduler(self, prog, mult, remain):
         self.sched_bar.set(prog)
@@ -0,0 +1,106 @@
+"""
+Heartbeat Module for Conditioning Control Panel
+================================================
+Provides:
+- Engine housekeeping split into subsystems with their own tick rates
+- Wake-on-demand: a subsystem only ticks after something woke it and for
+  as long as its tick asks to keep going
+- No periodic wakeups at all once every subsystem has gone idle
+"""
+
+from typing import Callable, Dict
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+
+class Subsystem:
+    """One periodic job: its interval, tick function and scheduling state."""
+
+    __slots__ = ('name', 'interval', 'tick', 'dirty', 'event', 'last', 'ticks')
+
+    def __init__(self, name: str, interval: float, tick: Callable[[float], bool]):
+        self.name = name
+        self.interval = interval
+        self.tick = tick
+        self.dirty = False   # Woken since the last tick
+        self.event = None    # Pending scheduler event while active
+        self.last = None     # Clock time of the last tick; None while idle
+        self.ticks = 0
+
+
+class Heartbeat:
+    """
+    Runs engine subsystems on an EventScheduler.
+
+    Each subsystem is a tick(dt) -> bool function with its own interval. A
+    tick returns True to be called again after its interval, or False to go
+    idle. An idle subsystem costs nothing until wake() marks it dirty and
+    runs it on the next scheduler pass. dt is the time since the previous
+    tick, or 0.0 on the first tick after a wake.
+    """
+
+    def __init__(self, scheduler):
+        """
+        Initialize the heartbeat.
+
+        Args:
+            scheduler: EventScheduler that runs the ticks
+        """
+        self.scheduler = scheduler
+        self.subsystems: Dict[str, Subsystem] = {}
+
+    def add(self, name: str, interval: float, tick: Callable[[float], bool]):
+        """
+        Register a subsystem (idle until woken).
+
+        Args:
+            name: Subsystem name used by wake()
+            interval: Seconds between ticks while active
+            tick: Function taking dt and returning True to keep ticking
+        """
+        self.subsystems[name] = Subsystem(name, interval, tick)
+
+    def wake(self, *names: str):
+        """
+        Mark subsystems dirty and tick idle ones on the next scheduler pass.
+
+        Args:
+            *names: Subsystem names (none means all)
+        """
+        for name in names or tuple(self.subsystems):
+            sub = self.subsystems[name]
+            sub.dirty = True
+            if sub.event is None:
+                sub.event = self.scheduler.call_later(0.0, self._run, sub)
+
+    def active(self) -> list:
+        """Names of the subsystems that are currently scheduled."""
+        return [name for name, sub in self.subsystems.items() if sub.event is not None]
+
+    def stats(self) -> dict:
+        """Ticks run per subsystem."""
+        return {name: sub.ticks for name, sub in self.subsystems.items()}
+
+    def _run(self, sub: Subsystem):
+        now = self.scheduler.now()
+        dt = 0.0 if sub.last is None else now - sub.last
+        sub.last = now
+        sub.ticks += 1
+        sub.dirty = False
+        try:
+            keep = sub.tick(dt)
+        except Exception as e:
+            logger.debug(f"Heartbeat subsystem {sub.name} failed: {e}")
+            keep = True
+        if keep:
+            sub.event = self.scheduler.call_later(sub.interval, self._run, sub)
+        elif sub.dirty:  # Woken again by its own tick
+            sub.event = self.scheduler.call_later(0.0, self._run, sub)
+        else:
+            sub.event = None
+            sub.last = None
@@ -8,6 +8,8 @@ It initializes logging, validates the environment, and starts the GUI.
 
 Usage:
     python main.py
+    python main.py --build-proxies [--proxy-size WxH] [--force]
+    python main.py --simulate [--preset NAME] [--minutes N] [--ramp] [--seed N] [--render-fps N] [--out FILE]
 """
 
 import sys
@@ -104,6 +106,90 @@ def verify_assets_folder():
     return True
 
 
+def run_proxy_maintenance(argv: list) -> int:
+    """
+    Transcode the startle video library into playback proxies and exit.
+
+    Args:
+        argv: Command line arguments after the program name
+
+    Returns:
+        Process exit code
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="main.py --build-proxies",
+                                     description="Build display-resolution proxies for startle videos.")
+    parser.add_argument('--build-proxies', action='store_true')
+    parser.add_argument('--proxy-size', metavar='WxH', help="Box the proxies fit in (default: largest monitor)")
+    parser.add_argument('--force', action='store_true', help="Rebuild proxies that already exist")
+    args = parser.parse_args(argv)
+
+    size = None
+    if args.proxy_size:
+        try:
+            w, h = args.proxy_size.lower().split('x')
+            size = (int(w), int(h))
+        except ValueError:
+            parser.error("--proxy-size must look like 1920x1080")
+
+    try:
+        from security import setup_logging
+        setup_logging()
+    except ImportError:
+        pass
+    verify_assets_folder()
+
+    from config import STARTLE_VID_DIR, PROXY_DIR, AUDIO_CACHE_DIR
+    from video_proxy import build_proxies
+    failed = build_proxies(STARTLE_VID_DIR, PROXY_DIR, AUDIO_CACHE_DIR, size, args.force)
+    return 1 if failed else 0
+
+
+def run_simulation_mode(argv: list) -> int:
+    """
+    Run a session headless in simulated time, print a summary and exit.
+
+    Args:
+        argv: Command line arguments after the program name
+
+    Returns:
+        Process exit code
+    """
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(prog="main.py --simulate",
+                                     description="Run a session headless in simulated time and report on it.")
+    parser.add_argument('--simulate', action='store_true')
+    parser.add_argument('--preset', help="Preset to simulate (default: saved settings)")
+    parser.add_argument('--minutes', type=float, default=60.0, help="Simulated session length (default: 60)")
+    parser.add_argument('--ramp', action='store_true', help="Enable the intensity ramp over the whole session")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument('--render-fps', type=float, default=0.0,
+                        help="Composite the offscreen frame N times per simulated second (default: off)")
+    parser.add_argument('--out', metavar='FILE', help="Write the full JSON report to FILE")
+    args = parser.parse_args(argv)
+
+    from session_sim import load_settings, run_simulation, format_report
+    try:
+        settings = load_settings(args.preset)
+    except KeyError:
+        parser.error(f"no preset named {args.preset!r}")
+    except (IOError, OSError, ValueError) as e:
+        parser.error(f"could not read presets: {e}")
+    if args.ramp:
+        settings['scheduler_enabled'] = True
+        settings['scheduler_duration_min'] = max(1, int(args.minutes))
+
+    report = run_simulation(settings, args.minutes, args.seed, render_fps=args.render_fps)
+    print(format_report(report))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
 def main():
     """Main entry point with proper error handling."""
     
@@ -191,6 +277,15 @@ def main():
 
 
 if __name__ == "__main__":
+    # Required for the optional decode worker processes in frozen builds
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    if '--build-proxies' in sys.argv[1:]:
+        sys.exit(run_proxy_maintenance(sys.argv[1:]))
+    if '--simulate' in sys.argv[1:]:
+        sys.exit(run_simulation_mode(sys.argv[1:]))
+
     try:
         main()
     except KeyboardInterrupt:
@@ -0,0 +1,780 @@
+"""
+Media Library Module for Conditioning Control Panel
+====================================================
+Provides:
+- Persistent on-disk index of every asset in the media folders
+- Precomputed metadata (size, mtime, dimensions, frames, duration, audio)
+- Incremental rescans that only probe files that changed
+- Content hashing so byte-identical copies can be treated as one asset
+- Folder watcher (inotify on Linux, polling fallback) emitting add/remove/rename deltas
+"""
+
+import os
+import re
+import sys
+import time
+import bisect
+import hashlib
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+import subprocess
+from typing import Optional, Dict, List, Iterable
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+try:
+    from utils import safe_load_json, safe_save_json
+except ImportError:
+    import json
+    def safe_load_json(fp, default=None):
+        try:
+            with open(fp, 'r') as f: return json.load(f)
+        except (IOError, OSError, json.JSONDecodeError): return default or {}
+    def safe_save_json(fp, data):
+        try:
+            with open(fp, 'w') as f: json.dump(data, f, indent=2)
+            return True
+        except (IOError, OSError, TypeError): return False
+
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+INDEX_VERSION = 1
+
+# Same extension set the engine used to glob for
+MEDIA_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.mp4', '.mov', '.mp3', '.wav'}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif'}
+VIDEO_EXTENSIONS = {'.mp4', '.mov'}
+AUDIO_EXTENSIONS = {'.mp3', '.wav'}
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_STREAM_RE = re.compile(r"Stream #.*Video:.*?(\d{2,5})x(\d{2,5})")
+_FPS_RE = re.compile(r"(\d+(?:\.\d+)?)\s*fps")
+
+
+def media_kind(path: str) -> Optional[str]:
+    """
+    Classify a file by extension.
+
+    Args:
+        path: File path
+
+    Returns:
+        'image', 'video', 'audio', or None if not a supported media file
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return 'image'
+    if ext in VIDEO_EXTENSIONS:
+        return 'video'
+    if ext in AUDIO_EXTENSIONS:
+        return 'audio'
+    return None
+
+
+# =============================================================================
+# METADATA PROBING
+# =============================================================================
+
+def _probe_image(path: str) -> dict:
+    """Read dimensions, frame count and duration from an image header."""
+    from PIL import Image
+
+    meta = {'width': 0, 'height': 0, 'frames': 1, 'duration': 0.0, 'has_audio': False}
+    with Image.open(path) as img:
+        meta['width'], meta['height'] = img.size
+        n_frames = getattr(img, 'n_frames', 1)
+        meta['frames'] = n_frames
+        if n_frames > 1:
+            # Per-frame delay is only exposed while seeking; use the first as representative
+            frame_ms = img.info.get('duration', 0) or 0
+            meta['duration'] = (frame_ms * n_frames) / 1000.0
+    return meta
+
+
+def _probe_ffmpeg(path: str) -> dict:
+    """Read container metadata from the ffmpeg banner without decoding."""
+    import imageio_ffmpeg
+
+    meta = {'width': 0, 'height': 0, 'frames': 0, 'duration': 0.0, 'has_audio': False}
+    ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+    result = subprocess.run([ffmpeg_exe, '-hide_banner', '-i', path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=15)
+    header = result.stderr.decode('utf-8', errors='replace')
+
+    m = _DURATION_RE.search(header)
+    if m:
+        h, mnt, sec = m.groups()
+        meta['duration'] = int(h) * 3600 + int(mnt) * 60 + float(sec)
+
+    for line in header.splitlines():
+        if 'Audio:' in line and 'Stream #' in line:
+            meta['has_audio'] = True
+        elif 'Video:' in line and 'Stream #' in line and not meta['width']:
+            dims = _VIDEO_STREAM_RE.search(line)
+            if dims:
+                meta['width'], meta['height'] = int(dims.group(1)), int(dims.group(2))
+            fps = _FPS_RE.search(line)
+            if fps and meta['duration']:
+                meta['frames'] = int(float(fps.group(1)) * meta['duration'])
+    return meta
+
+
+def probe_audio_stream(path: str) -> Optional[bool]:
+    """
+    Check whether a media file has an audio stream.
+
+    Args:
+        path: Absolute path to the file
+
+    Returns:
+        True or False from the container's stream list, or None if the
+        container could not be read
+    """
+    try:
+        meta = _probe_ffmpeg(path)
+    except ImportError as e:
+        logger.debug(f"Media probe backend unavailable for {path}: {e}")
+        return None
+    except (IOError, OSError, ValueError, subprocess.SubprocessError) as e:
+        logger.debug(f"Could not probe {path}: {e}")
+        return None
+    if not (meta['has_audio'] or meta['width'] or meta['duration']):
+        return None  # Nothing recognised in the banner: unreadable, not silent
+    return meta['has_audio']
+
+
+def probe_media(path: str) -> dict:
+    """
+    Collect metadata for a single media file.
+
+    Args:
+        path: Absolute path to the file
+
+    Returns:
+        Dictionary with width, height, frames, duration and has_audio.
+        Fields that could not be determined are left at zero/False.
+    """
+    kind = media_kind(path)
+    try:
+        if kind == 'image':
+            return _probe_image(path)
+        if kind in ('video', 'audio'):
+            return _probe_ffmpeg(path)
+    except ImportError as e:
+        logger.debug(f"Media probe backend unavailable for {path}: {e}")
+    except (IOError, OSError, ValueError, subprocess.SubprocessError) as e:
+        logger.debug(f"Could not probe {path}: {e}")
+    return {'width': 0, 'height': 0, 'frames': 0, 'duration': 0.0, 'has_audio': kind == 'audio'}
+
+
+def hash_file(path: str) -> Optional[str]:
+    """
+    Hash a file's contents.
+
+    Args:
+        path: File path
+
+    Returns:
+        128-bit BLAKE2b hex digest, or None if the file could not be read
+    """
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+    except (IOError, OSError) as e:
+        logger.debug(f"Could not hash {path}: {e}")
+        return None
+    return h.hexdigest()
+
+
+# =============================================================================
+# MEDIA INDEX
+# =============================================================================
+
+class MediaIndex:
+    """
+    Persistent index of the media folders.
+
+    Entries are keyed by absolute path and carry size/mtime so a rescan only
+    needs a directory listing plus a stat per file; metadata and content
+    hash are recomputed only for files whose size or mtime changed.
+    """
+
+    def __init__(self, index_file: str):
+        """
+        Initialize the index and load any previously saved state.
+
+        Args:
+            index_file: JSON file the index is persisted to
+        """
+        self.index_file = index_file
+        self.entries: Dict[str, dict] = {}
+        self._folders: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        """Load the saved index, discarding it if the format changed."""
+        data = safe_load_json(self.index_file, {})
+        if data.get('version') != INDEX_VERSION:
+            return
+        entries = data.get('entries', {})
+        if isinstance(entries, dict):
+            self.entries = entries
+            logger.debug(f"Loaded media index with {len(entries)} entries")
+
+    def save(self) -> bool:
+        """
+        Persist the index if it changed since the last save.
+
+        Returns:
+            True if the index is up to date on disk
+        """
+        with self._lock:
+            if not self._dirty:
+                return True
+            data = {'version': INDEX_VERSION, 'entries': dict(self.entries)}
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        return safe_save_json(self.index_file, data)
+
+    def _list_folder(self, folder: str) -> Dict[str, os.stat_result]:
+        """Single scandir pass over a folder, returning path -> stat."""
+        found = {}
+        try:
+            with os.scandir(folder) as it:
+                for de in it:
+                    if not de.is_file() or media_kind(de.name) is None:
+                        continue
+                    try:
+                        found[os.path.abspath(de.path)] = de.stat()
+                    except OSError:
+                        continue  # Vanished between listing and stat
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        except OSError as e:
+            logger.warning(f"Could not scan media folder {folder}: {e}")
+        return found
+
+    def refresh(self, folder: str, probe: bool = True) -> int:
+        """
+        Bring the index for one folder up to date.
+
+        Args:
+            folder: Media folder to scan (non-recursive)
+            probe: If False, only record paths and stats; metadata for new or
+                changed files is filled in by a later probing refresh
+
+        Returns:
+            Number of entries that were added, changed or removed
+        """
+        folder = os.path.abspath(folder)
+        found = self._list_folder(folder)
+        changes = 0
+
+        with self._lock:
+            stale = [p for p, e in self.entries.items()
+                     if e.get('folder') == folder and p not in found]
+            for path in stale:
+                del self.entries[path]
+            changes += len(stale)
+
+            to_probe = []
+            to_hash = []
+            for path, st in found.items():
+                entry = self.entries.get(path)
+                if entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime:
+                    if entry.get('probed') or not probe:
+                        if probe and not entry.get('hash'):
+                            to_hash.append(path)  # Indexed before hashing existed
+                        continue
+                else:
+                    changes += 1
+                self.entries[path] = {
+                    'folder': folder, 'kind': media_kind(path),
+                    'size': st.st_size, 'mtime': st.st_mtime, 'probed': False,
+                    'width': 0, 'height': 0, 'frames': 0, 'duration': 0.0, 'has_audio': False,
+                }
+                to_probe.append(path)
+
+            self._folders[folder] = sorted(found)
+            if changes or to_probe:
+                self._dirty = True
+
+        if probe:
+            for path in to_probe:
+                meta = probe_media(path)
+                meta['probed'] = True
+                with self._lock:
+                    entry = self.entries.get(path)
+                    if entry is not None:
+                        entry.update(meta)
+            for path in to_probe + to_hash:
+                self.content_hash(path)
+
+        if changes:
+            logger.info(f"Media index: {changes} change(s) in {folder}")
+        return changes
+
+    def refresh_all(self, folders: Iterable[str]):
+        """
+        Refresh several folders and persist the result.
+
+        Intended to run on a background thread at startup.
+
+        Args:
+            folders: Media folders to index
+        """
+        start = time.time()
+        for folder in folders:
+            self.refresh(folder, probe=True)
+        self.save()
+        logger.debug(f"Media index refreshed in {time.time() - start:.2f}s")
+
+    def files(self, folder: str, unique: bool = False) -> List[str]:
+        """
+        Get the indexed files for a folder.
+
+        The first call for a folder that has not been scanned yet does a
+        cheap listing (no probing) so callers always get a usable answer.
+
+        Args:
+            folder: Media folder
+            unique: Return one path per distinct content hash (the first in
+                sorted order). Files not hashed yet are always included.
+
+        Returns:
+            List of absolute file paths
+        """
+        folder = os.path.abspath(folder)
+        with self._lock:
+            known = self._folders.get(folder)
+        if known is None:
+            self.refresh(folder, probe=False)
+        with self._lock:
+            known = self._folders.get(folder, [])
+            if not unique:
+                return list(known)
+            seen = set()
+            result = []
+            for path in known:
+                digest = self.entries.get(path, {}).get('hash')
+                if digest:
+                    if digest in seen:
+                        continue
+                    seen.add(digest)
+                result.append(path)
+            return result
+
+    def duplicate_of(self, path: str) -> Optional[str]:
+        """
+        Find an earlier file in the same folder with identical content.
+
+        Args:
+            path: Absolute path to an indexed file
+
+        Returns:
+            Path of the copy files(unique=True) keeps in its place, or None
+            if this file is the representative or is not hashed yet
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            digest = self.entries.get(path, {}).get('hash')
+            if not digest:
+                return None
+            for other in self._folders.get(os.path.dirname(path), []):
+                if other >= path:
+                    break
+                if self.entries.get(other, {}).get('hash') == digest:
+                    return other
+        return None
+
+    def duplicate_count(self, folder: str) -> int:
+        """
+        Count files in a folder that are byte-identical to another file there.
+
+        Args:
+            folder: Media folder
+
+        Returns:
+            Number of redundant copies
+        """
+        return len(self.files(folder)) - len(self.files(folder, unique=True))
+
+    def add_file(self, path: str) -> bool:
+        """
+        Index a single new or modified file.
+
+        Args:
+            path: Absolute path to the file
+
+        Returns:
+            True if the file was indexed
+        """
+        path = os.path.abspath(path)
+        if media_kind(path) is None:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        meta = probe_media(path)
+        meta['probed'] = True
+        digest = hash_file(path)
+        if digest:
+            meta['hash'] = digest
+        folder = os.path.dirname(path)
+        with self._lock:
+            entry = {'folder': folder, 'kind': media_kind(path), 'size': st.st_size, 'mtime': st.st_mtime}
+            entry.update(meta)
+            self.entries[path] = entry
+            known = self._folders.setdefault(folder, [])
+            i = bisect.bisect_left(known, path)
+            if i == len(known) or known[i] != path:
+                known.insert(i, path)
+            self._dirty = True
+        return True
+
+    def remove_file(self, path: str) -> bool:
+        """
+        Drop a single file from the index.
+
+        Args:
+            path: Absolute path to the file
+
+        Returns:
+            True if the file was indexed before
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self.entries.pop(path, None)
+            known = self._folders.get(os.path.dirname(path))
+            if known:
+                i = bisect.bisect_left(known, path)
+                if i < len(known) and known[i] == path:
+                    del known[i]
+            if entry is not None:
+                self._dirty = True
+            return entry is not None
+
+    def rename_file(self, old_path: str, new_path: str) -> bool:
+        """
+        Move an index entry to a new path, keeping its probed metadata.
+
+        Args:
+            old_path: Previous absolute path
+            new_path: New absolute path
+
+        Returns:
+            True if the new path is indexed afterwards
+        """
+        old_path, new_path = os.path.abspath(old_path), os.path.abspath(new_path)
+        with self._lock:
+            entry = self.entries.get(old_path)
+        if entry is None or media_kind(new_path) != entry.get('kind'):
+            self.remove_file(old_path)
+            return self.add_file(new_path)
+        self.remove_file(old_path)
+        folder = os.path.dirname(new_path)
+        with self._lock:
+            entry = dict(entry, folder=folder)
+            self.entries[new_path] = entry
+            known = self._folders.setdefault(folder, [])
+            bisect.insort(known, new_path)
+            self._dirty = True
+        return True
+
+    def diff_folder(self, folder: str) -> List[tuple]:
+        """
+        Compare a folder listing against the index without applying it.
+
+        Files that disappeared and reappeared under a new name with the same
+        size and mtime are reported as renames.
+
+        Args:
+            folder: Media folder
+
+        Returns:
+            List of ('added', path), ('removed', path), ('modified', path)
+            and ('renamed', old_path, new_path) tuples
+        """
+        folder = os.path.abspath(folder)
+        found = self._list_folder(folder)
+        with self._lock:
+            known = {p: self.entries.get(p) for p in self._folders.get(folder, [])}
+
+        removed = [p for p in known if p not in found]
+        added = [p for p in found if p not in known]
+        deltas = []
+        for path, st in found.items():
+            entry = known.get(path)
+            if entry and (entry['size'] != st.st_size or entry['mtime'] != st.st_mtime):
+                deltas.append(('modified', path))
+
+        by_signature = {}
+        for path in removed:
+            entry = known[path]
+            if entry:
+                by_signature.setdefault((entry['size'], entry['mtime']), []).append(path)
+        for path in added:
+            st = found[path]
+            candidates = by_signature.get((st.st_size, st.st_mtime))
+            if candidates:
+                old = candidates.pop()
+                removed.remove(old)
+                deltas.append(('renamed', old, path))
+            else:
+                deltas.append(('added', path))
+        deltas.extend(('removed', p) for p in removed)
+        return deltas
+
+    def apply_delta(self, delta: tuple) -> bool:
+        """
+        Apply one delta produced by diff_folder or the watcher.
+
+        Args:
+            delta: ('added'|'modified'|'removed', path) or ('renamed', old, new)
+
+        Returns:
+            True if the index changed
+        """
+        action = delta[0]
+        if action in ('added', 'modified'):
+            return self.add_file(delta[1])
+        if action == 'removed':
+            return self.remove_file(delta[1])
+        if action == 'renamed':
+            return self.rename_file(delta[1], delta[2])
+        return False
+
+    def content_hash(self, path: str) -> Optional[str]:
+        """
+        Get a digest of a file's contents, computing it on first use.
+
+        The digest is stored on the index entry and reused until the file's
+        size or mtime changes.
+
+        Args:
+            path: Absolute path to the file
+
+        Returns:
+            Hex digest string, or None if the file could not be read
+        """
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self.entries.get(path)
+            if (entry and entry.get('hash') and entry['size'] == st.st_size
+                    and entry['mtime'] == st.st_mtime):
+                return entry['hash']
+
+        digest = hash_file(path)
+        if digest:
+            with self._lock:
+                entry = self.entries.get(path)
+                if entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime:
+                    entry['hash'] = digest
+                    self._dirty = True
+        return digest
+
+    def get(self, path: str) -> Optional[dict]:
+        """
+        Get the index entry for a file.
+
+        Args:
+            path: Absolute path to the file
+
+        Returns:
+            Copy of the entry dictionary, or None if not indexed
+        """
+        with self._lock:
+            entry = self.entries.get(os.path.abspath(path))
+            return dict(entry) if entry else None
+
+
+# =============================================================================
+# FOLDER WATCHER
+# =============================================================================
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class MediaWatcher:
+    """
+    Watches the media folders and feeds add/remove/rename deltas into a
+    MediaIndex, then reports them through a callback.
+
+    Uses inotify on Linux. Everywhere else (or if inotify cannot be set up)
+    it polls the folders' own mtime, which changes on add/remove/rename,
+    and only lists a folder when that stamp moved.
+    """
+
+    def __init__(self, index: MediaIndex, folders: Iterable[str], on_change=None, poll_interval: float = 2.0):
+        """
+        Initialize the watcher.
+
+        Args:
+            index: Media index to keep in sync
+            folders: Folders to watch (non-recursive)
+            on_change: Called as on_change(delta) for each applied delta,
+                on the watcher thread
+            poll_interval: Seconds between folder stamp checks in polling mode
+        """
+        self.index = index
+        self.folders = [os.path.abspath(f) for f in folders]
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.running = False
+        self.backend = None
+        self._thread = None
+
+    def start(self):
+        """Start watching on a daemon thread."""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching. The thread exits within one poll interval."""
+        self.running = False
+
+    def _run(self):
+        if sys.platform.startswith('linux'):
+            try:
+                self._run_inotify()
+                return
+            except OSError as e:
+                logger.info(f"inotify unavailable, polling media folders instead: {e}")
+        self._run_polling()
+
+    def _emit(self, deltas: List[tuple]):
+        """Apply deltas to the index and notify the listener."""
+        applied = False
+        for delta in deltas:
+            if self.index.apply_delta(delta) or delta[0] == 'removed':
+                applied = True
+                if self.on_change:
+                    try:
+                        self.on_change(delta)
+                    except Exception as e:
+                        logger.debug(f"Media change callback failed: {e}")
+        if applied:
+            self.index.save()
+
+    # --- Polling backend ---
+
+    def _folder_stamp(self, folder: str):
+        try:
+            return os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def _run_polling(self):
+        self.backend = 'polling'
+        stamps = {f: self._folder_stamp(f) for f in self.folders}
+        while self.running:
+            time.sleep(self.poll_interval)
+            for folder in self.folders:
+                stamp = self._folder_stamp(folder)
+                if stamp == stamps.get(folder):
+                    continue
+                stamps[folder] = stamp
+                self._emit(self.index.diff_folder(folder))
+
+    # --- inotify backend ---
+
+    def _run_inotify(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+        watches = {}
+        try:
+            for folder in self.folders:
+                wd = libc.inotify_add_watch(fd, os.fsencode(folder), mask)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+                watches[wd] = folder
+            self.backend = 'inotify'
+
+            while self.running:
+                ready, _, _ = select.select([fd], [], [], 1.0)
+                if not ready:
+                    continue
+                try:
+                    buf = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._emit(self._parse_inotify(buf, watches))
+        finally:
+            os.close(fd)
+
+    def _parse_inotify(self, buf: bytes, watches: Dict[int, str]) -> List[tuple]:
+        """Turn a raw inotify read into deltas, pairing moves by cookie."""
+        deltas = []
+        moved_from = {}
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(buf):
+            wd, mask, cookie, length = _INOTIFY_EVENT.unpack_from(buf, offset)
+            offset += _INOTIFY_EVENT.size
+            name = buf[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Kernel dropped events - resync each folder once
+                for folder in self.folders:
+                    deltas.extend(self.index.diff_folder(folder))
+                continue
+            folder = watches.get(wd)
+            if folder is None or mask & IN_ISDIR or not name:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            if media_kind(path) is None:
+                continue
+
+            if mask & IN_MOVED_FROM:
+                moved_from[cookie] = path
+            elif mask & IN_MOVED_TO:
+                old = moved_from.pop(cookie, None)
+                deltas.append(('renamed', old, path) if old else ('added', path))
+            elif mask & IN_CLOSE_WRITE:
+                deltas.append(('added', path))
+            elif mask & IN_DELETE:
+                deltas.append(('removed', path))
+
+        # Moved out of the watched folders
+        deltas.extend(('removed', p) for p in moved_from.values())
+        return deltas
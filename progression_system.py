@@ -10,9 +10,9 @@ import tkinter as tk
 import os
 import time
 import random
-import ctypes
-from ctypes import windll
-from PIL import Image, ImageSequence, ImageTk
+from PIL import Image, ImageSequence
+
+from render_backend import TkBackend
 
 # Initialize logging
 try:
@@ -21,20 +21,6 @@ except ImportError:
     import logging
     logger = logging.getLogger("ConditioningPanel")
 
-# --- WIN32 API CONSTANTS ---
-GWL_EXSTYLE = -20
-WS_EX_LAYERED = 0x80000
-WS_EX_TOPMOST = 0x00008
-WS_EX_TRANSPARENT = 0x00000020
-WS_EX_TOOLWINDOW = 0x00000080
-WS_EX_NOACTIVATE = 0x08000000
-HWND_TOPMOST = -1
-SWP_NOSIZE = 0x0001
-SWP_NOMOVE = 0x0002
-SWP_NOACTIVATE = 0x0010
-SWP_SHOWWINDOW = 0x0040
-
-
 class ResourceManager:
     """
     Global resource manager to prevent CPU overload.
@@ -171,14 +157,14 @@ class SpiralOverlay:
     # Class-level frame cache
     _frame_cache = {}
 
-    def __init__(self, root, gif_path, initial_alpha=0.3, dual_monitor=False):
+    def __init__(self, root, gif_path, initial_alpha=0.3, dual_monitor=False, backend=None):
         self.root = root
+        self.backend = backend or TkBackend(root)
         self.gif_path = gif_path
         self.alpha = initial_alpha
         self.dual_monitor = dual_monitor
         self.destroyed = False
         self.windows = []
-        self.labels = []
         self.frame_delays = []
         self.current_frame = 0
         self.monitors = []
@@ -293,28 +279,13 @@ class SpiralOverlay:
             if self.destroyed:
                 return
             try:
-                win = tk.Toplevel(self.root)
-                win.overrideredirect(True)
-                win.attributes('-topmost', True)
-                win.attributes('-alpha', self.alpha)
-                win.configure(bg='black')
-                win.geometry(f"{mon['width']}x{mon['height']}+{mon['x']}+{mon['y']}")
-                
-                label = tk.Label(win, bg='black', bd=0, highlightthickness=0)
-                label.pack(fill='both', expand=True)
-                
-                win.update_idletasks()
-                self._make_click_through(win)
-                
+                win = self.backend.create_surface(mon['x'], mon['y'], mon['width'], mon['height'],
+                                                  alpha=self.alpha, click_through=True)
                 self.windows.append(win)
-                self.labels.append(label)
-                win.mon_w = mon['width']
-                win.mon_h = mon['height']
-                
             except Exception as e:
                 print(f"[DEBUG] Error creating spiral window: {e}")
 
-        # Pre-convert frames to PhotoImages
+        # Pre-convert frames to display images
         self._photo_frames = []
         
         for i, raw in enumerate(self._raw_frames):
@@ -322,7 +293,7 @@ class SpiralOverlay:
                 if self.windows:
                     win = self.windows[0]
                     img_w, img_h = raw.size
-                    scale = max(win.mon_w / img_w, win.mon_h / img_h)
+                    scale = max(win.w / img_w, win.h / img_h)
                     
                     if abs(scale - 1.0) > 0.01:
                         new_w = int(img_w * scale)
@@ -331,27 +302,10 @@ class SpiralOverlay:
                     else:
                         scaled = raw
                     
-                    photo = ImageTk.PhotoImage(scaled)
-                    self._photo_frames.append(photo)
+                    self._photo_frames.append(self.backend.make_image(scaled))
             except Exception as e:
                 break
 
-    def _make_click_through(self, window):
-        """Make window click-through"""
-        try:
-            hwnd = windll.user32.GetParent(window.winfo_id())
-            if hwnd == 0:
-                hwnd = window.winfo_id()
-            
-            ex_style = windll.user32.GetWindowLongW(hwnd, GWL_EXSTYLE)
-            ex_style = ex_style | WS_EX_LAYERED | WS_EX_TRANSPARENT | WS_EX_TOPMOST | WS_EX_TOOLWINDOW | WS_EX_NOACTIVATE
-            windll.user32.SetWindowLongW(hwnd, GWL_EXSTYLE, ex_style)
-            
-            windll.user32.SetWindowPos(hwnd, HWND_TOPMOST, 0, 0, 0, 0,
-                                       SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE | SWP_SHOWWINDOW)
-        except (OSError, AttributeError) as e:
-            logger.debug(f"Could not make window click-through: {e}")
-
     def _animate(self):
         """Animate frames with rate limiting"""
         if self.destroyed or not self.animating or not self.windows:
@@ -375,12 +329,8 @@ class SpiralOverlay:
                 frame_idx = self.current_frame % len(self._photo_frames)
                 photo = self._photo_frames[frame_idx]
                 
-                for label in self.labels:
-                    try:
-                        label.configure(image=photo)
-                        label.image = photo
-                    except tk.TclError:
-                        pass  # Label may be destroyed
+                for win in self.windows:
+                    win.set_image(photo)
                 
                 self.current_frame += 1
             
@@ -395,12 +345,12 @@ class SpiralOverlay:
 
     def set_alpha(self, alpha_val):
         """Update overlay transparency (0-255 -> 0.0-1.0)"""
-        self.alpha = max(0.0, min(1.0, alpha_val / 255.0))
+        alpha = max(0.0, min(1.0, alpha_val / 255.0))
+        if alpha == self.alpha:
+            return  # Called on every visuals tick; skip the Tcl round trips
+        self.alpha = alpha
         for win in self.windows:
-            try:
-                win.attributes('-alpha', self.alpha)
-            except tk.TclError:
-                pass  # Window may be destroyed
+            win.set_alpha(self.alpha)
 
     def pause(self):
         """Pause animation"""
@@ -419,20 +369,17 @@ class SpiralOverlay:
         resource_mgr.register_effect('spiral', False)
         
         for win in self.windows:
-            try:
-                win.destroy()
-            except tk.TclError:
-                pass  # Already destroyed
+            win.destroy()
         self.windows.clear()
-        self.labels.clear()
         self._photo_frames = []
 
 
 class PinkFilterOverlay:
     """Simple pink filter overlay - very lightweight."""
 
-    def __init__(self, root):
+    def __init__(self, root, backend=None):
         self.root = root
+        self.backend = backend or TkBackend(root)
         self.windows = []
         self.active = False
         self.current_alpha = 0.0
@@ -459,10 +406,7 @@ class PinkFilterOverlay:
             self._create_windows()
             
         for win in self.windows:
-            try:
-                win.attributes('-alpha', self.current_alpha)
-            except tk.TclError:
-                pass  # Window may be destroyed
+            win.set_alpha(self.current_alpha)
 
     def _create_windows(self):
         """Create overlay windows"""
@@ -472,47 +416,21 @@ class PinkFilterOverlay:
         
         for m in monitors:
             try:
-                win = tk.Toplevel(self.root)
-                win.overrideredirect(True)
-                win.geometry(f"{m['width']}x{m['height']}+{m['x']}+{m['y']}")
-                win.configure(bg="#FF69B4")
-                win.attributes('-alpha', self.current_alpha)
-                win.attributes('-topmost', True)
-                
-                win.update_idletasks()
-                self._make_click_through(win)
-                self.windows.append(win)
+                self.windows.append(self.backend.create_surface(m['x'], m['y'], m['width'], m['height'],
+                                                                bg="#FF69B4", alpha=self.current_alpha,
+                                                                click_through=True))
             except tk.TclError as e:
                 logger.debug(f"Could not create pink filter window: {e}")
 
     def _destroy_windows(self):
         """Destroy all windows"""
         for win in self.windows:
-            try:
-                win.destroy()
-            except tk.TclError:
-                pass  # Already destroyed
+            win.destroy()
         self.windows.clear()
         self.active = False
         self.current_alpha = 0.0
         resource_mgr.register_effect('pink_filter', False)
 
-    def _make_click_through(self, window):
-        """Make click-through"""
-        try:
-            hwnd = windll.user32.GetParent(window.winfo_id())
-            if hwnd == 0:
-                hwnd = window.winfo_id()
-            
-            ex_style = windll.user32.GetWindowLongW(hwnd, GWL_EXSTYLE)
-            ex_style = ex_style | WS_EX_LAYERED | WS_EX_TRANSPARENT | WS_EX_TOPMOST | WS_EX_NOACTIVATE
-            windll.user32.SetWindowLongW(hwnd, GWL_EXSTYLE, ex_style)
-            
-            windll.user32.SetWindowPos(hwnd, HWND_TOPMOST, 0, 0, 0, 0,
-                                       SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE | SWP_SHOWWINDOW)
-        except (OSError, AttributeError) as e:
-            logger.debug(f"Could not make click-through: {e}")
-
     def _get_monitors(self):
         """Get monitors"""
         try:
@@ -625,7 +543,8 @@ class BubbleManager:
                 on_miss=None,
                 asset_path=path,
                 volume=volume,
-                preloaded_image=self._bubble_image  # Pass pre-loaded image
+                preloaded_image=self._bubble_image,  # Pass pre-loaded image
+                backend=self.engine.render
             )
         except Exception as e:
             print(f"[DEBUG] Bubble spawn error: {e}")
@@ -638,7 +557,7 @@ class ProgressionSystem:
     
     def __init__(self, engine_ref):
         self.engine = engine_ref
-        self.pink_filter = PinkFilterOverlay(engine_ref.root)
+        self.pink_filter = PinkFilterOverlay(engine_ref.root, engine_ref.render)
         self.spiral = None
         self.bubbles = BubbleManager(engine_ref)
         self.unlocks = {"pink_filter": False, "spiral": False, "bubbles": False}
@@ -675,10 +594,7 @@ class ProgressionSystem:
             self.spiral.pause()
             # Hide and minimize spiral windows during video
             for win in self.spiral.windows:
-                try:
-                    win.withdraw()
-                except tk.TclError:
-                    pass  # Window may be destroyed
+                win.hide()
             # Stop the animation loop
             self.spiral.running = False
 
@@ -696,10 +612,7 @@ class ProgressionSystem:
                 self.spiral.running = True
                 self.spiral.resume()
                 for win in self.spiral.windows:
-                    try:
-                        win.deiconify()
-                    except tk.TclError:
-                        pass  # Window may be destroyed
+                    win.show()
 
     def update_visuals(self, pink_opacity=0.0):
         """Update visual effects with rate limiting"""
@@ -753,7 +666,7 @@ class ProgressionSystem:
                     self.spiral.destroy()
                     self.spiral = None
                 
-                self.spiral = SpiralOverlay(self.engine.root, path, base_op, dual_monitor)
+                self.spiral = SpiralOverlay(self.engine.root, path, base_op, dual_monitor, self.engine.render)
                 self.current_spiral_path = path
                 self.current_spiral_dual = dual_monitor
 
@@ -0,0 +1,720 @@
+"""
+Render Backend Module for Conditioning Control Panel
+=====================================================
+Provides:
+- One interface for every on-screen overlay: create a surface, then
+  set its image or alpha, move, hide/show, lift and destroy it
+- TkBackend: borderless topmost Tk windows with Win32 styling
+  (click-through, no-activate, per-pixel alpha via UpdateLayeredWindow)
+- OffscreenBackend: a NumPy compositor that draws the same surfaces into
+  an in-memory framebuffer, so rendering cost can be measured on any OS
+- Per-operation counters and timings on both backends
+"""
+
+import time
+import ctypes
+import tkinter as tk
+from ctypes import byref, sizeof, c_byte, wintypes, Structure
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont, ImageTk
+
+try:
+    from ctypes import windll
+except ImportError:  # Not Windows: the Tk backend runs without Win32 styling
+    windll = None
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+
+# --- WIN32 API CONSTANTS ---
+GWL_EXSTYLE = -20
+WS_EX_LAYERED = 0x80000
+WS_EX_TOPMOST = 0x00008
+WS_EX_TRANSPARENT = 0x00000020
+WS_EX_TOOLWINDOW = 0x00000080
+WS_EX_NOACTIVATE = 0x08000000
+HWND_TOPMOST = -1
+SWP_NOSIZE = 0x0001
+SWP_NOMOVE = 0x0002
+SWP_NOACTIVATE = 0x0010
+SWP_SHOWWINDOW = 0x0040
+ULW_ALPHA = 0x02
+AC_SRC_OVER = 0x00
+AC_SRC_ALPHA = 0x01
+
+TRANS_KEY = "#000001"  # Tk colour key for see-through text backgrounds
+
+OPS = ('create', 'set_image', 'set_alpha', 'move', 'destroy', 'composite')
+
+
+class BLENDFUNCTION(Structure):
+    _fields_ = [("BlendOp", c_byte), ("BlendFlags", c_byte),
+                ("SourceConstantAlpha", c_byte), ("AlphaFormat", c_byte)]
+
+
+class Point(Structure):
+    _fields_ = [("x", wintypes.LONG), ("y", wintypes.LONG)]
+
+
+class Size(Structure):
+    _fields_ = [("cx", wintypes.LONG), ("cy", wintypes.LONG)]
+
+
+class BITMAPINFOHEADER(Structure):
+    _fields_ = [("biSize", wintypes.DWORD), ("biWidth", wintypes.LONG), ("biHeight", wintypes.LONG),
+                ("biPlanes", wintypes.WORD), ("biBitCount", wintypes.WORD), ("biCompression", wintypes.DWORD),
+                ("biSizeImage", wintypes.DWORD), ("biXPelsPerMeter", wintypes.LONG),
+                ("biYPelsPerMeter", wintypes.LONG), ("biClrUsed", wintypes.DWORD),
+                ("biClrImportant", wintypes.DWORD)]
+
+
+def update_layered_window(hwnd, pil_image, x, y, alpha_val=255):
+    """Paint a PIL image onto a layered HWND with per-pixel alpha (UpdateLayeredWindow)."""
+    try:
+        if pil_image.mode != 'RGBA':
+            pil_image = pil_image.convert('RGBA')
+
+        if alpha_val < 255:
+            alpha_layer = pil_image.split()[3]
+            alpha_layer = alpha_layer.point(lambda p: int(p * alpha_val / 255))
+            r, g, b, _ = pil_image.split()
+            pil_image = Image.merge('RGBA', (r, g, b, alpha_layer))
+
+        try:
+            pil_image = pil_image.convert('RGBa')
+        except (ValueError, OSError):
+            pil_image = pil_image.convert('RGBA').convert('RGBa')
+
+        w, h = pil_image.size
+        r, g, b, a = pil_image.split()
+        bgra_img = Image.merge("RGBA", (b, g, r, a))
+        img_data = bgra_img.tobytes()
+
+        hdcScreen = windll.user32.GetDC(0)
+        hdcMem = windll.gdi32.CreateCompatibleDC(hdcScreen)
+
+        bmi = BITMAPINFOHEADER()
+        bmi.biSize = sizeof(BITMAPINFOHEADER)
+        bmi.biWidth = w
+        bmi.biHeight = -h
+        bmi.biPlanes = 1
+        bmi.biBitCount = 32
+        bmi.biCompression = 0
+
+        pvBits = ctypes.c_void_p()
+        hBitmap = windll.gdi32.CreateDIBSection(hdcMem, byref(bmi), 0, byref(pvBits), 0, 0)
+        if hBitmap == 0:
+            windll.gdi32.DeleteDC(hdcMem)
+            windll.user32.ReleaseDC(0, hdcScreen)
+            return
+
+        ctypes.memmove(pvBits, img_data, len(img_data))
+        oldBitmap = windll.gdi32.SelectObject(hdcMem, hBitmap)
+
+        blend = BLENDFUNCTION(AC_SRC_OVER, 0, 255, AC_SRC_ALPHA)
+        windll.user32.UpdateLayeredWindow(hwnd, hdcScreen, byref(Point(x, y)), byref(Size(w, h)),
+                                          hdcMem, byref(Point(0, 0)), 0, byref(blend), ULW_ALPHA)
+
+        windll.gdi32.SelectObject(hdcMem, oldBitmap)
+        windll.gdi32.DeleteObject(hBitmap)
+        windll.gdi32.DeleteDC(hdcMem)
+        windll.user32.ReleaseDC(0, hdcScreen)
+    except (OSError, AttributeError) as e:
+        logger.debug(f"Layered window update failed: {e}")
+
+
+# =============================================================================
+# INTERFACE
+# =============================================================================
+
+class Surface:
+    """
+    One overlay on screen.
+
+    Geometry and alpha are mirrored on the surface, so reading them never
+    touches the window system. Operations on a destroyed surface are
+    ignored; `destroyed` tells callers it is gone (closed by the user,
+    torn down by the window system, or destroyed by us). Engines may hang
+    their own bookkeeping attributes on a surface.
+    """
+
+    def __init__(self, backend, x, y, w, h, alpha, on_click=None):
+        self.backend = backend
+        self.x, self.y, self.w, self.h = int(x), int(y), int(w), int(h)
+        self.alpha = alpha
+        self.on_click = on_click
+        self.hidden = False
+        self.destroyed = False
+
+    def set_image(self, image):
+        """
+        Show an image, centred in the surface (layered surfaces take its size).
+
+        Args:
+            image: PIL image, uint8 RGB/RGBA array, or a handle from backend.make_image()
+                   (handles are shown by reference, so updating the handle updates the surface)
+        """
+        raise NotImplementedError
+
+    def set_alpha(self, alpha: float):
+        """Set whole-surface opacity (0.0-1.0); unchanged values cost nothing."""
+        raise NotImplementedError
+
+    def move(self, x, y, w=None, h=None):
+        """Move (and optionally resize) the surface."""
+        raise NotImplementedError
+
+    def hide(self):
+        raise NotImplementedError
+
+    def show(self):
+        raise NotImplementedError
+
+    def lift(self):
+        """Raise above the other topmost surfaces."""
+
+    def focus(self):
+        """Take keyboard focus (strict-mode windows)."""
+
+    def exists(self) -> bool:
+        return not self.destroyed
+
+    def destroy(self):
+        raise NotImplementedError
+
+
+class RenderBackend:
+    """Creates surfaces and keeps per-operation counters (calls and seconds)."""
+
+    name = "none"
+
+    def __init__(self):
+        self.counters = {op: [0, 0.0] for op in OPS}
+
+    def create_surface(self, x, y, w, h, bg: Optional[str] = 'black', alpha: float = 1.0,
+                       click_through: bool = False, layered: bool = False, locked: bool = False,
+                       on_click: Optional[Callable] = None, cursor: Optional[str] = None) -> Surface:
+        """
+        Create a borderless, topmost overlay.
+
+        Args:
+            x, y, w, h: Geometry in desktop coordinates
+            bg: Background colour ('#RRGGBB' or a Tk colour name)
+            alpha: Initial opacity
+            click_through: Mouse input passes through to what is underneath
+            layered: Per-pixel alpha from RGBA images; created hidden, show() after the first image.
+                     move() and set_alpha() take effect with the next set_image()
+            locked: Strict mode: cannot be closed or tabbed away from, and grabs focus
+            on_click: Called with the surface on a left click
+            cursor: Tk cursor name while hovering
+
+        Returns:
+            Surface
+        """
+        raise NotImplementedError
+
+    def create_text_surface(self, x, y, text: str, font: Tuple, fill: Optional[str],
+                            bg: Optional[str] = None, outline: Optional[str] = None,
+                            outline_offsets: Sequence[Tuple[int, int]] = (), size: Optional[Tuple[int, int]] = None,
+                            wrap: int = 0, pad: int = 20, alpha: float = 1.0, locked: bool = False,
+                            on_click: Optional[Callable] = None) -> Surface:
+        """
+        Create a surface showing centred text.
+
+        Args:
+            x, y: Top-left position
+            text: Text (newlines allowed)
+            font: Tk font tuple (family, size, weight)
+            fill: Text colour, or None for see-through text
+            bg: Background colour, or None for a see-through background
+            outline: Colour of the outline copies drawn behind the text
+            outline_offsets: (dx, dy) offsets of the outline copies
+            size: (w, h) of the surface; None fits the text plus pad
+            wrap: Wrap width in pixels (0 = no wrapping)
+            pad: Padding around the text when fitting
+            alpha: Initial opacity
+            locked: Strict mode, as for create_surface
+            on_click: Called with the surface on a left click
+
+        Returns:
+            Surface (w and h hold the final size)
+        """
+        raise NotImplementedError
+
+    def make_image(self, data, reuse=None):
+        """
+        Convert a PIL image or uint8 array into a displayable handle.
+
+        Args:
+            data: PIL image or (h, w, 3|4) uint8 array
+            reuse: Previous handle; updated in place when the size matches
+
+        Returns:
+            Handle for Surface.set_image (the same object as reuse when it was updated)
+        """
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """
+        Get operation counters.
+
+        Returns:
+            Dictionary of op -> {'count', 'ms'} plus the backend name
+        """
+        return {'backend': self.name,
+                **{op: {'count': n, 'ms': round(1000 * s, 2)} for op, (n, s) in self.counters.items()}}
+
+    def _record(self, op: str, started: float):
+        c = self.counters[op]
+        c[0] += 1
+        c[1] += time.perf_counter() - started
+
+
+# =============================================================================
+# TK / WIN32 BACKEND
+# =============================================================================
+
+class TkSurface(Surface):
+    """Surface backed by a Tk Toplevel; Tcl errors mark it destroyed instead of raising."""
+
+    def __init__(self, backend, win, x, y, w, h, alpha, layered=False, on_click=None, bg='black'):
+        super().__init__(backend, x, y, w, h, alpha, on_click)
+        self.win = win
+        self.layered = layered
+        self.hidden = layered
+        self.bg = bg
+        self.hwnd = None
+        self.label = None
+        self._photo = None   # Own PhotoImage for images given as PIL/arrays
+        self._shown = None   # PhotoImage currently on the label
+
+    def set_image(self, image):
+        if self.destroyed: return
+        started = time.perf_counter()
+        try:
+            if self.layered:
+                if isinstance(image, np.ndarray): image = Image.fromarray(image)
+                update_layered_window(self.hwnd, image, self.x, self.y, int(self.alpha * 255))
+            else:
+                if not isinstance(image, ImageTk.PhotoImage):
+                    image = self._photo = self.backend.make_image(image, reuse=self._photo)
+                if image is not self._shown:
+                    self._ensure_label().configure(image=image)
+                    self._shown = image
+        except tk.TclError as e:
+            self._lost(e)
+        self.backend._record('set_image', started)
+
+    def set_alpha(self, alpha):
+        if self.destroyed or alpha == self.alpha: return
+        started = time.perf_counter()
+        self.alpha = alpha
+        try:
+            if not self.layered:  # Layered: baked into the next UpdateLayeredWindow
+                self.win.attributes('-alpha', alpha)
+        except tk.TclError as e:
+            self._lost(e)
+        self.backend._record('set_alpha', started)
+
+    def move(self, x, y, w=None, h=None):
+        if self.destroyed: return
+        started = time.perf_counter()
+        self.x, self.y = int(x), int(y)
+        if w is not None: self.w, self.h = int(w), int(h)
+        try:
+            if self.layered: pass  # Positioned by the next UpdateLayeredWindow
+            elif w is None: self.win.geometry(f"+{self.x}+{self.y}")
+            else: self.win.geometry(f"{self.w}x{self.h}+{self.x}+{self.y}")
+        except tk.TclError as e:
+            self._lost(e)
+        self.backend._record('move', started)
+
+    def hide(self):
+        if self.destroyed or self.hidden: return
+        self.hidden = True
+        try:
+            self.win.withdraw()
+        except tk.TclError as e:
+            self._lost(e)
+
+    def show(self):
+        if self.destroyed or not self.hidden: return
+        self.hidden = False
+        try:
+            self.win.deiconify()
+            self.win.attributes('-topmost', True)
+            self.backend._pin_topmost(self.hwnd)
+        except tk.TclError as e:
+            self._lost(e)
+
+    def lift(self):
+        if self.destroyed: return
+        try:
+            self.win.lift()
+            self.win.attributes('-topmost', True)
+        except tk.TclError as e:
+            self._lost(e)
+
+    def focus(self):
+        if self.destroyed: return
+        try:
+            self.win.focus_force()
+        except tk.TclError as e:
+            self._lost(e)
+
+    def exists(self):
+        if self.destroyed: return False
+        try:
+            if self.win.winfo_exists(): return True
+        except tk.TclError:
+            pass
+        self.destroyed = True
+        return False
+
+    def destroy(self):
+        if self.destroyed: return
+        started = time.perf_counter()
+        self.destroyed = True
+        try:
+            self.win.destroy()
+        except tk.TclError:
+            pass  # Already destroyed
+        self.label = self._photo = self._shown = None
+        self.backend._record('destroy', started)
+
+    def _ensure_label(self):
+        if self.label is None:
+            self.label = tk.Label(self.win, bg=self.bg, bd=0, highlightthickness=0)
+            self.label.pack(expand=True, fill='both')  # Clicks reach the window binding through its bindtags
+        return self.label
+
+    def _lost(self, error):
+        logger.debug(f"Surface lost: {error}")
+        self.destroyed = True
+
+
+class TkBackend(RenderBackend):
+    """Overlays as borderless topmost Tk windows, styled through Win32 when available."""
+
+    name = "tk"
+
+    def __init__(self, root):
+        """
+        Initialize the backend.
+
+        Args:
+            root: Tk root the overlay windows belong to
+        """
+        super().__init__()
+        self.root = root
+
+    def create_surface(self, x, y, w, h, bg='black', alpha=1.0, click_through=False, layered=False,
+                       locked=False, on_click=None, cursor=None):
+        started = time.perf_counter()
+        win = self._new_window(x, y, w, h, bg or 'black', cursor)
+        if layered:
+            win.withdraw()  # Shown once the first frame has been painted
+        else:
+            win.attributes('-alpha', alpha)
+        surface = TkSurface(self, win, x, y, w, h, alpha, layered=layered, on_click=on_click, bg=bg or 'black')
+        if on_click: win.bind('<Button-1>', lambda e: surface.on_click(surface))
+        surface.hwnd = self._style(win, click_through or layered, locked, pin=not layered)
+        self._record('create', started)
+        return surface
+
+    def create_text_surface(self, x, y, text, font, fill, bg=None, outline=None, outline_offsets=(),
+                            size=None, wrap=0, pad=20, alpha=1.0, locked=False, on_click=None):
+        started = time.perf_counter()
+        key_bg = bg or TRANS_KEY
+        win = self._new_window(x, y, 1, 1, key_bg, None)
+        if bg is None or fill is None: win.wm_attributes("-transparentcolor", TRANS_KEY)
+        win.attributes('-alpha', alpha)
+        canvas = tk.Canvas(win, bg=key_bg, highlightthickness=0)
+        canvas.pack(fill="both", expand=True)
+
+        if size is None:
+            temp_id = canvas.create_text(0, 0, text=text, font=font, width=wrap, anchor="nw")
+            bbox = canvas.bbox(temp_id) or (0, 0, 200, 100)
+            canvas.delete(temp_id)
+            size = ((bbox[2] - bbox[0]) + pad * 2, (bbox[3] - bbox[1]) + pad * 2)
+        w, h = size
+        win.geometry(f"{w}x{h}+{int(x)}+{int(y)}")
+
+        surface = TkSurface(self, win, x, y, w, h, alpha, on_click=on_click, bg=key_bg)
+        cx, cy = w // 2, h // 2
+        for ox, oy in (outline_offsets if outline else ()):
+            canvas.create_text(cx + ox, cy + oy, text=text, font=font, width=wrap, fill=outline, justify="center")
+        canvas.create_text(cx, cy, text=text, font=font, width=wrap, fill=fill or TRANS_KEY, justify="center")
+        if on_click: win.bind('<Button-1>', lambda e: surface.on_click(surface))
+        surface.hwnd = self._style(win, False, locked)
+        self._record('create', started)
+        return surface
+
+    def make_image(self, data, reuse=None):
+        if isinstance(data, np.ndarray): data = Image.fromarray(data)
+        if reuse is not None and (reuse.width(), reuse.height()) == data.size:
+            reuse.paste(data)
+            return reuse
+        return ImageTk.PhotoImage(data)
+
+    def _new_window(self, x, y, w, h, bg, cursor):
+        win = tk.Toplevel(self.root)
+        win.overrideredirect(True)
+        win.config(bg=bg)
+        if cursor: win.config(cursor=cursor)
+        win.geometry(f"{int(w)}x{int(h)}+{int(x)}+{int(y)}")
+        win.attributes('-topmost', True)
+        return win
+
+    def _style(self, win, click_through, locked, pin=True):
+        """Apply window-manager behaviour; returns the HWND (or None off Windows)."""
+        try:
+            win.attributes("-toolwindow", 1)
+        except tk.TclError as e:
+            logger.debug(f"Could not set toolwindow: {e}")
+        if locked:
+            win.protocol("WM_DELETE_WINDOW", lambda: None)
+            win.bind('<Alt-F4>', lambda e: "break")
+            win.bind("<Tab>", lambda e: "break")
+            win.bind("<Alt-Tab>", lambda e: "break")
+            win.lift()
+            win.focus_force()
+        if windll is None: return None
+        try:
+            win.update_idletasks()
+            hwnd = windll.user32.GetParent(win.winfo_id()) or win.winfo_id()
+            if not locked:
+                ex_style = windll.user32.GetWindowLongW(hwnd, GWL_EXSTYLE)
+                ex_style |= WS_EX_TOPMOST | WS_EX_TOOLWINDOW | WS_EX_NOACTIVATE
+                if click_through: ex_style |= WS_EX_LAYERED | WS_EX_TRANSPARENT
+                windll.user32.SetWindowLongW(hwnd, GWL_EXSTYLE, ex_style)
+                if pin: self._pin_topmost(hwnd)
+            return hwnd
+        except (OSError, AttributeError, tk.TclError) as e:
+            logger.debug(f"Could not set window style: {e}")
+            return None
+
+    def _pin_topmost(self, hwnd):
+        if windll is None or not hwnd: return
+        try:
+            windll.user32.SetWindowPos(hwnd, HWND_TOPMOST, 0, 0, 0, 0,
+                                       SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE | SWP_SHOWWINDOW)
+        except (OSError, AttributeError) as e:
+            logger.debug(f"Could not pin window topmost: {e}")
+
+
+# =============================================================================
+# OFFSCREEN NUMPY BACKEND
+# =============================================================================
+
+class OffscreenImage(np.ndarray):
+    """Pixel buffer returned by OffscreenBackend.make_image (a plain uint8 array otherwise)."""
+
+
+class OffscreenSurface(Surface):
+    """Surface that only exists as pixels (or a colour) plus geometry, composited on demand."""
+
+    def __init__(self, backend, x, y, w, h, alpha, bg, layered=False, on_click=None):
+        super().__init__(backend, x, y, w, h, alpha, on_click)
+        self.bg = bg          # (r, g, b) or None for see-through
+        self.layered = layered
+        self.hidden = layered
+        self.pixels = None    # (h, w, 3|4) uint8 array, possibly shared with other surfaces
+        self._own = None      # Buffer reused for images given as PIL/arrays
+
+    def set_image(self, image):
+        if self.destroyed: return
+        started = time.perf_counter()
+        if isinstance(image, OffscreenImage):
+            self.pixels = image  # Shared by reference, like a Tk PhotoImage
+        else:
+            self.pixels = self._own = self.backend.make_image(image, reuse=self._own)
+        if self.layered: self.w, self.h = self.pixels.shape[1], self.pixels.shape[0]
+        self.backend._record('set_image', started)
+
+    def set_alpha(self, alpha):
+        if self.destroyed or alpha == self.alpha: return
+        started = time.perf_counter()
+        self.alpha = alpha
+        self.backend._record('set_alpha', started)
+
+    def move(self, x, y, w=None, h=None):
+        if self.destroyed: return
+        started = time.perf_counter()
+        self.x, self.y = int(x), int(y)
+        if w is not None: self.w, self.h = int(w), int(h)
+        self.backend._record('move', started)
+
+    def hide(self):
+        self.hidden = True
+
+    def show(self):
+        self.hidden = False
+
+    def lift(self):
+        if self.destroyed: return
+        surfaces = self.backend.surfaces
+        surfaces.remove(self)
+        surfaces.append(self)
+
+    def click(self):
+        """Simulate a left click."""
+        if not self.destroyed and self.on_click: self.on_click(self)
+
+    def destroy(self):
+        if self.destroyed: return
+        started = time.perf_counter()
+        self.destroyed = True
+        self.backend.surfaces.remove(self)
+        self.pixels = self._own = None
+        self.backend._record('destroy', started)
+
+
+class OffscreenBackend(RenderBackend):
+    """
+    Composites surfaces into a NumPy framebuffer covering the given monitors.
+
+    Nothing is drawn until composite() is called; surface operations only
+    update state, like a window system that presents once per frame. Stacking
+    order is creation order, with lift() moving a surface to the top.
+    """
+
+    name = "offscreen"
+
+    def __init__(self, monitors: List[Dict]):
+        """
+        Initialize the backend.
+
+        Args:
+            monitors: Monitor dicts (x, y, width, height) the framebuffer spans
+        """
+        super().__init__()
+        self.origin = (min(m['x'] for m in monitors), min(m['y'] for m in monitors))
+        width = max(m['x'] + m['width'] for m in monitors) - self.origin[0]
+        height = max(m['y'] + m['height'] for m in monitors) - self.origin[1]
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self.surfaces: List[OffscreenSurface] = []
+        self._fonts = {}
+
+    def create_surface(self, x, y, w, h, bg='black', alpha=1.0, click_through=False, layered=False,
+                       locked=False, on_click=None, cursor=None):
+        started = time.perf_counter()
+        surface = OffscreenSurface(self, x, y, w, h, alpha, self._rgb(bg) if not layered else None,
+                                   layered=layered, on_click=on_click)
+        self.surfaces.append(surface)
+        self._record('create', started)
+        return surface
+
+    def create_text_surface(self, x, y, text, font, fill, bg=None, outline=None, outline_offsets=(),
+                            size=None, wrap=0, pad=20, alpha=1.0, locked=False, on_click=None):
+        started = time.perf_counter()
+        # PIL's bundled font stands in for the Tk font; only the cost and coverage matter here
+        pil_font = self._font(font[1] if len(font) > 1 else 12)
+        probe = ImageDraw.Draw(Image.new('L', (1, 1)))
+        box = probe.multiline_textbbox((0, 0), text, font=pil_font, align="center")
+        if size is None: size = ((box[2] - box[0]) + pad * 2, (box[3] - box[1]) + pad * 2)
+        w, h = size
+        img = Image.new('RGBA', (w, h), self._rgb(bg) + (255,) if bg else (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        tx, ty = (w - (box[2] - box[0])) // 2, (h - (box[3] - box[1])) // 2
+        if outline:
+            for ox, oy in outline_offsets:
+                draw.multiline_text((tx + ox, ty + oy), text, font=pil_font, fill=outline, align="center")
+        draw.multiline_text((tx, ty), text, font=pil_font, align="center",
+                            fill=fill if fill else (0, 0, 0, 0))
+        surface = OffscreenSurface(self, x, y, w, h, alpha, None, on_click=on_click)
+        surface.pixels = np.asarray(img).copy()
+        self.surfaces.append(surface)
+        self._record('create', started)
+        return surface
+
+    def make_image(self, data, reuse=None):
+        arr = data if isinstance(data, np.ndarray) else np.asarray(
+            data if data.mode in ('RGB', 'RGBA') else data.convert('RGB'))
+        if reuse is not None and reuse.shape == arr.shape:
+            np.copyto(reuse, arr)
+            return reuse
+        return np.array(arr, dtype=np.uint8).view(OffscreenImage)
+
+    def composite(self) -> np.ndarray:
+        """
+        Draw every visible surface into the framebuffer.
+
+        Returns:
+            The (height, width, 3) uint8 framebuffer
+        """
+        started = time.perf_counter()
+        frame = self.frame
+        frame.fill(0)
+        for s in self.surfaces:
+            if s.hidden or s.alpha <= 0.0: continue
+            clip = (s.x, s.y, s.x + s.w, s.y + s.h)
+            if s.pixels is None:
+                if s.bg is not None: self._blend(s.bg, s.x, s.y, s.w, s.h, s.alpha, clip)
+                continue
+            ih, iw = s.pixels.shape[:2]
+            if s.layered or s.bg is None:
+                ix = s.x if s.layered else s.x + (s.w - iw) // 2
+                iy = s.y if s.layered else s.y + (s.h - ih) // 2
+                self._blend(s.pixels, ix, iy, iw, ih, s.alpha, clip)
+            else:
+                # Window alpha applies to background and image together
+                self._blend(self._flatten(s), s.x, s.y, s.w, s.h, s.alpha, clip)
+        self._record('composite', started)
+        return frame
+
+    @staticmethod
+    def _flatten(s):
+        """Surface background with its image centred on it, as one RGB array."""
+        out = np.empty((s.h, s.w, 3), dtype=np.float32)
+        out[...] = s.bg
+        ih, iw = s.pixels.shape[:2]
+        ix, iy = (s.w - iw) // 2, (s.h - ih) // 2
+        x0, y0, x1, y1 = max(ix, 0), max(iy, 0), min(ix + iw, s.w), min(iy + ih, s.h)
+        if x0 < x1 and y0 < y1:
+            px = s.pixels[y0 - iy:y1 - iy, x0 - ix:x1 - ix].astype(np.float32)
+            dst = out[y0:y1, x0:x1]
+            if px.shape[2] == 4:
+                a = px[..., 3:4] / 255.0
+                dst[...] = dst + (px[..., :3] - dst) * a
+            else:
+                dst[...] = px
+        return out
+
+    def _blend(self, src, x, y, w, h, alpha, clip):
+        ox, oy = self.origin
+        fh, fw = self.frame.shape[:2]
+        x0, y0 = max(x, clip[0], ox), max(y, clip[1], oy)
+        x1, y1 = min(x + w, clip[2], ox + fw), min(y + h, clip[3], oy + fh)
+        if x0 >= x1 or y0 >= y1: return
+        dst = self.frame[y0 - oy:y1 - oy, x0 - ox:x1 - ox]
+        if isinstance(src, tuple):
+            rgb, a = np.array(src, dtype=np.float32), alpha
+        else:
+            px = src[y0 - y:y1 - y, x0 - x:x1 - x]
+            rgb = px[..., :3].astype(np.float32)
+            a = px[..., 3:4].astype(np.float32) * (alpha / 255.0) if px.shape[2] == 4 else alpha
+        if not isinstance(a, np.ndarray) and a >= 1.0:
+            dst[...] = rgb
+        else:
+            dst[...] = dst + (rgb - dst) * a
+
+    def _font(self, size):
+        size = abs(int(size)) or 12
+        if size not in self._fonts:
+            try:
+                self._fonts[size] = ImageFont.load_default(size)
+            except TypeError:  # Pillow < 10.1 has a single fixed-size default font
+                self._fonts[size] = ImageFont.load_default()
+        return self._fonts[size]
+
+    @staticmethod
+    def _rgb(colour):
+        return ImageColor.getrgb(colour)[:3] if colour else None
@@ -242,11 +242,17 @@ SETTINGS_SCHEMA = {
     "image_scale": (float, 0.5, 2.5, 0.9),
     "image_alpha": (float, 0.1, 1.0, 1.0),
     "fade_duration": (float, 0.0, 2.0, 0.4),
+    "frame_cache_disk_mb": (int, 0, 10240, 512),
+    "frame_cache_mem_mb": (int, 0, 4096, 256),
+    "flash_prefetch_batches": (int, 0, 5, 2),
+    "decode_processes": (int, 0, 16, 0),
+    "dedupe_media": (bool, None, None, True),
     
     # Video settings
     "startle_enabled": (bool, None, None, True),
     "startle_freq": (int, 1, 20, 6),
     "startle_strict": (bool, None, None, False),
+    "adaptive_video_quality": (bool, None, None, True),
     "attention_enabled": (bool, None, None, False),
     "attention_density": (int, 1, 10, 3),
     
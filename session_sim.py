@@ -0,0 +1,407 @@
+"""
+Session Simulator Module for Conditioning Control Panel
+=======================================================
+Provides:
+- A headless FlasherEngine that runs on a virtual clock with a seeded RNG
+- Offscreen rendering (NumPy compositor) and a null audio backend
+- Synthetic media library, so no assets are read or decoded
+- Session report: event timeline, event density, peak concurrent windows,
+  XP curve, resource contention counters and render operation costs
+- Entry point used by `python main.py --simulate`
+"""
+
+import os
+import json
+import time
+import random
+from typing import Optional
+
+from PIL import Image
+
+from config import DEFAULT_SETTINGS, SETTINGS_FILE, PRESETS_FILE, xp_for_level
+from event_scheduler import EventScheduler, VirtualClock
+from engine import FlasherEngine
+from render_backend import OffscreenBackend
+from progression_system import ProgressionSystem, resource_mgr
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+
+SIM_IMAGES = 200
+SIM_VIDEOS = 12
+SIM_MONITORS = [{'x': 0, 'y': 0, 'width': 1920, 'height': 1080}]
+SIM_IMAGE_SIZES = [(1920, 1080), (1080, 1350), (1200, 1200), (800, 1200)]
+SIM_VIDEO_SECONDS = (30.0, 90.0)
+XP_SAMPLE_INTERVAL = 60.0
+DENSITY_BUCKET = 300.0  # Seconds per event-density bucket
+
+
+# =============================================================================
+# NULL BACKENDS
+# =============================================================================
+
+class NullDucker:
+    """Audio ducker that only counts calls."""
+
+    def __init__(self):
+        self.ducks = 0
+
+    def duck(self, strength=80):
+        self.ducks += 1
+
+    def unduck(self):
+        pass
+
+
+class SimRoot:
+    """Stands in for the Tk root: after() goes to the engine's scheduler, the rest is a no-op."""
+
+    def __init__(self, scheduler: EventScheduler):
+        self.scheduler = scheduler
+
+    def after(self, ms, fn, *args):
+        return self.scheduler.call_later(ms / 1000, fn, *args)
+
+    def after_cancel(self, event):
+        self.scheduler.cancel(event)
+
+    def deiconify(self): pass
+    def lift(self): pass
+    def withdraw(self): pass
+    def update(self): pass
+
+
+class InlineWorkerPool:
+    """WorkerPool replacement that runs every job immediately on the caller's thread."""
+
+    def submit(self, lane, fn, *args, token=None, on_cancel=None):
+        fn(*args)
+
+    def cancel_pending(self, lane=None):
+        return 0
+
+    def pending(self):
+        return 0
+
+    def shutdown(self):
+        pass
+
+
+class SimFrames:
+    """Single flat-colour still of a given size (what PackedFrames looks like to the engine)."""
+
+    delay = 0.1
+    _images = {}  # size -> shared PIL image
+
+    def __init__(self, size):
+        self.size = size
+
+    def __len__(self):
+        return 1
+
+    def frame(self, index):
+        if self.size not in SimFrames._images:
+            SimFrames._images[self.size] = Image.new('RGB', self.size, (255, 105, 180))
+        return SimFrames._images[self.size]
+
+
+class SimProgression(ProgressionSystem):
+    """Unlocks and video hand-off of the real progression system, without overlays or bubbles."""
+
+    def __init__(self, engine_ref):
+        self.engine = engine_ref
+        self.spiral = None
+        self.unlocks = {"pink_filter": False, "spiral": False, "bubbles": False}
+        self._is_shutdown = False
+        self.pink_opacity = 0.0
+
+    def prepare_for_video(self):
+        resource_mgr.prepare_for_video()
+
+    def update_visuals(self, pink_opacity=0.0):
+        self._is_shutdown = False
+        self.pink_opacity = pink_opacity if self.unlocks["pink_filter"] else 0.0
+
+    def shutdown(self):
+        self._is_shutdown = True
+        self.pink_opacity = 0.0
+
+
+# =============================================================================
+# SIMULATED ENGINE
+# =============================================================================
+
+class SimulatedEngine(FlasherEngine):
+    """
+    FlasherEngine on an offscreen render backend with audio and media stubbed.
+
+    Event scheduling, the intensity ramp, XP, the flash window lifecycle and
+    the resource manager run unmodified engine code, and flash windows are
+    real surfaces on an OffscreenBackend; only the leaves that would play
+    sound, read files or decode video are swapped out. Flash
+    sounds are not simulated, so every flash uses the silent 5 s duration,
+    and bubbles, hydra clicks and attention targets never happen.
+    """
+
+    def __init__(self, settings: dict, seed: int = 0, video_seconds=SIM_VIDEO_SECONDS):
+        """
+        Initialize the engine on a virtual clock.
+
+        Args:
+            settings: Full settings dictionary (copied; the original is untouched)
+            seed: RNG seed; the same seed and settings give the same session
+            video_seconds: (min, max) simulated startle video length
+        """
+        scheduler = EventScheduler(clock=VirtualClock())
+        super().__init__(SimRoot(scheduler), None, scheduler=scheduler, rng=random.Random(seed),
+                         backend=OffscreenBackend(SIM_MONITORS))
+        self.settings = json.loads(json.dumps(settings))
+        self.ducker = NullDucker()
+        self.progression = SimProgression(self)
+        self.worker_pool = InlineWorkerPool()
+        self.video_seconds = video_seconds
+        # Report data
+        self.timeline = []
+        self.peak_windows = 0
+        self.peak_windows_at = 0.0
+        self.flash_retries = 0
+        self.deferred_triggers = 0
+        self.level_ups = []
+
+    # --- Null services and media ---
+
+    def _start_services(self):
+        pass
+
+    def get_files(self, folder, unique=False):
+        if folder == self.paths['images']:
+            return [os.path.join(folder, f"sim_{i:04d}.png") for i in range(SIM_IMAGES)]
+        if folder == self.paths['startle_videos']:
+            return [os.path.join(folder, f"sim_{i:02d}.mp4") for i in range(SIM_VIDEOS)]
+        return []  # No flash sounds or subliminal audio
+
+    def _get_monitors_safe(self):
+        return [dict(m) for m in SIM_MONITORS]
+
+    def _prefetch_flash(self):
+        pass
+
+    def _load_flash_frames(self, path, monitor, is_startle, scale):
+        index = int(os.path.splitext(os.path.basename(path))[0].rsplit('_', 1)[-1])
+        orig_w, orig_h = SIM_IMAGE_SIZES[index % len(SIM_IMAGE_SIZES)]
+        _, _, w, h, _, _ = self._calculate_geometry(orig_w, orig_h, monitor, is_startle, scale)
+        return SimFrames((w, h))
+
+    def _duck_subliminal_channel(self, should_duck):
+        pass
+
+    def _play_levelup_sound(self):
+        self.level_ups.append((self._t(), self.settings.get('player_level', 1)))
+
+    # --- Rendering leaves ---
+
+    def _spawn_window_final(self, x, y, w, h, packed, is_startle, is_secondary):
+        super()._spawn_window_final(x, y, w, h, packed, is_startle, is_secondary)
+        if len(self.active_windows) > self.peak_windows:
+            self.peak_windows = len(self.active_windows)
+            self.peak_windows_at = self._t()
+
+    def _show_subliminal_visuals(self, text_content):
+        self._add_xp(1)
+        self._record('subliminal', text=text_content)
+
+    def _new_startle_pipeline(self, video_path):
+        return None
+
+    def _delayed_startle_prep(self, video_path, is_strict):
+        if not self.running:
+            self.busy = False
+            return
+        # Mirrors the state changes of _start_startle_player; the video "plays" until its end event
+        for win in self.active_windows: win.destroy()
+        self.active_windows.clear()
+        self.active_rects.clear()
+        self.video_running = True
+        self.progression.video_started()
+        self._do_duck()
+        self.attention_spawns = []
+        self.targets_hit = 0
+        self.targets_total = 0
+        self.session_targets_clicked = 0
+        self.retry_video_path = None
+        self._add_xp(50, is_video_context=True)
+        self.current_video_duration = self.rng.uniform(*self.video_seconds)
+        self.video_windows = []
+        self.video_surfaces = {}
+        self._record('startle', seconds=round(self.current_video_duration, 1), strict=bool(is_strict))
+        self.event_scheduler.call_later(self.current_video_duration, self._cleanup_video, tag='video')
+
+    # --- Instrumentation ---
+
+    def trigger_event(self, event_type, strict_override=False):
+        if self.running and event_type != 'subliminal':
+            # Same conditions under which the engine parks the event in events_pending_reschedule
+            if self.video_running or (event_type == 'flash' and (self.busy or self.active_windows)):
+                self.deferred_triggers += 1
+        super().trigger_event(event_type, strict_override)
+
+    def _finalize_show_images(self, data):
+        if self.running:
+            self._record('flash', images=len(data['processed_data']),
+                         hydra=bool(data['is_multiplication']))
+        super()._finalize_show_images(data)
+
+    def _retry_flash(self):
+        self.flash_retries += 1
+        super()._retry_flash()
+
+    def _t(self) -> float:
+        return round(self.event_scheduler.now(), 3)
+
+    def _record(self, kind, **detail):
+        self.timeline.append({'t': self._t(), 'type': kind, **detail})
+
+    def total_xp(self) -> float:
+        """XP earned across all levels so far (level 1, 0 XP = 0)."""
+        level = self.settings.get('player_level', 1)
+        return sum(xp_for_level(lvl) for lvl in range(1, level)) + self.settings.get('player_xp', 0.0)
+
+
+# =============================================================================
+# RUNNING A SIMULATION
+# =============================================================================
+
+def run_simulation(settings: dict, minutes: float = 60.0, seed: int = 0,
+                   video_seconds=SIM_VIDEO_SECONDS, render_fps: float = 0.0) -> dict:
+    """
+    Run one session in simulated time.
+
+    Args:
+        settings: Full settings dictionary
+        minutes: Simulated session length
+        seed: RNG seed
+        video_seconds: (min, max) simulated startle video length
+        render_fps: Composite the offscreen framebuffer this many times per
+            simulated second (0 = never; surfaces are still tracked)
+
+    Returns:
+        Report dictionary
+    """
+    resource_mgr._init()  # Shared singleton; start from a clean slate
+    engine = SimulatedEngine(settings, seed, video_seconds)
+    scheduler = engine.event_scheduler
+    start_xp = engine.total_xp()
+    xp_curve = []
+
+    def sample_xp():
+        xp_curve.append({'minute': round(scheduler.now() / 60, 2),
+                         'level': engine.settings.get('player_level', 1),
+                         'xp_total': round(engine.total_xp() - start_xp, 2),
+                         'intensity': round(engine.current_intensity_progress, 3)})
+        scheduler.call_later(XP_SAMPLE_INTERVAL, sample_xp, tag='sim')
+
+    def composite():
+        engine.render.composite()
+        scheduler.call_later(1.0 / render_fps, composite, tag='sim')
+
+    wall_start = time.perf_counter()
+    engine.start()
+    sample_xp()
+    if render_fps > 0: composite()
+    scheduler.advance(minutes * 60)
+    scheduler.cancel_tag('sim')
+    sample_xp()
+    engine.running = False
+    wall = time.perf_counter() - wall_start
+
+    counts = {}
+    density = {}
+    for ev in engine.timeline:
+        counts[ev['type']] = counts.get(ev['type'], 0) + 1
+        bucket = density.setdefault(int(ev['t'] // DENSITY_BUCKET), {})
+        bucket[ev['type']] = bucket.get(ev['type'], 0) + 1
+    return {
+        'seed': seed,
+        'minutes': minutes,
+        'wall_seconds': round(wall, 3),
+        'speedup': round(minutes * 60 / max(wall, 1e-6)),
+        'scheduler_enabled': bool(settings.get('scheduler_enabled')),
+        'counts': counts,
+        'density': [{'from_minute': b * DENSITY_BUCKET / 60, **density[b]} for b in sorted(density)],
+        'peak_windows': engine.peak_windows,
+        'peak_windows_at': engine.peak_windows_at,
+        'contention': {'flash_retries': engine.flash_retries,
+                       'deferred_triggers': engine.deferred_triggers},
+        'xp_gained': round(engine.total_xp() - start_xp, 2),
+        'level_ups': [{'t': t, 'level': lvl} for t, lvl in engine.level_ups],
+        'xp_curve': xp_curve,
+        'scheduler': scheduler.stats(),
+        'heartbeat_ticks': engine.heartbeat.stats(),
+        'render': engine.render.stats(),
+        'timeline': engine.timeline,
+    }
+
+
+def format_report(report: dict) -> str:
+    """
+    Human summary of a simulation report.
+
+    Args:
+        report: Output of run_simulation
+
+    Returns:
+        Multi-line text
+    """
+    lines = [
+        f"Simulated {report['minutes']:g} min in {report['wall_seconds']:.2f} s "
+        f"({report['speedup']}x), seed {report['seed']}, ramp {'on' if report['scheduler_enabled'] else 'off'}",
+        "Events: " + (", ".join(f"{k} {v}" for k, v in sorted(report['counts'].items())) or "none"),
+        f"Peak concurrent windows: {report['peak_windows']} at {report['peak_windows_at'] / 60:.1f} min",
+        f"Contention: {report['contention']['flash_retries']} flash retries, "
+        f"{report['contention']['deferred_triggers']} deferred triggers",
+        f"XP gained: {report['xp_gained']:.1f} ({len(report['level_ups'])} level-up(s))",
+        "Render ops: " + ", ".join(f"{op} {v['count']} ({v['ms']:.0f} ms)"
+                                   for op, v in report['render'].items() if op != 'backend' and v['count']),
+        "Density per 5 min:",
+    ]
+    for bucket in report['density']:
+        body = ", ".join(f"{k} {v}" for k, v in sorted(bucket.items()) if k != 'from_minute')
+        lines.append(f"  {bucket['from_minute']:5.0f}' {body}")
+    return "\n".join(lines)
+
+
+def load_settings(preset: Optional[str] = None) -> dict:
+    """
+    Settings to simulate: a named preset, else the saved settings, else defaults.
+
+    Args:
+        preset: Preset name from presets.json
+
+    Returns:
+        Full settings dictionary
+
+    Raises:
+        KeyError: The preset does not exist
+    """
+    settings = DEFAULT_SETTINGS.copy()
+    if preset:
+        with open(PRESETS_FILE, 'r') as f:
+            presets = json.load(f)
+        settings.update(presets[preset])
+    elif os.path.exists(SETTINGS_FILE):
+        try:
+            with open(SETTINGS_FILE, 'r') as f:
+                settings.update(json.load(f))
+        except (IOError, OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load settings, simulating defaults: {e}")
+    try:
+        from security import validate_settings
+        settings = validate_settings(settings)
+    except ImportError:
+        pass
+    return settings
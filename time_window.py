@@ -0,0 +1,130 @@
+"""
+Time Window Module for Conditioning Control Panel
+==================================================
+Provides:
+- The "only run during specific hours" schedule, parsed once from settings
+- Exact next start/stop instant, including windows that run past midnight
+  and the active weekday filter
+- Wall-clock to delay conversion that stays correct across DST changes
+"""
+
+import time
+import datetime
+from typing import Iterable, Optional, Tuple
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+
+ALL_WEEKDAYS = (0, 1, 2, 3, 4, 5, 6)
+SCAN_DAYS = 8  # One full week plus today covers every weekday pattern
+MAX_SLEEP = 3600.0  # Longest single wait, so a system clock change is noticed within the hour
+
+
+class DailyWindow:
+    """
+    A daily start-end time window limited to some weekdays.
+
+    Matches the schedule the engine has always applied: a moment is inside
+    the window when its own weekday is active and its time of day falls in
+    [start, end). When end <= start the window runs past midnight, so it is
+    [start, 24:00) plus [00:00, end) of each active day; start == end means
+    the whole day. Weekdays follow datetime.weekday() (Monday = 0).
+    """
+
+    def __init__(self, start: datetime.time, end: datetime.time, weekdays: Iterable[int] = ALL_WEEKDAYS):
+        """
+        Initialize the window.
+
+        Args:
+            start: Time of day the window opens
+            end: Time of day the window closes
+            weekdays: Active weekdays
+        """
+        self.start = start
+        self.end = end
+        self.weekdays = frozenset(weekdays)
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> Optional['DailyWindow']:
+        """
+        Parse the schedule settings.
+
+        Args:
+            settings: Settings dictionary
+
+        Returns:
+            DailyWindow, or None when the schedule is off or the times do not parse
+        """
+        if not settings.get('time_schedule_enabled', False): return None
+        start_str = settings.get('time_start_str', "16:00")
+        end_str = settings.get('time_end_str', "18:00")
+        try:
+            start = datetime.datetime.strptime(start_str, "%H:%M").time()
+            end = datetime.datetime.strptime(end_str, "%H:%M").time()
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring time schedule with invalid times: {start_str!r} - {end_str!r}")
+            return None
+        return cls(start, end, settings.get('active_weekdays', ALL_WEEKDAYS))
+
+    def key(self) -> Tuple:
+        """Identity of the schedule, to tell a real change from a re-save."""
+        return (self.start, self.end, self.weekdays)
+
+    def contains(self, moment: datetime.datetime) -> bool:
+        """
+        Whether a moment is inside the window.
+
+        Args:
+            moment: Local naive datetime
+
+        Returns:
+            True if the engine should be running at that moment
+        """
+        if moment.weekday() not in self.weekdays: return False
+        t = moment.time()
+        if self.start < self.end:
+            return self.start <= t < self.end
+        return t >= self.start or t < self.end
+
+    def next_transition(self, moment: datetime.datetime) -> Optional[Tuple[datetime.datetime, bool]]:
+        """
+        Find the next instant the window opens or closes.
+
+        The window only changes state at midnight, start or end of some day,
+        so those instants are checked in order for the next week.
+
+        Args:
+            moment: Local naive datetime to search from (exclusive)
+
+        Returns:
+            (instant, becomes_active), or None if the state never changes
+        """
+        inside = self.contains(moment)
+        day = datetime.datetime.combine(moment.date(), datetime.time())
+        for offset in range(SCAN_DAYS + 1):
+            d = day + datetime.timedelta(days=offset)
+            for edge in sorted({d, datetime.datetime.combine(d.date(), self.start),
+                                datetime.datetime.combine(d.date(), self.end)}):
+                if edge > moment and self.contains(edge) != inside:
+                    return edge, not inside
+        return None
+
+
+def seconds_until(instant: datetime.datetime) -> float:
+    """
+    Real seconds from now until a local wall-clock instant.
+
+    Goes through timestamps so a DST change in between is accounted for.
+
+    Args:
+        instant: Local naive datetime
+
+    Returns:
+        Seconds to wait (never negative)
+    """
+    return max(0.0, instant.timestamp() - time.time())
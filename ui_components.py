@@ -3,7 +3,6 @@ from tkinter import simpledialog, messagebox
 import customtkinter as ctk
 import math
 import random
-from ctypes import windll
 from config import THEME
 
 
@@ -163,12 +162,13 @@ class TextManagerDialog(ctk.CTkToplevel):
             self.refresh_list()
 
 
-class TransparentTextWindow(tk.Toplevel):
-    def __init__(self, parent, text, x, y, bounds_w, bounds_h, offset_x, offset_y, font_size, on_click_callback):
-        super().__init__(parent)
+class TransparentTextWindow:
+    """Bouncing click target drawn as a see-through text surface on a render backend."""
+
+    def __init__(self, backend, scheduler, text, x, y, bounds_w, bounds_h, offset_x, offset_y, font_size,
+                 on_click_callback):
+        self.scheduler = scheduler
         self.on_click = on_click_callback
-        self.overrideredirect(True)
-        self.attributes('-topmost', True)
         self.clicked = False
         self.pos_x = float(x)
         self.pos_y = float(y)
@@ -183,58 +183,21 @@ class TransparentTextWindow(tk.Toplevel):
         self.min_y = offset_y
         self.max_y = offset_y + bounds_h
 
-        # Transparency setup
-        TRANS_KEY = "#000001"
-        self.config(bg=TRANS_KEY)
-        self.wm_attributes("-transparentcolor", TRANS_KEY)
-        self.attributes("-alpha", 1.0)
-
-        self.canvas = tk.Canvas(self, bg=TRANS_KEY, highlightthickness=0)
-        self.canvas.pack(fill="both", expand=True)
-
-        # Measure text size
-        font_spec = ("Impact", int(font_size), "normal")
-        wrap_w = int(font_size * 10)
-        temp_id = self.canvas.create_text(0, 0, text=text, font=font_spec, width=wrap_w, anchor="nw")
-        bbox = self.canvas.bbox(temp_id)
-        self.canvas.delete(temp_id)
-        if not bbox: bbox = (0, 0, 200, 100)
-
-        pad = 20
-        self.w_width = (bbox[2] - bbox[0]) + pad * 2
-        self.w_height = (bbox[3] - bbox[1]) + pad * 2
-        self.geometry(f"{self.w_width}x{self.w_height}+{int(x)}+{int(y)}")
-
-        # Make clicks pass through transparent areas (Windows specific)
-        try:
-            hwnd = windll.user32.GetParent(self.winfo_id())
-            # WS_EX_LAYERED | WS_EX_TRANSPARENT
-            windll.user32.SetWindowLongW(hwnd, -20, 0x08000000 | 0x00000008)
-        except:
-            pass
-
-        # Draw Outline (Stroke)
-        center_x, center_y = self.w_width // 2, self.w_height // 2
+        # Text with a 12-step black outline; clicks pass through everything but the text window
         border_thickness = 3
         steps = 12
-        for i in range(steps):
-            angle_rad = (2 * math.pi * i) / steps
-            ox = border_thickness * math.cos(angle_rad)
-            oy = border_thickness * math.sin(angle_rad)
-            t = self.canvas.create_text(center_x + ox, center_y + oy, text=text, font=font_spec,
-                                        width=wrap_w, fill="black", justify="center")
-            self.canvas.tag_bind(t, "<Button-1>", self.handle_click)
-
-        # Draw Main Text
-        self.text_id = self.canvas.create_text(center_x, center_y, text=text, font=font_spec,
-                                               width=wrap_w, fill="#FF00FF", justify="center")
-        self.canvas.tag_bind(self.text_id, "<Button-1>", self.handle_click)
-        self.canvas.bind("<Button-1>", self.handle_click)
+        offsets = [(border_thickness * math.cos(2 * math.pi * i / steps),
+                    border_thickness * math.sin(2 * math.pi * i / steps)) for i in range(steps)]
+        self.surface = backend.create_text_surface(x, y, text, ("Impact", int(font_size), "normal"), "#FF00FF",
+                                                   outline="black", outline_offsets=offsets,
+                                                   wrap=int(font_size * 10), on_click=self.handle_click)
+        self.w_width = self.surface.w
+        self.w_height = self.surface.h
 
         self.animate_move()
 
     def animate_move(self):
-        if not self.winfo_exists() or self.clicked: return
+        if self.surface.destroyed or self.clicked: return
         self.pos_x += self.vx
         self.pos_y += self.vy
 
@@ -253,29 +216,27 @@ class TransparentTextWindow(tk.Toplevel):
             self.pos_y = self.max_y - self.w_height;
             self.vy *= -1
 
-        try:
-            self.geometry(f"+{int(self.pos_x)}+{int(self.pos_y)}")
-            self.lift()
-            self.attributes('-topmost', True)
-            self.after(20, self.animate_move)
-        except Exception:
-            pass
-
-    def handle_click(self, event):
+        self.surface.move(self.pos_x, self.pos_y)
+        self.surface.lift()
+        self.scheduler.call_later(0.02, self.animate_move)
+
+    def handle_click(self, surface=None):
         if self.clicked: return
         self.clicked = True
         self.on_click()
         self.start_fade_out()
 
     def start_fade_out(self):
-        if not self.winfo_exists(): return
-        try:
-            alpha = self.attributes("-alpha")
-            if alpha > 0.05:
-                alpha -= 0.15
-                self.attributes("-alpha", alpha)
-                self.after(30, self.start_fade_out)
-            else:
-                self.destroy()
-        except Exception:
-            pass
\ No newline at end of file
+        if self.surface.destroyed: return
+        alpha = self.surface.alpha
+        if alpha > 0.05:
+            self.surface.set_alpha(alpha - 0.15)
+            self.scheduler.call_later(0.03, self.start_fade_out)
+        else:
+            self.surface.destroy()
+
+    def lift(self):
+        self.surface.lift()
+
+    def destroy(self):
+        self.surface.destroy()
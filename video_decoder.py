@@ -0,0 +1,682 @@
+"""
+Video Decoder Module for Conditioning Control Panel
+====================================================
+Provides:
+- Background decode thread for startle videos
+- ffmpeg raw-pipe source that decodes straight to RGB at display size,
+  with a cv2.VideoCapture fallback
+- Colour conversion and per-monitor scaling off the Tk main thread
+- Small bounded ring buffer of ready-to-blit frames picked by timestamp
+- Audio-master playback clock, sequential frame dropping and rare seeks
+- Per-video dropped-frame and drift counters and per-stage timing
+- Adaptive quality governor that trades resolution, resize quality and
+  frame rate for smooth playback when frames miss their time budget
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from video_telemetry import PlaybackTelemetry
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+
+RING_CAPACITY = 6   # Frames decoded ahead of the display
+DEFAULT_PREROLL = 1.0  # Seconds buffered while a startle is being announced
+PREROLL_MAX_BYTES = 96 * 1024 * 1024  # Cap on frames buffered before playback starts
+SEEK_THRESHOLD = 1.0  # Seconds behind before seeking; anything less is skipped by grabbing
+AUDIO_START_GRACE = 1.0  # Seconds to hold the first frame while the soundtrack spins up
+
+
+def fit_size(src_w: int, src_h: int, box_w: int, box_h: int) -> Tuple[int, int]:
+    """
+    Largest size with the source aspect ratio that fits inside a box.
+
+    Args:
+        src_w: Source width
+        src_h: Source height
+        box_w: Box width
+        box_h: Box height
+
+    Returns:
+        Tuple of (width, height)
+    """
+    scale = min(box_w / src_w, box_h / src_h)
+    return max(1, int(src_w * scale)), max(1, int(src_h * scale))
+
+
+# =============================================================================
+# FRAME SOURCES
+# =============================================================================
+
+class FFmpegSource:
+    """
+    Frames from an ffmpeg rawvideo pipe, scaled inside ffmpeg to fit a
+    display box and delivered as RGB, so no full-resolution frame ever
+    reaches Python.
+
+    Seeking restarts the pipe with an input-side -ss, which jumps to the
+    nearest keyframe in the demuxer and only decodes (never scales or
+    converts) the frames up to the target.
+
+    With a step above 1 ffmpeg's framestep filter drops the in-between
+    frames before scaling, so each delivered frame advances the video by
+    `step` source frames.
+    """
+
+    def __init__(self, path: str, box: Tuple[int, int]):
+        """
+        Start the pipe.
+
+        Args:
+            path: Video file path
+            box: (width, height) the frames must fit in
+
+        Raises:
+            ImportError, RuntimeError, OSError: ffmpeg is unavailable or
+                could not open the file
+        """
+        import imageio_ffmpeg
+        self._read_frames = imageio_ffmpeg.read_frames
+        self.path = path
+        self.box = box
+        self.step = 1
+        self._gen = None
+        meta = self._open(0.0)
+        self.fps = meta.get('fps') or 30
+        self.duration = meta.get('duration') or 0.0
+        if self.duration <= 0:
+            self.release()
+            raise RuntimeError("ffmpeg reported no duration")
+        self.frame_count = int(self.duration * self.fps)
+
+    def _open(self, start: float) -> dict:
+        vf = f"scale={self.box[0]}:{self.box[1]}:force_original_aspect_ratio=decrease"
+        if self.step > 1:
+            vf = f"framestep={self.step}," + vf
+        self._gen = self._read_frames(self.path, pix_fmt='rgb24',
+                                      input_params=['-ss', f"{start:.3f}"] if start > 0 else None,
+                                      output_params=['-vf', vf])
+        try:
+            meta = next(self._gen)
+        except StopIteration:
+            raise RuntimeError(f"ffmpeg could not open {self.path}")
+        self.width, self.height = meta['size']
+        return meta
+
+    def read_raw(self) -> Optional[bytes]:
+        """Next frame as delivered by the decoder, or None at the end."""
+        try:
+            return next(self._gen)
+        except StopIteration:
+            return None
+
+    def to_rgb(self, raw: bytes) -> np.ndarray:
+        """View a raw frame as an (h, w, 3) RGB array (ffmpeg already converted it)."""
+        return np.frombuffer(raw, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+    def grab(self) -> bool:
+        """Skip one delivered frame."""
+        try:
+            next(self._gen)
+            return True
+        except StopIteration:
+            return False
+
+    def seek(self, index: int) -> int:
+        """Restart the pipe at a frame index and return that index."""
+        self._gen.close()
+        self._open(index / self.fps)
+        return index
+
+    def configure(self, index: int, box: Tuple[int, int], step: int) -> int:
+        """
+        Change the output size and frame step, restarting the pipe if needed.
+
+        Args:
+            index: Frame index to continue from
+            box: (width, height) the frames must fit in
+            step: Source frames advanced per delivered frame
+
+        Returns:
+            Frame index of the next delivered frame
+        """
+        if (box, step) == (self.box, self.step):
+            return index
+        self.box, self.step = box, step
+        return self.seek(index)
+
+    def release(self):
+        if self._gen is not None:
+            self._gen.close()
+            self._gen = None
+
+
+class CaptureSource:
+    """
+    Frames from cv2.VideoCapture at source resolution (fallback source).
+
+    With a step above 1 the in-between frames are skipped with grab(), which
+    demuxes and decodes them but never converts them to an image.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open the capture.
+
+        Args:
+            path: Video file path
+
+        Raises:
+            OSError: The file could not be opened
+        """
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise OSError(f"Could not open video {path}")
+        self.step = 1
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.duration = self.frame_count / self.fps
+
+    def read_raw(self) -> Optional[np.ndarray]:
+        """Next frame as a BGR array, or None at the end."""
+        ret, frame = self.cap.read()
+        if not ret or frame is None:
+            return None
+        for _ in range(self.step - 1):
+            self.cap.grab()
+        return frame
+
+    def to_rgb(self, raw: np.ndarray) -> np.ndarray:
+        """Convert a BGR frame to RGB."""
+        return cv2.cvtColor(raw, cv2.COLOR_BGR2RGB)
+
+    def grab(self) -> bool:
+        """Skip one delivered frame without decoding it to an image."""
+        return all(self.cap.grab() for _ in range(self.step))
+
+    def seek(self, index: int) -> int:
+        """Seek to a frame index and return the index the capture landed on."""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        landed = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        return landed if landed > 0 else index
+
+    def configure(self, index: int, box: Tuple[int, int], step: int) -> int:
+        """
+        Change the frame step. Scaling is left to the decoder.
+
+        Args:
+            index: Frame index to continue from
+            box: Ignored; the capture always delivers source resolution
+            step: Source frames advanced per delivered frame
+
+        Returns:
+            Frame index of the next delivered frame
+        """
+        self.step = step
+        return index
+
+    def release(self):
+        self.cap.release()
+
+
+def open_source(path: str, boxes: List[Tuple[int, int]], use_ffmpeg: bool = True):
+    """
+    Open the cheapest available frame source for a video.
+
+    Args:
+        path: Video file path
+        boxes: Display boxes the frames are shown in
+        use_ffmpeg: Try the ffmpeg pipe before OpenCV
+
+    Returns:
+        FFmpegSource or CaptureSource, or None if the video cannot be opened
+    """
+    if use_ffmpeg and boxes:
+        try:
+            return FFmpegSource(path, max(boxes, key=lambda b: b[0] * b[1]))
+        except (ImportError, RuntimeError, OSError, KeyError) as e:
+            logger.debug(f"ffmpeg pipe unavailable for {path}, using OpenCV: {e}")
+    try:
+        return CaptureSource(path)
+    except (OSError, cv2.error) as e:
+        logger.warning(f"Could not open video {path}: {e}")
+        return None
+
+
+# =============================================================================
+# PLAYBACK
+# =============================================================================
+
+class PlaybackClock:
+    """
+    Playback time source with the soundtrack as master.
+
+    While the audio stream is playing, its position is the clock, so video
+    follows what is heard. Before audio starts the first frame is held (up
+    to AUDIO_START_GRACE); without audio, or after it ends, the clock runs
+    on the wall clock from the last audio position. Audio that misses the
+    grace period is ignored for the rest of the playback, so the clock
+    never jumps back to a late-starting soundtrack.
+    """
+
+    def __init__(self, audio=None):
+        """
+        Initialize the clock.
+
+        Args:
+            audio: Object with started, finished and position attributes
+                (an AudioStream), or None for wall-clock playback
+        """
+        self.audio = audio
+        self._start = time.monotonic()
+        self._anchor = None  # (monotonic time, playback time) of the last audio reading
+
+    def now(self) -> float:
+        """Current playback time in seconds."""
+        audio = self.audio
+        if audio is not None and not audio.finished:
+            if audio.started:
+                t = audio.position
+                self._anchor = (time.monotonic(), t)
+                return t
+            if time.monotonic() - self._start < AUDIO_START_GRACE:
+                return 0.0
+            if self._anchor is None:
+                self.audio = None  # Missed the grace period: wall clock for good
+        if self._anchor:
+            return self._anchor[1] + time.monotonic() - self._anchor[0]
+        return time.monotonic() - self._start
+
+
+# Quality ladder, best first. Cheaper resizing goes first, then a smaller
+# picture, then half-rate display (every other frame, each shown twice).
+QUALITY_LEVELS = (
+    {'name': 'full', 'scale': 1.0, 'interp': cv2.INTER_LINEAR, 'step': 1},
+    {'name': 'fast-resize', 'scale': 1.0, 'interp': cv2.INTER_NEAREST, 'step': 1},
+    {'name': '75%', 'scale': 0.75, 'interp': cv2.INTER_NEAREST, 'step': 1},
+    {'name': '75% half-rate', 'scale': 0.75, 'interp': cv2.INTER_NEAREST, 'step': 2},
+    {'name': '50% half-rate', 'scale': 0.5, 'interp': cv2.INTER_NEAREST, 'step': 2},
+)
+GOVERNOR_SMOOTHING = 0.15   # EMA weight of the newest frame time
+STEP_DOWN_LOAD = 0.9        # Fraction of the frame budget that counts as falling behind
+STEP_UP_LOAD = 0.6          # Predicted load one level up that counts as headroom
+STEP_DOWN_SETTLE = 0.5      # Seconds at a level before stepping down again
+STEP_UP_SETTLE = 3.0        # Seconds at a level before stepping back up
+
+
+class QualityGovernor:
+    """
+    Picks the playback quality level from measured frame times.
+
+    The decode thread reports its per-frame work (decode + convert +
+    resize) and the Tk thread its blit time. The two run in parallel, so
+    the slower one sets the load: its smoothed time as a fraction of the
+    time one delivered frame is on screen. Sustained overload steps down
+    one level; stepping back up only happens when the next level up is
+    predicted to fit comfortably, and only after the current level has had
+    time to settle, so the picture does not flap between levels.
+    """
+
+    def __init__(self, fps: float, enabled: bool = True):
+        """
+        Initialize the governor at full quality.
+
+        Args:
+            fps: Native frame rate of the video
+            enabled: False pins playback at full quality
+        """
+        self.frame_time = 1.0 / (fps or 30)
+        self.enabled = enabled
+        self.level = 0
+        self.worst = 0
+        self.changes = 0
+        self._work = None
+        self._blit = None
+        self._changed_at = time.monotonic()
+
+    @property
+    def params(self) -> dict:
+        """Settings of the current level (name, scale, interp, step)."""
+        return QUALITY_LEVELS[self.level]
+
+    def note_work(self, seconds: float):
+        """Record the decode thread's work for one delivered frame."""
+        self._work = seconds if self._work is None else self._work + GOVERNOR_SMOOTHING * (seconds - self._work)
+
+    def note_blit(self, seconds: float):
+        """Record the Tk thread's blit time for one displayed frame."""
+        self._blit = seconds if self._blit is None else self._blit + GOVERNOR_SMOOTHING * (seconds - self._blit)
+
+    def load(self) -> float:
+        """Smoothed frame cost as a fraction of the current level's frame budget."""
+        cost = max(self._work or 0.0, self._blit or 0.0)
+        return cost / (self.frame_time * self.params['step'])
+
+    def update(self) -> bool:
+        """
+        Re-evaluate the level. Called by the decode thread once per frame.
+
+        Returns:
+            True if the level changed
+        """
+        if not self.enabled or self._work is None:
+            return False
+        settled = time.monotonic() - self._changed_at
+        load = self.load()
+        if load > STEP_DOWN_LOAD and settled >= STEP_DOWN_SETTLE and self.level < len(QUALITY_LEVELS) - 1:
+            self._set_level(self.level + 1, load)
+            return True
+        if self.level > 0 and settled >= STEP_UP_SETTLE:
+            cur, up = self.params, QUALITY_LEVELS[self.level - 1]
+            # Work scales roughly with output pixels and with frames per second
+            predicted = load * (up['scale'] / cur['scale']) ** 2 * (cur['step'] / up['step'])
+            if up['interp'] != cur['interp']:
+                predicted *= 1.25
+            if predicted < STEP_UP_LOAD:
+                self._set_level(self.level - 1, load)
+                return True
+        return False
+
+    def _set_level(self, level: int, load: float):
+        logger.debug(f"Video quality {self.params['name']} -> {QUALITY_LEVELS[level]['name']} "
+                     f"(load {load:.2f})")
+        self.level = level
+        self.worst = max(self.worst, level)
+        self.changes += 1
+        # Times measured at the old level say little about the new one
+        self._work = self._blit = None
+        self._changed_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """
+        Get governor counters.
+
+        Returns:
+            Dictionary with the current and worst level names and the number of changes
+        """
+        return {
+            'quality': self.params['name'],
+            'quality_worst': QUALITY_LEVELS[self.worst]['name'],
+            'quality_changes': self.changes,
+        }
+
+
+class VideoDecoder:
+    """
+    Decodes a video on a worker thread into a bounded ring of frames.
+
+    Every ring entry is (pts_seconds, {box: rgb_array}) with one RGB array
+    already scaled for each distinct display box, so the main thread only
+    has to pick the frame that is due and blit it.
+
+    When the display clock runs ahead of the decoder, late frames are
+    skipped sequentially with grab() (no conversion or scaling); only a gap
+    longer than SEEK_THRESHOLD triggers a seek, because a seek has to
+    decode forward from the previous keyframe and is usually slower than
+    just reading on.
+
+    A QualityGovernor watches the frame times and lowers (or restores) the
+    output size, resize interpolation and frame step between frames.
+    """
+
+    def __init__(self, path: str, boxes: Iterable[Tuple[int, int]], capacity: int = RING_CAPACITY,
+                 use_ffmpeg: bool = True, adaptive: bool = True):
+        """
+        Open the video. Decoding starts with start().
+
+        Args:
+            path: Video file path
+            boxes: (width, height) of every display area the frames are
+                shown in; frames are letterboxed to fit each one
+            capacity: Ring buffer size in frames
+            use_ffmpeg: Decode through the ffmpeg pipe when available
+            adaptive: Let the quality governor lower quality when frames
+                miss their time budget
+        """
+        self.path = path
+        self.boxes = list(dict.fromkeys(boxes))
+        self.capacity = max(1, capacity)
+        self._base_capacity = self.capacity
+        self._preroll = 0.0
+        self.source = open_source(path, self.boxes, use_ffmpeg)
+        self.opened = self.source is not None
+        self.backend = 'ffmpeg' if isinstance(self.source, FFmpegSource) else 'opencv'
+        self.fps = self.source.fps if self.opened else 30
+        self.frame_count = self.source.frame_count if self.opened else 0
+        self.duration = self.source.duration if self.opened else 0.0
+        self.running = False
+        self.eof = False
+        self._ring = deque()
+        self._cond = threading.Condition()
+        self._target = 0.0
+        self._thread = None
+        self._max_grab = max(1, int(self.fps * SEEK_THRESHOLD))
+        # Counters
+        self.decoded = 0
+        self.shown = 0
+        self.dropped = 0
+        self.seeks = 0
+        self._drift_sum = 0.0
+        self.max_drift = 0.0
+        self.telemetry = PlaybackTelemetry()
+        self.governor = QualityGovernor(self.fps, adaptive)
+
+    def start(self, preroll: float = 0.0):
+        """
+        Start decoding on a daemon thread.
+
+        Args:
+            preroll: Seconds of video to buffer before playback starts
+                (bounded by PREROLL_MAX_BYTES); call end_preroll() once
+                playback runs to shrink the ring back to its normal size
+        """
+        if self.running or not self.opened:
+            return
+        self._preroll = preroll
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop decoding. The capture is released by the decode thread."""
+        with self._cond:
+            self.running = False
+            self._ring.clear()
+            self._cond.notify_all()
+        if self._thread is None and self.source is not None:
+            self.source.release()
+            self.source = None
+
+    def end_preroll(self):
+        """Return to the normal ring size; buffered frames are consumed as they fall due."""
+        with self._cond:
+            self._preroll = 0.0
+            self.capacity = self._base_capacity
+            self._cond.notify_all()
+        self.telemetry.mark_start()
+
+    def record_blit(self, seconds: float):
+        """
+        Record the Tk thread's blit time for one displayed frame.
+
+        Args:
+            seconds: Elapsed time
+        """
+        self.telemetry.add('blit', seconds)
+        self.governor.note_blit(seconds)
+
+    def peek(self) -> Optional[Dict[Tuple[int, int], "object"]]:
+        """
+        Get the next frame without consuming it.
+
+        Returns:
+            Mapping of display box -> RGB array, or None if nothing is decoded
+        """
+        with self._cond:
+            return self._ring[0][1] if self._ring else None
+
+    def wait_ready(self, timeout: float) -> bool:
+        """
+        Wait until at least one frame is buffered (or decoding ended).
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if a frame is available
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._ring or self.eof or not self.running, timeout)
+            return bool(self._ring)
+
+    @property
+    def finished(self) -> bool:
+        """True once the whole video has been decoded and consumed."""
+        with self._cond:
+            return self.eof and not self._ring
+
+    def frame_for(self, t: float) -> Optional[Dict[Tuple[int, int], "object"]]:
+        """
+        Take the newest frame that is due at a timestamp.
+
+        Older due frames are discarded; frames that are not due yet stay
+        in the ring.
+
+        Args:
+            t: Playback time in seconds
+
+        Returns:
+            Mapping of display box -> RGB array, or None if no new frame is due
+        """
+        due = None
+        with self._cond:
+            self._target = t
+            while self._ring and self._ring[0][0] <= t:
+                if due is not None:
+                    self.dropped += 1
+                due = self._ring.popleft()
+            if due is not None:
+                drift = t - due[0]
+                self.shown += 1
+                self._drift_sum += drift
+                self.max_drift = max(self.max_drift, drift)
+            self._cond.notify_all()
+        return due[1] if due else None
+
+    def stats(self) -> dict:
+        """
+        Get playback counters.
+
+        Returns:
+            Dictionary with decoded, shown, dropped and seeks counts, the
+            average and worst display lateness (drift) in milliseconds and
+            the quality governor's levels
+        """
+        with self._cond:
+            return {
+                **self.governor.stats(),
+                'decoded': self.decoded,
+                'shown': self.shown,
+                'dropped': self.dropped,
+                'seeks': self.seeks,
+                'backend': self.backend,
+                'drift_avg_ms': round(1000 * self._drift_sum / self.shown, 1) if self.shown else 0.0,
+                'drift_max_ms': round(1000 * self.max_drift, 1),
+            }
+
+    def _scale(self, rgb, quality: dict) -> Dict[Tuple[int, int], "object"]:
+        h, w = rgb.shape[:2]
+        scale = quality['scale']
+        out = {}
+        by_size = {}
+        for box in self.boxes:
+            size = fit_size(w, h, max(1, int(box[0] * scale)), max(1, int(box[1] * scale)))
+            if size not in by_size:
+                by_size[size] = rgb if size == (w, h) else cv2.resize(rgb, size, interpolation=quality['interp'])
+            out[box] = by_size[size]
+        return out
+
+    def _run(self):
+        next_index = 0
+        applied = QUALITY_LEVELS[0]
+        largest = max(self.boxes, key=lambda b: b[0] * b[1], default=(1, 1))
+        try:
+            while True:
+                with self._cond:
+                    while self.running and len(self._ring) >= self.capacity:
+                        self._cond.wait(0.1)
+                    if not self.running:
+                        return
+                    target_index = int(self._target * self.fps)
+
+                quality = self.governor.params
+                if quality is not applied:
+                    box = (max(1, int(largest[0] * quality['scale'])), max(1, int(largest[1] * quality['scale'])))
+                    next_index = self.source.configure(next_index, box, quality['step'])
+                    applied = quality
+                step = self.source.step
+
+                # Behind the display clock: skip the frames that are already late
+                gap = target_index - next_index
+                if gap > self._max_grab:
+                    skipped_to = self.source.seek(target_index)
+                    with self._cond:
+                        self.seeks += 1
+                        self.dropped += max(0, skipped_to - next_index) // step
+                    next_index = skipped_to
+                else:
+                    grabbed = 0
+                    while gap >= step:
+                        if not self.source.grab():
+                            break
+                        next_index += step
+                        gap -= step
+                        grabbed += 1
+                    if grabbed:
+                        with self._cond:
+                            self.dropped += grabbed
+
+                t0 = time.perf_counter()
+                raw = self.source.read_raw()
+                if raw is None:
+                    break
+                t1 = time.perf_counter()
+                rgb = self.source.to_rgb(raw)
+                t2 = time.perf_counter()
+                images = self._scale(rgb, quality)
+                t3 = time.perf_counter()
+                self.telemetry.add('decode', t1 - t0)
+                self.telemetry.add('convert', t2 - t1)
+                self.telemetry.add('resize', t3 - t2)
+                self.governor.note_work(t3 - t0)
+                self.governor.update()
+                with self._cond:
+                    if not self.running:
+                        return
+                    if self._preroll and not self.decoded:
+                        frame_bytes = max(1, sum(a.nbytes for a in {id(a): a for a in images.values()}.values()))
+                        self.capacity = max(self._base_capacity,
+                                            min(int(self._preroll * self.fps), PREROLL_MAX_BYTES // frame_bytes))
+                    self._ring.append((next_index / self.fps, images))
+                    self.decoded += 1
+                    self._cond.notify_all()
+                next_index += step
+        except (cv2.error, OSError, RuntimeError, ValueError) as e:
+            self.telemetry.errors += 1
+            logger.warning(f"Video decode failed for {self.path}: {e}")
+        finally:
+            with self._cond:
+                self.eof = True
+            self.source.release()
+            self.source = None
@@ -0,0 +1,228 @@
+"""
+Video Proxy Module for Conditioning Control Panel
+==================================================
+Provides:
+- Offline transcoding of startle videos into display-resolution proxies
+  encoded for cheap real-time decoding
+- Proxy lookup that only returns a proxy for the unchanged source
+- Maintenance entry point used by `python main.py --build-proxies`
+"""
+
+import os
+import hashlib
+import subprocess
+from typing import Iterable, Optional, Tuple
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+from media_library import VIDEO_EXTENSIONS
+
+
+PROXY_EXT = ".mp4"
+DEFAULT_PROXY_SIZE = (1920, 1080)
+
+# H.264 with fastdecode (no CABAC, no deblocking) and a keyframe every second,
+# so decoding is cheap and any seek lands close to its target
+PROXY_VIDEO_ARGS = [
+    '-c:v', 'libx264', '-preset', 'veryfast', '-tune', 'fastdecode',
+    '-crf', '21', '-pix_fmt', 'yuv420p', '-force_key_frames', 'expr:gte(t,n_forced*1)',
+    '-movflags', '+faststart', '-an',
+]
+
+
+class ProxyStore:
+    """
+    Display-resolution proxies for source videos.
+
+    A proxy is named after its source's path, mtime and size, so editing or
+    replacing a source makes its old proxy unreachable; the player simply
+    falls back to the source until the proxy is rebuilt.
+    """
+
+    def __init__(self, proxy_dir: str):
+        """
+        Initialize the store.
+
+        Args:
+            proxy_dir: Directory the proxy files live in
+        """
+        self.proxy_dir = proxy_dir
+
+    def proxy_path(self, video_path: str) -> Optional[str]:
+        """
+        Get the proxy path for a source video's current version.
+
+        Args:
+            video_path: Source video path
+
+        Returns:
+            Proxy file path (which may not exist yet), or None if the source
+            cannot be read
+        """
+        video_path = os.path.abspath(video_path)
+        try:
+            st = os.stat(video_path)
+        except OSError:
+            return None
+        key = f"{video_path}|{st.st_mtime_ns}|{st.st_size}".encode('utf-8', errors='surrogateescape')
+        return os.path.join(self.proxy_dir, hashlib.blake2b(key, digest_size=16).hexdigest() + PROXY_EXT)
+
+    def find(self, video_path: str) -> Optional[str]:
+        """
+        Look up a ready proxy for a source video.
+
+        Args:
+            video_path: Source video path
+
+        Returns:
+            Proxy path, or None if there is no proxy for the unchanged source
+        """
+        path = self.proxy_path(video_path)
+        return path if path and os.path.exists(path) else None
+
+    def transcode(self, video_path: str, size: Tuple[int, int] = DEFAULT_PROXY_SIZE,
+                  force: bool = False) -> Optional[str]:
+        """
+        Build the proxy for one source video (blocking).
+
+        Sources already smaller than the target are not upscaled.
+
+        Args:
+            video_path: Source video path
+            size: (width, height) box the proxy must fit in
+            force: Rebuild even if a proxy exists
+
+        Returns:
+            Proxy path, or None on failure
+        """
+        path = self.proxy_path(video_path)
+        if not path:
+            return None
+        if os.path.exists(path) and not force:
+            return path
+        os.makedirs(self.proxy_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        w, h = size
+        # Fit inside the box, never upscale, keep dimensions even for yuv420p
+        scale = (f"scale='min({w},iw)':'min({h},ih)':force_original_aspect_ratio=decrease,"
+                 f"scale=trunc(iw/2)*2:trunc(ih/2)*2")
+        try:
+            import imageio_ffmpeg
+            ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+            cmd = [ffmpeg_exe, '-v', 'error', '-y', '-i', video_path, '-vf', scale] + PROXY_VIDEO_ARGS + \
+                  ['-f', 'mp4', tmp_path]
+            result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE)
+            if result.returncode != 0 or not os.path.exists(tmp_path):
+                err = result.stderr.decode('utf-8', errors='replace').strip().splitlines()
+                raise OSError(err[-1] if err else f"ffmpeg exited with {result.returncode}")
+            os.replace(tmp_path, path)
+        except (ImportError, RuntimeError, OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Could not build proxy for {video_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+        return path
+
+    def prune(self, video_paths: Iterable[str]) -> int:
+        """
+        Delete proxies that belong to no current source version.
+
+        Args:
+            video_paths: Every source video that should keep its proxy
+
+        Returns:
+            Number of files removed
+        """
+        keep = {os.path.basename(p) for p in map(self.proxy_path, video_paths) if p}
+        removed = 0
+        try:
+            with os.scandir(self.proxy_dir) as it:
+                stale = [de.path for de in it if de.name not in keep
+                         and (de.name.endswith(PROXY_EXT) or de.name.endswith(".tmp"))]
+        except OSError:
+            return 0
+        for path in stale:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+# =============================================================================
+# MAINTENANCE MODE
+# =============================================================================
+
+def detect_display_size() -> Tuple[int, int]:
+    """
+    Largest connected monitor, used as the default proxy size.
+
+    Returns:
+        Tuple of (width, height)
+    """
+    try:
+        from screeninfo import get_monitors
+        monitors = get_monitors()
+        if monitors:
+            m = max(monitors, key=lambda m: m.width * m.height)
+            return m.width, m.height
+    except Exception as e:
+        logger.debug(f"Could not detect monitors: {e}")
+    return DEFAULT_PROXY_SIZE
+
+
+def build_proxies(video_dir: str, proxy_dir: str, audio_dir: str,
+                  size: Optional[Tuple[int, int]] = None, force: bool = False) -> int:
+    """
+    Transcode every video in a folder into a proxy plus a soundtrack sidecar.
+
+    Args:
+        video_dir: Folder with the source videos (non-recursive)
+        proxy_dir: Proxy output folder
+        audio_dir: Soundtrack sidecar folder
+        size: (width, height) box for the proxies (default: largest monitor)
+        force: Rebuild proxies that already exist
+
+    Returns:
+        Number of videos that failed
+    """
+    from audio_stream import SoundtrackCache
+
+    size = size or detect_display_size()
+    try:
+        videos = sorted(os.path.join(video_dir, name) for name in os.listdir(video_dir)
+                        if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS)
+    except OSError as e:
+        print(f"Cannot read {video_dir}: {e}")
+        return 1
+
+    store = ProxyStore(proxy_dir)
+    soundtracks = SoundtrackCache(audio_dir)
+    print(f"Building {size[0]}x{size[1]} proxies for {len(videos)} video(s) into {proxy_dir}")
+    failed = 0
+    for i, video in enumerate(videos, 1):
+        name = os.path.basename(video)
+        print(f"[{i}/{len(videos)}] {name} ...", end=' ', flush=True)
+        had_proxy = store.find(video) is not None and not force
+        proxy = store.transcode(video, size, force)
+        soundtrack = soundtracks.extract(video)
+        if proxy is None:
+            failed += 1
+            print("FAILED")
+        else:
+            print(("up to date" if had_proxy else "done") + ("" if soundtrack else " (no audio)"))
+
+    removed = store.prune(videos)
+    soundtracks.prune(videos)
+    if removed:
+        print(f"Removed {removed} stale proxy file(s)")
+    return failed
@@ -0,0 +1,174 @@
+"""
+Video Telemetry Module for Conditioning Control Panel
+======================================================
+Provides:
+- Per-stage frame timing (decode, colour conversion, resize, Tk blit)
+- Per-playback summary: achieved vs native FPS, dropped frames, A/V drift,
+  adaptive quality levels
+- Rolling JSON report of recent playbacks plus a one-line log summary
+"""
+
+import os
+import time
+import datetime
+import threading
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+try:
+    from utils import safe_load_json, safe_save_json
+except ImportError:
+    import json
+    def safe_load_json(fp, default=None):
+        try:
+            with open(fp, 'r') as f: return json.load(f)
+        except (IOError, OSError, json.JSONDecodeError): return default or {}
+    def safe_save_json(fp, data):
+        try:
+            with open(fp, 'w') as f: json.dump(data, f, indent=2)
+            return True
+        except (IOError, OSError, TypeError): return False
+
+
+REPORT_VERSION = 1
+MAX_REPORT_ENTRIES = 50
+
+STAGES = ('decode', 'convert', 'resize', 'blit')
+
+
+class StageTimer:
+    """Running count / total / worst of one pipeline stage. Thread-safe enough
+    for one writer per stage (decode thread or Tk thread)."""
+
+    __slots__ = ('count', 'total', 'worst')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.worst:
+            self.worst = seconds
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'avg_ms': round(1000 * self.total / self.count, 2) if self.count else 0.0,
+            'max_ms': round(1000 * self.worst, 2),
+        }
+
+
+class PlaybackTelemetry:
+    """
+    Timing collected over one video playback.
+
+    The decode thread records decode/convert/resize; the Tk thread records
+    blit. Stage timers are only ever written from one thread each.
+    """
+
+    def __init__(self):
+        self.stages = {name: StageTimer() for name in STAGES}
+        self.started = time.perf_counter()
+        self.errors = 0
+
+    def mark_start(self):
+        """Start the playback wall clock (decoding may have begun earlier)."""
+        self.started = time.perf_counter()
+
+    def add(self, stage: str, seconds: float):
+        """
+        Record one sample.
+
+        Args:
+            stage: One of STAGES
+            seconds: Elapsed time
+        """
+        self.stages[stage].add(seconds)
+
+    def build_report(self, video_path: str, native_fps: float, decoder_stats: dict) -> dict:
+        """
+        Summarise the playback.
+
+        Args:
+            video_path: Source video (the original, not a proxy)
+            native_fps: The video's own frame rate
+            decoder_stats: VideoDecoder.stats()
+
+        Returns:
+            Report dictionary
+        """
+        wall = max(1e-6, time.perf_counter() - self.started)
+        shown = decoder_stats.get('shown', 0)
+        achieved = shown / wall
+        return {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'video': os.path.basename(video_path),
+            'backend': decoder_stats.get('backend'),
+            'seconds': round(wall, 2),
+            'native_fps': round(native_fps, 2),
+            'achieved_fps': round(achieved, 2),
+            'fps_ratio': round(achieved / native_fps, 3) if native_fps else 0.0,
+            'frames': {k: decoder_stats.get(k, 0) for k in ('decoded', 'shown', 'dropped', 'seeks')},
+            'av_drift_ms': {'avg': decoder_stats.get('drift_avg_ms', 0.0),
+                            'max': decoder_stats.get('drift_max_ms', 0.0)},
+            'quality': {'final': decoder_stats.get('quality'),
+                        'worst': decoder_stats.get('quality_worst'),
+                        'changes': decoder_stats.get('quality_changes', 0)},
+            'stages': {name: timer.summary() for name, timer in self.stages.items()},
+            'errors': self.errors,
+        }
+
+
+def format_summary(report: dict) -> str:
+    """
+    One-line human summary of a report.
+
+    Args:
+        report: Output of PlaybackTelemetry.build_report
+
+    Returns:
+        Log line
+    """
+    st = report['stages']
+    fr = report['frames']
+    return (f"Video {report['video']} [{report['backend']}]: "
+            f"{report['achieved_fps']:.1f}/{report['native_fps']:.1f} fps, "
+            f"{fr['shown']} shown, {fr['dropped']} dropped, {fr['seeks']} seeks, "
+            f"drift avg {report['av_drift_ms']['avg']:.0f} ms / max {report['av_drift_ms']['max']:.0f} ms, "
+            f"decode {st['decode']['avg_ms']:.1f} ms, convert {st['convert']['avg_ms']:.1f} ms, "
+            f"resize {st['resize']['avg_ms']:.1f} ms, blit {st['blit']['avg_ms']:.1f} ms"
+            + (f", quality down to {report['quality']['worst']} ({report['quality']['changes']} change(s))"
+               if report.get('quality', {}).get('changes') else "")
+            + (f", {report['errors']} error(s)" if report.get('errors') else ""))
+
+
+def append_report(report_file: str, report: dict, background: bool = True):
+    """
+    Add a playback report to the rolling JSON file (newest last).
+
+    Args:
+        report_file: JSON report path
+        report: Output of PlaybackTelemetry.build_report
+        background: Write on a daemon thread
+    """
+    def write():
+        data = safe_load_json(report_file, {})
+        if data.get('version') != REPORT_VERSION:
+            data = {'version': REPORT_VERSION, 'playbacks': []}
+        data['playbacks'] = (data.get('playbacks') or [])[-(MAX_REPORT_ENTRIES - 1):] + [report]
+        os.makedirs(os.path.dirname(report_file), exist_ok=True)
+        if not safe_save_json(report_file, data):
+            logger.debug(f"Could not write video report {report_file}")
+
+    if background:
+        threading.Thread(target=write, daemon=True).start()
+    else:
+        write()
@@ -0,0 +1,143 @@
+"""
+Worker Pool Module for Conditioning Control Panel
+==================================================
+Provides:
+- Fixed-size, engine-owned thread pool for background jobs
+- Priority lanes (video before flash before hydra before prefetch)
+- Run-token cancellation and immediate dropping of queued work
+"""
+
+import heapq
+import itertools
+import threading
+from typing import Callable, Optional
+
+# Initialize logging
+try:
+    from security import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger("ConditioningPanel")
+
+
+# Lanes - lower value runs first
+LANE_VIDEO = 0
+LANE_FLASH = 1
+LANE_HYDRA = 2
+LANE_PREFETCH = 3
+
+DEFAULT_WORKERS = 3
+
+
+class WorkerPool:
+    """
+    Bounded pool of daemon worker threads fed from a priority queue.
+
+    Jobs are tagged with the run token that was current when they were
+    submitted. A job whose token no longer matches when a worker picks it
+    up is dropped without running, so a reschedule or panic stop never
+    has to wait for stale work.
+    """
+
+    def __init__(self, token_getter: Callable[[], int], size: int = DEFAULT_WORKERS):
+        """
+        Initialize and start the pool.
+
+        Args:
+            token_getter: Returns the current run token
+            size: Number of worker threads
+        """
+        self.token_getter = token_getter
+        self.size = max(1, size)
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self.dropped = 0
+        self._threads = []
+        for i in range(self.size):
+            t = threading.Thread(target=self._worker, name=f"EngineWorker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, lane: int, fn: Callable, *args, token: Optional[int] = None,
+               on_cancel: Optional[Callable[[], None]] = None):
+        """
+        Queue a job.
+
+        Args:
+            lane: One of the LANE_* priorities
+            fn: Callable to run on a worker thread
+            *args: Positional arguments for fn
+            token: Run token the job belongs to (default: current token)
+            on_cancel: Called instead of fn if the job is dropped, so the
+                caller can release any state it claimed when submitting
+        """
+        if token is None:
+            token = self.token_getter()
+        with self._cond:
+            if self._stopped:
+                return
+            heapq.heappush(self._heap, (lane, next(self._seq), token, fn, args, on_cancel))
+            self._cond.notify()
+
+    def cancel_pending(self, lane: Optional[int] = None) -> int:
+        """
+        Drop queued jobs that have not started yet.
+
+        Args:
+            lane: Only drop jobs in this lane (default: all lanes)
+
+        Returns:
+            Number of jobs dropped
+        """
+        with self._cond:
+            if lane is None:
+                dropped_jobs, self._heap = self._heap, []
+            else:
+                dropped_jobs = [job for job in self._heap if job[0] == lane]
+                self._heap = [job for job in self._heap if job[0] != lane]
+                heapq.heapify(self._heap)
+        for job in dropped_jobs:
+            self._drop(job)
+        if dropped_jobs:
+            logger.debug(f"Worker pool dropped {len(dropped_jobs)} queued job(s)")
+        return len(dropped_jobs)
+
+    def _drop(self, job):
+        self.dropped += 1
+        on_cancel = job[5]
+        if on_cancel:
+            try:
+                on_cancel()
+            except Exception as e:
+                logger.debug(f"Cancel callback failed: {e}")
+
+    def pending(self) -> int:
+        """Number of queued jobs."""
+        with self._cond:
+            return len(self._heap)
+
+    def shutdown(self):
+        """Drop queued work and let the workers exit."""
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                job = heapq.heappop(self._heap)
+            _, _, token, fn, args, _ = job
+            if token != self.token_getter():
+                self._drop(job)
+                continue
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.warning(f"Background job {getattr(fn, '__name__', fn)} failed: {e}")